@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class CoreConfig(AppConfig):
+    name = "apps.core"
+
+    def ready(self):
+        # Connect the receivers dropping cached users, also in processes that never authenticate a request
+        from . import authentication  # noqa: F401
@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+
+
+def get_user_cache_key(user_id):
+    return f"jwt-user:{user_id}"
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication keeping the users authenticated on redis for JWT_USER_CACHE_TIMEOUT seconds, keyed by the
+    user id claim of their tokens, so requests don't query the users table. Users are dropped from cache whenever
+    saved or deleted, e.g. by update_password or when deactivated, and cached users are checked to be active as
+    well. Bulk updates send no signals, so their changes are only seen once the cached user expires, which is why
+    the timeout is kept short. Password hashes are never cached, they are loaded from database on access.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if settings.JWT_USER_CACHE_TIMEOUT <= 0 or user_id is None:
+            return super().get_user(validated_token)
+
+        key = get_user_cache_key(user_id)
+        values = cache.get(key)
+        if values is not None:
+            user = self.user_model.from_db(DEFAULT_DB_ALIAS, list(values), list(values.values()))
+            if not user.is_active:
+                raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+            return user
+
+        user = super().get_user(validated_token)
+        cache.set(
+            key,
+            {
+                field.attname: getattr(user, field.attname)
+                for field in self.user_model._meta.concrete_fields
+                if field.name != "password"
+            },
+            settings.JWT_USER_CACHE_TIMEOUT,
+        )
+        return user
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def forget_cached_user(sender, instance, **kwargs):
+    cache.delete(get_user_cache_key(getattr(instance, api_settings.USER_ID_FIELD)))
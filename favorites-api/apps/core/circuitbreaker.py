@@ -0,0 +1,125 @@
+import logging
+import threading
+import time
+
+from django.core.cache import cache
+
+from .metrics import BREAKER_OPENED, BREAKER_REJECTED
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker keeping its state on redis, so every worker agrees on it. After threshold failures within
+    window seconds it opens and every call is rejected for reset_timeout seconds, then it half-opens letting a
+    single call probe the service: its success closes the breaker, its failure opens it again.
+    The state read from redis is reused for refresh_interval seconds, a threshold of 0 disables the breaker.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    # States in the order of their value on the state metric
+    STATES = (CLOSED, HALF_OPEN, OPEN)
+
+    def __init__(self, name, threshold, window, reset_timeout, refresh_interval=1.0):
+        self.name = name
+        self.threshold = threshold
+        self.window = window
+        self.reset_timeout = reset_timeout
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._state_expires_at = 0
+
+    def get_key(self, suffix):
+        return f"breaker:{self.name}:{suffix}"
+
+    def read_state(self):
+        """
+        Read the state shared on redis, without reusing the one last read.
+        """
+        if self.threshold <= 0:
+            return self.CLOSED
+
+        values = cache.get_many([self.get_key("tripped"), self.get_key("open")])
+        if self.get_key("tripped") not in values:
+            return self.CLOSED
+        if self.get_key("open") in values:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    @property
+    def state(self):
+        if self.threshold <= 0:
+            return self.CLOSED
+
+        if self._state_expires_at <= time.monotonic():
+            self.set_state(self.read_state())
+        return self._state
+
+    def set_state(self, state):
+        with self._lock:
+            self._state = state
+            self._state_expires_at = time.monotonic() + self.refresh_interval
+
+    def acquire(self):
+        """
+        Return the state of the breaker if the call is allowed, or None when it must be rejected. While half-open
+        only the first caller is allowed, to probe the service.
+        """
+        state = self.state
+        if state == self.CLOSED:
+            return state
+        if state == self.HALF_OPEN and cache.add(self.get_key("probe"), 1, self.reset_timeout):
+            return state
+
+        BREAKER_REJECTED.labels(self.name).inc()
+        return None
+
+    def release(self, state, successes=0, failures=0):
+        """
+        Record the outcome of a call allowed by acquire, opening or closing the breaker as needed.
+        """
+        if self.threshold <= 0:
+            return
+
+        if state == self.HALF_OPEN:
+            if failures or not successes:
+                self.open()
+            else:
+                self.close()
+        elif failures and self.count_failures(failures) >= self.threshold:
+            self.open()
+
+    def count_failures(self, failures):
+        """
+        Add failures to the shared counter of the current window using a single pipelined round trip. The
+        window starts with its first failure and isn't extended by the next ones, so failures spread wider
+        than the window never add up.
+        """
+        key = cache.make_key(self.get_key("failures"))
+        pipeline = cache.client.get_client(write=True).pipeline()
+        pipeline.set(key, 0, ex=self.window, nx=True)
+        pipeline.incrby(key, failures)
+        _, count = pipeline.execute()
+        return count
+
+    def open(self):
+        pipeline = cache.client.get_client(write=True).pipeline()
+        cache.client.set(self.get_key("tripped"), 1, None, client=pipeline)
+        cache.client.set(self.get_key("open"), 1, self.reset_timeout, client=pipeline)
+        cache.client.delete_many([self.get_key("probe"), self.get_key("failures")], client=pipeline)
+        pipeline.execute()
+
+        self.set_state(self.OPEN)
+        BREAKER_OPENED.labels(self.name).inc()
+        logger.warning("Circuit breaker %s opened for %s seconds", self.name, self.reset_timeout)
+
+    def close(self):
+        cache.delete_many(
+            [self.get_key("tripped"), self.get_key("open"), self.get_key("probe"), self.get_key("failures")]
+        )
+        self.set_state(self.CLOSED)
+        logger.warning("Circuit breaker %s closed", self.name)
@@ -0,0 +1,167 @@
+import asyncio
+import time
+import weakref
+from functools import lru_cache
+
+import aiohttp
+import requests
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .circuitbreaker import CircuitBreaker
+from .metrics import observe_upstream_request
+
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+
+
+class LuizalabsAPIClient:
+    """
+    HTTP client for the external LUIZALABS_API, keeping a pool of keep-alive connections that is shared by
+    every thread of the process. Requests are bounded by connect/read timeouts and retried with backoff on
+    connection errors and 5xx responses.
+    """
+
+    def __init__(self, base_url, pool_size, connect_timeout, read_timeout, max_retries, retry_backoff):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=retry_backoff,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=frozenset(["GET"]),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(self, path, timeout=None):
+        """
+        Request given path, the given timeout in seconds caps both the connect and read timeouts.
+        """
+        connect_timeout, read_timeout = self.timeout
+        if timeout is not None:
+            connect_timeout, read_timeout = min(connect_timeout, timeout), min(read_timeout, timeout)
+
+        started_at = time.perf_counter()
+        try:
+            response = self.session.get(f"{self.base_url}{path}", timeout=(connect_timeout, read_timeout))
+        except requests.Timeout:
+            observe_upstream_request(started_at, "timeout")
+            raise
+        except requests.RequestException:
+            observe_upstream_request(started_at, "error")
+            raise
+        observe_upstream_request(started_at, response.status_code)
+        return response
+
+    def get_product(self, id, timeout=None):
+        return self.get(f"/api/product/{id}/", timeout)
+
+
+class AsyncLuizalabsAPIClient:
+    """
+    Non-blocking twin of LuizalabsAPIClient, keeping a pool of keep-alive connections that is shared by
+    every request served by the same event loop.
+    """
+
+    def __init__(self, base_url, pool_size, connect_timeout, read_timeout, max_retries, retry_backoff):
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=pool_size),
+            timeout=aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout),
+        )
+
+    async def get(self, path, timeout=None):
+        """
+        Request given path, the returned response body is already read. The given timeout in seconds bounds
+        each attempt as a whole.
+        """
+        request_timeout = aiohttp.ClientTimeout(total=timeout) if timeout is not None else None
+        started_at = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            is_last_attempt = attempt == self.max_retries
+            try:
+                async with self.session.get(f"{self.base_url}{path}", timeout=request_timeout) as response:
+                    await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                if is_last_attempt:
+                    observe_upstream_request(
+                        started_at, "timeout" if isinstance(error, asyncio.TimeoutError) else "error"
+                    )
+                    raise
+            else:
+                if response.status not in RETRY_STATUS_CODES or is_last_attempt:
+                    observe_upstream_request(started_at, response.status)
+                    return response
+            await asyncio.sleep(self.retry_backoff * 2**attempt)
+
+    async def get_product(self, id, timeout=None):
+        return await self.get(f"/api/product/{id}/", timeout)
+
+
+async_luizalabs_api_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_luizalabs_api_client():
+    """
+    Return the AsyncLuizalabsAPIClient of the running event loop, connections can't be shared across loops.
+    """
+    loop = asyncio.get_running_loop()
+    if loop not in async_luizalabs_api_clients:
+        async_luizalabs_api_clients[loop] = AsyncLuizalabsAPIClient(
+            base_url=settings.LUIZALABS_API_URL,
+            pool_size=settings.LUIZALABS_API_ASYNC_MAX_IN_FLIGHT,
+            connect_timeout=settings.LUIZALABS_API_CONNECT_TIMEOUT,
+            read_timeout=settings.LUIZALABS_API_READ_TIMEOUT,
+            max_retries=settings.LUIZALABS_API_MAX_RETRIES,
+            retry_backoff=settings.LUIZALABS_API_RETRY_BACKOFF,
+        )
+    return async_luizalabs_api_clients[loop]
+
+
+async def close_async_luizalabs_api_client():
+    """
+    Close the AsyncLuizalabsAPIClient of the running event loop, to be called before the loop is closed.
+    """
+    client = async_luizalabs_api_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.session.close()
+
+
+@lru_cache(maxsize=None)
+def get_luizalabs_api_client():
+    return LuizalabsAPIClient(
+        base_url=settings.LUIZALABS_API_URL,
+        pool_size=settings.LUIZALABS_API_POOL_SIZE,
+        connect_timeout=settings.LUIZALABS_API_CONNECT_TIMEOUT,
+        read_timeout=settings.LUIZALABS_API_READ_TIMEOUT,
+        max_retries=settings.LUIZALABS_API_MAX_RETRIES,
+        retry_backoff=settings.LUIZALABS_API_RETRY_BACKOFF,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_luizalabs_api_breaker():
+    return CircuitBreaker(
+        "luizalabs-api",
+        threshold=settings.LUIZALABS_API_BREAKER_THRESHOLD,
+        window=settings.LUIZALABS_API_BREAKER_WINDOW,
+        reset_timeout=settings.LUIZALABS_API_BREAKER_RESET_TIMEOUT,
+    )
+
+
+@receiver(setting_changed)
+def reset_luizalabs_api_client(setting, **kwargs):
+    if setting.startswith("LUIZALABS_API_"):
+        get_luizalabs_api_client.cache_clear()
+        get_luizalabs_api_breaker.cache_clear()
+        async_luizalabs_api_clients.clear()
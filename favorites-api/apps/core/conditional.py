@@ -0,0 +1,24 @@
+import hashlib
+
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def make_etag(*parts):
+    """
+    Strong ETag of a response identified by the given parts, they must cover everything its content depends on.
+    """
+    return quote_etag(hashlib.sha1(repr(parts).encode()).hexdigest())
+
+
+def is_not_modified(request, etag):
+    """
+    Check if the If-None-Match header of the request matches the given ETag.
+    """
+    etags = parse_etags(request.META.get("HTTP_IF_NONE_MATCH", ""))
+    return etag in etags or "*" in etags
+
+
+def not_modified_response(etag):
+    return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
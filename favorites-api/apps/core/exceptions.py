@@ -0,0 +1,8 @@
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class LuizalabsAPIUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Luizalabs products API is unavailable, try again later."
+    default_code = "luizalabs_api_unavailable"
@@ -0,0 +1,90 @@
+import threading
+import time
+from collections import OrderedDict
+
+from .metrics import record_cache_lookups
+
+
+class LRUCache:
+    """
+    Thread-safe in-memory cache holding at most maxsize keys for at most timeout seconds, the least
+    recently used keys are evicted first when it is full. Its keys are dropped whenever set_version is given
+    a new version of the data they were read from, bumping its generation. Lookups and evictions are exported
+    as metrics when the tier is named.
+    """
+
+    def __init__(self, maxsize, timeout, tier=None):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.tier = tier
+        self.version = None
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def set_version(self, version):
+        with self._lock:
+            if version != self.version:
+                self.version = version
+                self.generation += 1
+                self._data.clear()
+
+    def get_many(self, keys):
+        """
+        Return a {key: value} mapping of the given keys found and not expired.
+        """
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                item = self._data.get(key)
+                if item is None:
+                    continue
+                expires_at, value = item
+                if expires_at <= now:
+                    del self._data[key]
+                    continue
+                self._data.move_to_end(key)
+                found[key] = value
+
+        self.record(hits=len(found), misses=len(keys) - len(found))
+        return found
+
+    def get(self, key, default=None):
+        return self.get_many([key]).get(key, default)
+
+    def set_many(self, data, generation=None):
+        """
+        Set the given {key: value} mapping. When a generation is given the values are only set if the cache is
+        still at it, so values read before the version changed aren't kept.
+        """
+        if self.maxsize <= 0 or self.timeout <= 0:
+            return
+
+        expires_at = time.monotonic() + self.timeout
+        evictions = 0
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            for key, value in data.items():
+                self._data[key] = (expires_at, value)
+                self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                evictions += 1
+
+        self.record(evictions=evictions)
+
+    def set(self, key, value, generation=None):
+        self.set_many({key: value}, generation)
+
+    def record(self, hits=0, misses=0, evictions=0):
+        if self.tier is not None:
+            record_cache_lookups(self.tier, hits, misses, evictions)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,126 @@
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from apps.core.mixins import ExternalLuizalabsAPIMixin
+from apps.favorites.models import Customer
+
+
+class Command(BaseCommand):
+    help = "Store on cache the favorited products that are missing or about to expire"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size", type=int, default=1000, help="Number of product ids read from database at a time"
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=50,
+            help="Maximum requests per second to Luizalabs API, 0 disables it",
+        )
+        parser.add_argument(
+            "--refresh-within",
+            type=int,
+            default=None,
+            help="Products expiring within these seconds are fetched again, a tenth of the cache timeout by default",
+        )
+
+    def handle(self, chunk_size, rate, refresh_within, *args, **kwargs):
+        if refresh_within is None:
+            refresh_within = settings.FAVORITES_EXPIRE_TIMEOUT // 10
+
+        self.luizalabs_api = ExternalLuizalabsAPIMixin()
+        self.rate = rate
+        self.started_at = time.monotonic()
+        self.requested = 0
+        totals = {"scanned": 0, "hits": 0, "missing": 0, "stale": 0, "fetched": 0, "failed": 0}
+
+        for ids in self.iter_favorited_product_ids(chunk_size):
+            missing_ids, stale_ids = self.search_expiring_ids(ids, refresh_within)
+            fetched = self.fetch_products(missing_ids + stale_ids)
+
+            totals["scanned"] += len(ids)
+            totals["hits"] += len(ids) - len(missing_ids) - len(stale_ids)
+            totals["missing"] += len(missing_ids)
+            totals["stale"] += len(stale_ids)
+            totals["fetched"] += fetched
+            totals["failed"] += len(missing_ids) + len(stale_ids) - fetched
+
+        elapsed = time.monotonic() - self.started_at
+        hit_ratio = totals["hits"] / totals["scanned"] if totals["scanned"] else 0
+        self.stdout.write(
+            "Scanned {scanned} products in {elapsed:.2f}s ({throughput:.1f}/s): {hits} hits ({hit_ratio:.1%}), "
+            "{missing} missing, {stale} stale, {fetched} fetched, {failed} failed".format(
+                elapsed=elapsed,
+                throughput=totals["scanned"] / elapsed if elapsed else 0,
+                hit_ratio=hit_ratio,
+                **totals,
+            )
+        )
+
+    def iter_favorited_product_ids(self, chunk_size):
+        """
+        Stream the distinct favorited product ids in chunks, using a server-side cursor where supported.
+        """
+        product_ids = (
+            Customer.favorites.through.objects.order_by().values_list("product_id", flat=True).distinct()
+        )
+        iterator = (str(id) for id in product_ids.iterator(chunk_size=chunk_size))
+        while True:
+            ids = list(islice(iterator, chunk_size))
+            if not ids:
+                return
+            yield ids
+
+    def search_expiring_ids(self, ids, refresh_within):
+        """
+        Read every given id on redis using a single pipelined round trip, returning the ids missing and the
+        ones past or within refresh_within seconds of their jittered refresh time, including those already
+        served stale. Values stored without a refresh time are refreshed FAVORITES_STALE_TIMEOUT before their
+        TTL ends.
+        """
+        pipeline = cache.client.get_client(write=False).pipeline()
+        for id in ids:
+            key = cache.make_key(id)
+            pipeline.ttl(key)
+            pipeline.get(key)
+        results = pipeline.execute()
+
+        now = time.time()
+        missing_ids, stale_ids = [], []
+        for id, ttl, value in zip(ids, results[::2], results[1::2]):
+            if value is None:
+                missing_ids.append(id)
+                continue
+
+            value = cache.client.decode(value)
+            refresh_at = (
+                value[0] if isinstance(value, tuple) else now + ttl - settings.FAVORITES_STALE_TIMEOUT
+            )
+            if ttl >= 0 and refresh_at - now <= refresh_within:
+                stale_ids.append(id)
+        return missing_ids, stale_ids
+
+    def fetch_products(self, ids):
+        """
+        Fetch the given ids in batches of LUIZALABS_API_MAX_WORKERS concurrent requests, waiting between
+        batches to keep under the requested rate. Returns the number of products stored on cache.
+        """
+        fetched = 0
+        batch_size = settings.LUIZALABS_API_MAX_WORKERS
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start : start + batch_size]
+            self.throttle()
+            fetched += len(self.luizalabs_api.fetch_products(batch))
+            self.requested += len(batch)
+        return fetched
+
+    def throttle(self):
+        if self.rate > 0:
+            delay = self.started_at + self.requested / self.rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
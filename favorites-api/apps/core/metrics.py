@@ -0,0 +1,144 @@
+import os
+import time
+from contextvars import ContextVar
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram, multiprocess
+from prometheus_client.core import GaugeMetricFamily
+
+REQUEST_LATENCY = Histogram(
+    "favorites_http_request_duration_seconds",
+    "Latency of the requests served, per view",
+    ["view", "method", "status"],
+)
+DB_QUERIES = Histogram(
+    "favorites_db_queries_per_request",
+    "Database queries made by each request, per view",
+    ["view"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, float("inf")),
+)
+DB_QUERIES_DURATION = Histogram(
+    "favorites_db_queries_duration_seconds",
+    "Time spent on database queries by each request, per view",
+    ["view"],
+)
+UPSTREAM_LATENCY = Histogram(
+    "favorites_luizalabs_api_request_duration_seconds",
+    "Latency of the requests to Luizalabs API including retries, per response status or error",
+    ["status"],
+)
+CACHE_LOOKUPS = Counter(
+    "favorites_products_cache_lookups_total",
+    "Products looked up per cache tier and result",
+    ["tier", "result"],
+)
+CACHE_EVICTIONS = Counter(
+    "favorites_products_cache_evictions_total", "Products evicted per cache tier", ["tier"]
+)
+BREAKER_REJECTED = Counter(
+    "favorites_circuit_breaker_rejected_total", "Calls rejected by the breaker", ["name"]
+)
+BREAKER_OPENED = Counter("favorites_circuit_breaker_opened_total", "Times the breaker opened", ["name"])
+
+current_request_metrics = ContextVar("current_request_metrics", default=None)
+
+
+class RequestMetrics:
+    """
+    Database queries made while serving a request, set on current_request_metrics by MetricsMiddleware.
+    The context is copied to the threads running sync code of async views, so their queries are counted too.
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.queries = 0
+        self.queries_duration = 0.0
+
+    def observe(self, request, response):
+        resolver_match = getattr(request, "resolver_match", None)
+        view = resolver_match.view_name if resolver_match is not None else "unresolved"
+        REQUEST_LATENCY.labels(view, request.method, response.status_code).observe(
+            time.perf_counter() - self.started_at
+        )
+        DB_QUERIES.labels(view).observe(self.queries)
+        DB_QUERIES_DURATION.labels(view).observe(self.queries_duration)
+
+
+def time_query(execute, sql, params, many, context):
+    request_metrics = current_request_metrics.get()
+    if request_metrics is None:
+        return execute(sql, params, many, context)
+
+    started_at = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        request_metrics.queries += 1
+        request_metrics.queries_duration += time.perf_counter() - started_at
+
+
+def install_query_timer(connection):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+@receiver(connection_created)
+def install_query_timer_on_connection(sender, connection, **kwargs):
+    install_query_timer(connection)
+
+
+def observe_upstream_request(started_at, status):
+    UPSTREAM_LATENCY.labels(status).observe(time.perf_counter() - started_at)
+
+
+def record_cache_lookups(tier, hits=0, misses=0, evictions=0):
+    if hits:
+        CACHE_LOOKUPS.labels(tier, "hit").inc(hits)
+    if misses:
+        CACHE_LOOKUPS.labels(tier, "miss").inc(misses)
+    if evictions:
+        CACHE_EVICTIONS.labels(tier).inc(evictions)
+
+
+class BreakerStateCollector:
+    """
+    State of the Luizalabs API circuit breaker read from redis on each scrape, rather than the last state seen
+    by a worker process, which could be long outdated by the time it is scraped.
+    """
+
+    def get_family(self):
+        return GaugeMetricFamily(
+            "favorites_circuit_breaker_state",
+            "State of the circuit breaker: 0 closed, 1 half-open, 2 open",
+            labels=["name"],
+        )
+
+    def describe(self):
+        yield self.get_family()
+
+    def collect(self):
+        from .clients import get_luizalabs_api_breaker
+
+        breaker = get_luizalabs_api_breaker()
+        family = self.get_family()
+        family.add_metric([breaker.name], breaker.STATES.index(breaker.read_state()))
+        yield family
+
+
+breaker_state_collector = BreakerStateCollector()
+REGISTRY.register(breaker_state_collector)
+
+
+def get_metrics_registry():
+    """
+    Registry of the metrics to expose. When PROMETHEUS_MULTIPROC_DIR is set every worker process writes its
+    metrics there, and they are aggregated on each scrape.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(breaker_state_collector)
+    return registry
@@ -0,0 +1,124 @@
+import asyncio
+import cProfile
+
+from asgiref.sync import sync_to_async
+from django.db import connection
+from whitenoise.middleware import WhiteNoiseMiddleware as SyncWhiteNoiseMiddleware
+
+from .metrics import RequestMetrics, current_request_metrics, install_query_timer
+from .profiling import RequestProfile, current_profile, install_query_recorder, should_profile
+
+
+class WhiteNoiseMiddleware(SyncWhiteNoiseMiddleware):
+    """
+    WhiteNoise middleware that can also run in async mode. A sync only middleware makes Django serve every
+    request under ASGI on a single thread, blocking the async views on each other.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        static_file = (
+            self.find_file(request.path_info) if self.autorefresh else self.files.get(request.path_info)
+        )
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class MetricsMiddleware:
+    """
+    Observe the latency of every request along with the database queries it made, per view. It comes before
+    every middleware but WhiteNoise, so the latency covers them.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        install_query_timer(connection)
+        request_metrics = RequestMetrics()
+        token = current_request_metrics.set(request_metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request_metrics.reset(token)
+        request_metrics.observe(request, response)
+        return response
+
+    async def __acall__(self, request):
+        request_metrics = RequestMetrics()
+        token = current_request_metrics.set(request_metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request_metrics.reset(token)
+        request_metrics.observe(request, response)
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Profile the requests chosen by should_profile, storing the profile on cache for PROFILING_TIMEOUT seconds
+    under the id returned on the X-Profile-Id header. Sync requests also get a call-stack profile, async ones
+    only the timeline since their event loop serves other requests meanwhile.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not should_profile(request):
+            return self.get_response(request)
+
+        install_query_recorder(connection)
+        profiler = cProfile.Profile()
+        profile = RequestProfile(request, profiler)
+        token = current_profile.set(profile)
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+            current_profile.reset(token)
+        profile.save(response)
+        return response
+
+    async def __acall__(self, request):
+        if not should_profile(request):
+            return await self.get_response(request)
+
+        profile = RequestProfile(request)
+        token = current_profile.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        await sync_to_async(profile.save)(response)
+        return response
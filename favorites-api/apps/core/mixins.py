@@ -1,39 +1,679 @@
-import requests
+import asyncio
+import contextvars
+import copy
+import logging
+import math
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.db import close_old_connections
+from django.dispatch import receiver
 from rest_framework import status
 
+from .clients import get_async_luizalabs_api_client, get_luizalabs_api_breaker, get_luizalabs_api_client
+from .exceptions import LuizalabsAPIUnavailable
+from .lru import LRUCache
+from .metrics import record_cache_lookups
+from .profiling import profiled
+from .singleflight import SingleFlight
+from apps.favorites.models import Product
+
+logger = logging.getLogger(__name__)
+
+LOCK_POLL_INTERVAL = 0.05
+REFRESH_WORKERS = 2
+PARTIAL_RESULTS_HEADER = "X-Partial-Results"
+PRODUCTS_VERSION_KEY = "products:version"
+# Fields of the Luizalabs API products returned by this API, the only ones kept
+PRODUCT_FIELDS = ("id", "title", "price", "image", "brand", "reviewScore")
+
+products_single_flight = SingleFlight()
+products_refresh_single_flight = SingleFlight()
+
+
+@lru_cache(maxsize=None)
+def get_products_local_cache():
+    """
+    In-process cache in front of redis, its timeout never exceeds FAVORITES_EXPIRE_TIMEOUT.
+    """
+    timeout = min(settings.FAVORITES_LOCAL_CACHE_TIMEOUT, settings.FAVORITES_EXPIRE_TIMEOUT)
+    return LRUCache(settings.FAVORITES_LOCAL_CACHE_SIZE, timeout, tier="local")
+
+
+@receiver(setting_changed)
+def reset_products_local_cache(setting, **kwargs):
+    if setting.startswith("FAVORITES_"):
+        get_products_local_cache.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def get_products_refresh_executor():
+    return ThreadPoolExecutor(max_workers=REFRESH_WORKERS, thread_name_prefix="products-refresh")
+
+
+@lru_cache(maxsize=None)
+def get_products_request_executor():
+    """
+    Threads making the product requests to Luizalabs API, shared by the whole process so at most
+    LUIZALABS_API_MAX_WORKERS requests are in flight at a time, however many are being served.
+    """
+    return ThreadPoolExecutor(
+        max_workers=settings.LUIZALABS_API_MAX_WORKERS, thread_name_prefix="products-request"
+    )
+
+
+@receiver(setting_changed)
+def reset_products_request_executor(setting, **kwargs):
+    if setting == "LUIZALABS_API_MAX_WORKERS":
+        get_products_request_executor.cache_clear()
+
+
+def jittered(timeout):
+    """
+    Cut up to FAVORITES_EXPIRE_JITTER of the given timeout, so keys stored together don't expire together.
+    """
+    return timeout * (1 - random.uniform(0, settings.FAVORITES_EXPIRE_JITTER))
+
+
+def project_product(data):
+    """
+    Keep only PRODUCT_FIELDS of a product returned by Luizalabs API.
+    """
+    return {field: data.get(field) for field in PRODUCT_FIELDS} if data else data
+
+
+def pack_product(data):
+    """
+    Compact encoding of a product stored on redis: its PRODUCT_FIELDS values, without repeating their names.
+    """
+    return tuple(data.get(field) for field in PRODUCT_FIELDS) if data else data
+
+
+def unpack_product(value):
+    """
+    Decode a product packed by pack_product, products stored whole by older versions are returned as they are.
+    """
+    return dict(zip(PRODUCT_FIELDS, value)) if isinstance(value, tuple) else value
+
+
+def bump_version(key):
+    """
+    Increment the version counter stored on given key, starting it when missing.
+    """
+    return cache.client.get_client(write=True).incr(cache.make_key(key))
+
 
 class ExternalLuizalabsAPIMixin:
-    def store_product_on_cache(self, id, data):
-        cache.add(id, data, settings.FAVORITES_EXPIRE_TIMEOUT)
+    # time.monotonic() value after which external_api lookups are abandoned, None waits for them as long as needed
+    deadline = None
 
-    def search_product_on_cache(self, id):
-        return cache.get(id)
+    def with_deadline(self, timeout):
+        """
+        Return a copy of this mixin abandoning its external_api lookups timeout seconds from now, 0 disables it.
+        """
+        mixin = copy.copy(self)
+        mixin.deadline = time.monotonic() + timeout if timeout > 0 else None
+        return mixin
 
-    def search_product_on_external_api(self, id):
+    def get_remaining_time(self):
         """
-        Search given id on external LUIZALABS_API.
-        The value returned from the API will be automatically stored on cache to avoid further requests.
+        Seconds left until the deadline, or None when there is no deadline.
+        """
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0)
+
+    @profiled("cache")
+    def store_products_on_cache(self, products, timeout=None):
+        """
+        Store a {id: data} mapping on cache using a pipelined round trip per timeout. Each product is stored
+        along with its jittered refresh time, FAVORITES_EXPIRE_TIMEOUT from now or FAVORITES_NOT_FOUND_TIMEOUT
+        for products that don't exist, unless a timeout is given. Products are kept FAVORITES_STALE_TIMEOUT
+        longer to be served while refreshed. Products are packed on redis and kept as dicts on the local cache.
+        """
+        if not products:
+            return
+
+        if timeout is None:
+            groups = (
+                ({id: data for id, data in products.items() if data}, settings.FAVORITES_EXPIRE_TIMEOUT),
+                (
+                    {id: data for id, data in products.items() if not data},
+                    settings.FAVORITES_NOT_FOUND_TIMEOUT,
+                ),
+            )
+        else:
+            groups = ((products, timeout),)
+
+        now = time.time()
+        for group, timeout in groups:
+            if group:
+                cache.set_many(
+                    {id: (now + jittered(timeout), pack_product(data)) for id, data in group.items()},
+                    timeout + settings.FAVORITES_STALE_TIMEOUT,
+                )
+        get_products_local_cache().set_many({str(id): data for id, data in products.items()})
+
+    def unpack_products_from_cache(self, cached_products):
         """
-        luizalabs_api_url = settings.LUIZALABS_API_URL
-        url = f"{luizalabs_api_url}/api/product/{id}/"
+        Split the {id: (refresh_at, data)} mapping read from redis into the products data and the ids past their
+        refresh time, which are refreshed in background. Values stored without a refresh time are kept as fresh.
+        """
+        now = time.time()
+        products = {}
+        stale_ids = []
+        for id, value in cached_products.items():
+            refresh_at, data = value if isinstance(value, tuple) else (math.inf, value)
+            products[id] = unpack_product(data)
+            if refresh_at <= now:
+                stale_ids.append(id)
+
+        if stale_ids:
+            self.refresh_products_on_background({id: products[id] for id in stale_ids})
+        return products, stale_ids
+
+    def store_products_on_database(self, products):
+        """
+        Persist the details of the found products as the snapshot of their Product, using a single query.
+        Products that don't exist anymore have their snapshot dropped, ids without a Product are skipped.
+        Returns whether any of them changed from the snapshot it had, read by one more query.
+        """
+        previous_products = {
+            str(product.id): product.snapshot[1]
+            for product in Product.objects.filter(id__in=list(products)).exclude(fetched_at=None)
+        }
+        changed = any(
+            str(id) in previous_products and previous_products[str(id)] != (data and {**data, "id": str(id)})
+            for id, data in products.items()
+        )
+
+        snapshots = [Product.from_snapshot({**data, "id": id}) for id, data in products.items() if data]
+        if snapshots:
+            Product.objects.bulk_update(snapshots, Product.snapshot_fields)
+
+        not_found_ids = [id for id, data in products.items() if not data]
+        if not_found_ids:
+            Product.objects.filter(id__in=not_found_ids).exclude(fetched_at=None).update(fetched_at=None)
+        return changed
+
+    def store_fetched_products(self, products):
+        """
+        Store the {id: data} products fetched from external_api on cache and database. When any of them changed
+        from the snapshot kept on database the products version is bumped, so the pages built from their
+        previous details are dropped. Products never fetched before weren't on any page.
+        """
+        if not products:
+            return
 
-        response = requests.request("GET", url)
+        self.store_products_on_cache(products)
+        if self.store_products_on_database(products):
+            bump_version(PRODUCTS_VERSION_KEY)
 
-        data = response.json() if response.status_code == status.HTTP_200_OK else {}
-        self.store_product_on_cache(id, data)
+    def search_products_on_database(self, snapshots):
+        """
+        Use the {id: (refresh_at, data)} snapshots persisted on database as products, the same way the ones
+        stored on redis are: past their refresh time they are refreshed in background and after
+        FAVORITES_STALE_TIMEOUT more they are ignored. Only the ids usable are returned. They aren't kept on the
+        local cache, as they may have been read before the products version it holds.
+        """
+        expired_at = time.time() - settings.FAVORITES_STALE_TIMEOUT
+        products, _ = self.unpack_products_from_cache(
+            {id: snapshot for id, snapshot in snapshots.items() if snapshot and snapshot[0] > expired_at}
+        )
+        record_cache_lookups("database", hits=len(products), misses=len(snapshots) - len(products))
+        return products
+
+    @profiled("cache")
+    def search_product_on_cache(self, id):
+        local_cache = get_products_local_cache()
+        generation = local_cache.generation
+        data = local_cache.get(str(id))
+        if data is None:
+            value = cache.get(id)
+            record_cache_lookups("redis", hits=int(value is not None), misses=int(value is None))
+            if value is not None:
+                products, stale_ids = self.unpack_products_from_cache({id: value})
+                data = products[id]
+                if not stale_ids:
+                    local_cache.set(str(id), data, generation)
         return data
 
+    @profiled("cache")
+    def search_products_on_cache(self, ids):
+        """
+        Search many ids on the local cache, then the ones missing on redis using a single round trip.
+        Only the ids found are returned.
+        """
+        local_cache = get_products_local_cache()
+        generation = local_cache.generation
+        local_products = local_cache.get_many([str(id) for id in ids])
+        products = {id: local_products[str(id)] for id in ids if str(id) in local_products}
+
+        missing_ids = [id for id in ids if id not in products]
+        if missing_ids:
+            cached_products = cache.get_many(missing_ids)
+            record_cache_lookups(
+                "redis", hits=len(cached_products), misses=len(missing_ids) - len(cached_products)
+            )
+            redis_products, stale_ids = self.unpack_products_from_cache(cached_products)
+            local_cache.set_many(
+                {str(id): data for id, data in redis_products.items() if id not in stale_ids}, generation
+            )
+            products.update(redis_products)
+
+        return products
+
+    @profiled("upstream")
+    def request_product_on_external_api(self, id):
+        """
+        Request given id on external LUIZALABS_API, products are returned with PRODUCT_FIELDS only and the ones that
+        doesn't exist as an empty dict. Any other error response raises an HTTPError.
+        """
+        response = get_luizalabs_api_client().get_product(id, timeout=self.get_remaining_time())
+        if response.status_code == status.HTTP_404_NOT_FOUND:
+            return {}
+
+        response.raise_for_status()
+        return project_product(response.json())
+
+    def search_product_on_external_api(self, id):
+        """
+        Search given id on external LUIZALABS_API, returning None when the request failed.
+        The value returned from the API will be automatically stored on cache to avoid further requests.
+        """
+        return self.search_products_on_external_api([id]).get(id)
+
     def search_product(self, id):
         """
         Search for given id. This will first search on cache, then in case this info doesn't exist on cache
-        it will search on external_api.
+        it will search on external_api. Returns None when it's not cached and external_api failed.
         """
         cache_value = self.search_product_on_cache(id)
         if cache_value is None:
             return self.search_product_on_external_api(id)
         return cache_value
 
+    def request_product_or_none(self, id):
+        """
+        Same as request_product_on_external_api, but any failure is logged and reported as None so a single
+        broken lookup doesn't break a whole batch.
+        """
+        try:
+            return self.request_product_on_external_api(id)
+        except Exception:
+            logger.exception("Failed to request product %s", id)
+            return None
+
+    def request_products_on_external_api(self, ids):
+        """
+        Request many ids on external LUIZALABS_API on the requests executor shared by the process. Results are
+        returned in the same order as the given ids, every id fails right away while the circuit breaker is
+        open or past the deadline. Requests still running at the deadline, retries included, are abandoned and
+        returned as None without being counted by the circuit breaker, the ones not started are cancelled.
+        """
+        if not ids:
+            return []
+
+        remaining_time = self.get_remaining_time()
+        if remaining_time == 0:
+            return [None] * len(ids)
+
+        breaker = get_luizalabs_api_breaker()
+        state = breaker.acquire()
+        if state is None:
+            return [None] * len(ids)
+
+        executor = get_products_request_executor()
+        # Each request runs on a copy of the caller context, so a profiled request records them
+        futures = [
+            executor.submit(contextvars.copy_context().run, self.request_product_or_none, id) for id in ids
+        ]
+        done, not_done = wait(futures, timeout=remaining_time)
+        for future in not_done:
+            future.cancel()
+        products = [future.result() if future in done else None for future in futures]
+        abandoned = len(not_done)
+
+        failures = products.count(None) - abandoned
+        breaker.release(state, successes=len(products) - abandoned - failures, failures=failures)
+        return products
+
+    def get_product_lock_key(self, id):
+        return f"lock:{id}"
+
+    @profiled("cache")
+    def acquire_product_locks(self, ids):
+        """
+        Try to acquire the redis lock of every given id using a single pipelined round trip, returning the
+        ids acquired. Locks expire by themselves after LUIZALABS_API_LOCK_TIMEOUT.
+        """
+        if not ids:
+            return []
+
+        pipeline = cache.client.get_client(write=True).pipeline()
+        for id in ids:
+            cache.client.set(
+                self.get_product_lock_key(id),
+                1,
+                settings.LUIZALABS_API_LOCK_TIMEOUT,
+                nx=True,
+                client=pipeline,
+            )
+        return [id for id, acquired in zip(ids, pipeline.execute()) if acquired]
+
+    def release_product_locks(self, ids):
+        if ids:
+            cache.delete_many([self.get_product_lock_key(id) for id in ids])
+
+    def get_lock_wait_deadline(self):
+        deadline = time.monotonic() + settings.LUIZALABS_API_LOCK_WAIT
+        return deadline if self.deadline is None else min(deadline, self.deadline)
+
+    def wait_products_on_cache(self, ids):
+        """
+        Wait up to LUIZALABS_API_LOCK_WAIT for the given ids, locked by another worker, to be stored on cache.
+        """
+        products = {}
+        deadline = self.get_lock_wait_deadline()
+        while ids and time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_INTERVAL)
+            products.update(self.search_products_on_cache(ids))
+            ids = [id for id in ids if id not in products]
+        return products
+
+    def fetch_locked_products(self, ids):
+        """
+        Lock the given ids that no other worker is fetching, then request them on external_api and store them
+        on cache. Returns the locked ids and the {id: data} mapping of the ones fetched.
+        """
+        locked_ids = self.acquire_product_locks(ids)
+        fetched_products = {
+            id: data
+            for id, data in zip(locked_ids, self.request_products_on_external_api(locked_ids))
+            if data is not None
+        }
+        self.store_fetched_products(fetched_products)
+        self.release_product_locks([id for id in locked_ids if id not in fetched_products])
+        return locked_ids, fetched_products
+
+    def refresh_products(self, stale_products):
+        """
+        Refresh the given {id: data} stale products. The ones that external_api fails to return are stored back
+        as the last known good value, to be retried after FAVORITES_ERROR_TIMEOUT. Even when the refresh fails
+        midway, the locks acquired are released and the products version is bumped when any of them changed.
+        """
+        locked_ids, fetched_products = [], {}
+        try:
+            locked_ids = self.acquire_product_locks(list(stale_products))
+            fetched_products = {
+                id: data
+                for id, data in zip(locked_ids, self.request_products_on_external_api(locked_ids))
+                if data is not None
+            }
+            self.store_products_on_cache(fetched_products)
+            self.store_products_on_cache(
+                {id: stale_products[id] for id in locked_ids if id not in fetched_products},
+                settings.FAVORITES_ERROR_TIMEOUT,
+            )
+            self.store_products_on_database(fetched_products)
+        except Exception:
+            logger.exception("Failed to refresh products %s", list(stale_products))
+        finally:
+            self.release_product_locks(locked_ids)
+            if any(data != stale_products[id] for id, data in fetched_products.items()):
+                bump_version(PRODUCTS_VERSION_KEY)
+
+    def refresh_claimed_products(self, stale_products):
+        """
+        Refresh the given {id: data} stale products claimed on products_refresh_single_flight, resolving them
+        once done so they can be refreshed again. It runs on a long-lived thread, so database connections past
+        their lifetime or left broken are closed before and after.
+        """
+        close_old_connections()
+        try:
+            self.refresh_products(stale_products)
+        finally:
+            for id in stale_products:
+                products_refresh_single_flight.resolve(id, None)
+            close_old_connections()
+
+    def refresh_products_on_background(self, stale_products):
+        """
+        Refresh the given {id: data} stale products without blocking the caller. Ids with a refresh already
+        pending in this process are skipped, and ids already being fetched by another worker are skipped by the
+        refresh itself. The refresh runs on a thread without an event loop and outlives the request, so it uses
+        a plain mixin free of the caller deadline.
+        """
+        _, claimed_ids = products_refresh_single_flight.claim(stale_products)
+        if claimed_ids:
+            get_products_refresh_executor().submit(
+                ExternalLuizalabsAPIMixin().refresh_claimed_products,
+                {id: stale_products[id] for id in claimed_ids},
+            )
+
+    def fetch_products(self, ids):
+        """
+        Request the given ids on external_api and store them on cache, only one fetch per id is done at
+        a time across every worker: ids locked by someone else are waited for on cache instead, falling back
+        to a direct request when they don't show up in time.
+        """
+        locked_ids, fetched_products = self.fetch_locked_products(ids)
+
+        waiting_ids = [id for id in ids if id not in locked_ids]
+        products = self.wait_products_on_cache(waiting_ids)
+
+        missing_ids = [id for id in waiting_ids if id not in products]
+        missing_products = {
+            id: data
+            for id, data in zip(missing_ids, self.request_products_on_external_api(missing_ids))
+            if data is not None
+        }
+        self.store_fetched_products(missing_products)
+
+        return {**fetched_products, **products, **missing_products}
+
+    def search_products_on_external_api(self, ids):
+        """
+        Search many ids on external LUIZALABS_API, concurrent searches of the same id inside this process
+        share a single fetch. Returns a {id: data} mapping without the ids whose request failed, or that were
+        still being fetched by someone else at the deadline.
+        """
+        keys = {str(id): id for id in ids}
+        futures, claimed_keys = products_single_flight.claim(keys)
+        products = {}
+        try:
+            products = self.fetch_products(claimed_keys)
+        finally:
+            for key in claimed_keys:
+                products_single_flight.resolve(key, products.get(key))
+
+        done, _ = wait(futures.values(), timeout=self.get_remaining_time())
+        products = {keys[key]: future.result() for key, future in futures.items() if future in done}
+        return {id: data for id, data in products.items() if data is not None}
+
+    def search_products(self, ids, snapshots=None):
+        """
+        Search for many ids at once. Every id is searched on cache in one round trip, then on the given
+        {id: (refresh_at, data)} snapshots read from database. The missing ones are locked and requested
+        concurrently on external_api, then stored back on cache in one more round trip.
+        Results are returned in the same order as the given ids, failed lookups are returned as None.
+        """
+        ids = list(ids)
+        products = self.search_products_on_cache(ids)
+
+        missing_ids = [id for id in ids if id not in products]
+        if missing_ids and snapshots:
+            products.update(self.search_products_on_database({id: snapshots.get(id) for id in missing_ids}))
+            missing_ids = [id for id in ids if id not in products]
+        if missing_ids:
+            products.update(self.search_products_on_external_api(missing_ids))
+
+        return [products.get(id) for id in ids]
+
+    def degrade_failed_products(self, ids, products):
+        """
+        Replace the failed lookups returned by search_products with id-only placeholders flagged as degraded,
+        dropping the products that don't exist.
+        """
+        return [
+            product if product is not None else {"id": id, "degraded": True}
+            for id, product in zip(ids, products)
+            if product != {}
+        ]
+
+    def has_degraded_products(self, products):
+        return any(product.get("degraded") for product in products)
+
     def check_product_existence(self, id):
-        return self.search_product(id) != {}
+        """
+        Check if the given id exists on external_api, raising LuizalabsAPIUnavailable when it can't tell.
+        """
+        product = self.search_product(id)
+        if product is None:
+            raise LuizalabsAPIUnavailable
+        return product != {}
+
+
+class AsyncExternalLuizalabsAPIMixin(ExternalLuizalabsAPIMixin):
+    """
+    Non-blocking twin of ExternalLuizalabsAPIMixin for async views: external LUIZALABS_API requests are made
+    concurrently on the event loop while cache access runs on worker threads.
+    """
+
+    @profiled("upstream")
+    async def request_product_on_external_api(self, id):
+        response = await get_async_luizalabs_api_client().get_product(id, timeout=self.get_remaining_time())
+        if response.status == status.HTTP_404_NOT_FOUND:
+            return {}
+
+        response.raise_for_status()
+        return project_product(await response.json())
+
+    async def search_product_on_external_api(self, id):
+        return (await self.search_products_on_external_api([id])).get(id)
+
+    async def search_product(self, id):
+        cache_value = await sync_to_async(self.search_product_on_cache, thread_sensitive=False)(id)
+        if cache_value is None:
+            return await self.search_product_on_external_api(id)
+        return cache_value
+
+    async def request_product_or_none(self, id):
+        try:
+            return await self.request_product_on_external_api(id)
+        except Exception:
+            logger.exception("Failed to request product %s", id)
+            return None
+
+    async def request_products_on_external_api(self, ids):
+        """
+        Request many ids on external LUIZALABS_API, keeping at most LUIZALABS_API_ASYNC_MAX_IN_FLIGHT requests
+        in flight. Results are returned in the same order as the given ids, every id fails right away while the
+        circuit breaker is open or past the deadline. Requests still running at the deadline are cancelled.
+        """
+        if not ids:
+            return []
+
+        remaining_time = self.get_remaining_time()
+        if remaining_time == 0:
+            return [None] * len(ids)
+
+        breaker = get_luizalabs_api_breaker()
+        state = await sync_to_async(breaker.acquire, thread_sensitive=False)()
+        if state is None:
+            return [None] * len(ids)
+
+        semaphore = asyncio.Semaphore(settings.LUIZALABS_API_ASYNC_MAX_IN_FLIGHT)
+
+        async def request_product(id):
+            async with semaphore:
+                return await self.request_product_or_none(id)
+
+        tasks = [asyncio.ensure_future(request_product(id)) for id in ids]
+        done, pending = await asyncio.wait(tasks, timeout=remaining_time)
+        for task in pending:
+            task.cancel()
+        products = [task.result() if task in done else None for task in tasks]
+
+        failures = products.count(None) - len(pending)
+        await sync_to_async(breaker.release, thread_sensitive=False)(
+            state, successes=len(products) - len(pending) - failures, failures=failures
+        )
+        return products
+
+    async def wait_products_on_cache(self, ids):
+        products = {}
+        deadline = self.get_lock_wait_deadline()
+        while ids and time.monotonic() < deadline:
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+            products.update(await sync_to_async(self.search_products_on_cache, thread_sensitive=False)(ids))
+            ids = [id for id in ids if id not in products]
+        return products
+
+    async def fetch_products(self, ids):
+        locked_ids = await sync_to_async(self.acquire_product_locks, thread_sensitive=False)(ids)
+        fetched_products = {
+            id: data
+            for id, data in zip(locked_ids, await self.request_products_on_external_api(locked_ids))
+            if data is not None
+        }
+        await sync_to_async(self.store_fetched_products)(fetched_products)
+        await sync_to_async(self.release_product_locks, thread_sensitive=False)(
+            [id for id in locked_ids if id not in fetched_products]
+        )
+
+        waiting_ids = [id for id in ids if id not in locked_ids]
+        products = await self.wait_products_on_cache(waiting_ids)
+
+        missing_ids = [id for id in waiting_ids if id not in products]
+        missing_products = {
+            id: data
+            for id, data in zip(missing_ids, await self.request_products_on_external_api(missing_ids))
+            if data is not None
+        }
+        await sync_to_async(self.store_fetched_products)(missing_products)
+
+        return {**fetched_products, **products, **missing_products}
+
+    async def search_products_on_external_api(self, ids):
+        keys = {str(id): id for id in ids}
+        futures, claimed_keys = products_single_flight.claim(keys)
+        products = {}
+        try:
+            products = await self.fetch_products(claimed_keys)
+        finally:
+            for key in claimed_keys:
+                products_single_flight.resolve(key, products.get(key))
+
+        products = {}
+        if futures:
+            # Followers are never cancelled, the future they wait for belongs to whoever claimed it
+            waiters = {key: asyncio.wrap_future(future) for key, future in futures.items()}
+            done, _ = await asyncio.wait(waiters.values(), timeout=self.get_remaining_time())
+            products = {keys[key]: waiter.result() for key, waiter in waiters.items() if waiter in done}
+        return {id: data for id, data in products.items() if data is not None}
+
+    async def search_products(self, ids, snapshots=None):
+        ids = list(ids)
+        products = await sync_to_async(self.search_products_on_cache, thread_sensitive=False)(ids)
+
+        missing_ids = [id for id in ids if id not in products]
+        if missing_ids and snapshots:
+            products.update(self.search_products_on_database({id: snapshots.get(id) for id in missing_ids}))
+            missing_ids = [id for id in ids if id not in products]
+        if missing_ids:
+            products.update(await self.search_products_on_external_api(missing_ids))
+
+        return [products.get(id) for id in ids]
+
+    async def check_product_existence(self, id):
+        product = await self.search_product(id)
+        if product is None:
+            raise LuizalabsAPIUnavailable
+        return product != {}
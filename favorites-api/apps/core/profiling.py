@@ -0,0 +1,155 @@
+import asyncio
+import functools
+import hmac
+import io
+import pstats
+import random
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+PROFILE_ID_HEADER = "X-Profile-Id"
+PROFILE_TOKEN_HEADER = "HTTP_X_PROFILE_TOKEN"
+# Longest SQL kept on the timeline, query parameters are never kept
+MAX_SQL_LENGTH = 500
+
+current_profile = ContextVar("current_profile", default=None)
+
+
+def get_profile_key(id):
+    return f"profile:{id}"
+
+
+def get_profile(id):
+    return cache.get(get_profile_key(id))
+
+
+def should_profile(request):
+    """
+    Profile requests carrying the PROFILING_TOKEN header, or PROFILING_SAMPLE_RATE of all requests.
+    """
+    token = settings.PROFILING_TOKEN
+    if token and hmac.compare_digest(request.META.get(PROFILE_TOKEN_HEADER, "").encode(), token.encode()):
+        return True
+    return settings.PROFILING_SAMPLE_RATE > 0 and random.random() < settings.PROFILING_SAMPLE_RATE
+
+
+class RequestProfile:
+    """
+    Timeline of the database queries, cache operations and upstream calls made while serving a request, along
+    with a call-stack profile of the thread serving it when given. Events are recorded from any thread the
+    request context is copied to.
+    """
+
+    def __init__(self, request, profiler=None):
+        self.id = uuid.uuid4().hex
+        self.method = request.method
+        self.path = request.get_full_path()
+        self.profiler = profiler
+        self.started_at = time.perf_counter()
+        self.events = []
+
+    def record(self, kind, name, started_at, **details):
+        self.events.append(
+            {
+                "kind": kind,
+                "name": name,
+                "start_ms": round((started_at - self.started_at) * 1000, 3),
+                "duration_ms": round((time.perf_counter() - started_at) * 1000, 3),
+                "thread": threading.current_thread().name,
+                **details,
+            }
+        )
+
+    def get_call_stack(self):
+        if self.profiler is None:
+            return None
+        stream = io.StringIO()
+        pstats.Stats(self.profiler, stream=stream).sort_stats("cumulative").print_stats(
+            settings.PROFILING_TOP
+        )
+        return stream.getvalue()
+
+    def save(self, response):
+        cache.set(
+            get_profile_key(self.id),
+            {
+                "id": self.id,
+                "method": self.method,
+                "path": self.path,
+                "status": response.status_code,
+                "duration_ms": round((time.perf_counter() - self.started_at) * 1000, 3),
+                "events": sorted(self.events, key=lambda event: event["start_ms"]),
+                "call_stack": self.get_call_stack(),
+            },
+            settings.PROFILING_TIMEOUT,
+        )
+        response[PROFILE_ID_HEADER] = self.id
+
+
+def profiled(kind):
+    """
+    Record the calls of the decorated function or coroutine function on the timeline of the current profile.
+    Outside a profiled request it costs a single context variable lookup.
+    """
+
+    def decorator(function):
+        if asyncio.iscoroutinefunction(function):
+
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                profile = current_profile.get()
+                if profile is None:
+                    return await function(*args, **kwargs)
+
+                started_at = time.perf_counter()
+                try:
+                    return await function(*args, **kwargs)
+                finally:
+                    profile.record(kind, function.__name__, started_at)
+
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            profile = current_profile.get()
+            if profile is None:
+                return function(*args, **kwargs)
+
+            started_at = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                profile.record(kind, function.__name__, started_at)
+
+        return wrapper
+
+    return decorator
+
+
+def record_query(execute, sql, params, many, context):
+    profile = current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+
+    started_at = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.record("db", context["connection"].alias, started_at, sql=sql[:MAX_SQL_LENGTH])
+
+
+def install_query_recorder(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver(connection_created)
+def install_query_recorder_on_connection(sender, connection, **kwargs):
+    install_query_recorder(connection)
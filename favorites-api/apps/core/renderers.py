@@ -0,0 +1,21 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer encoding with orjson, producing the same compact UTF-8 output several times faster.
+    Dates and times are passed through to the DRF encoder so they keep its format, e.g. the Z suffix for UTC.
+    Unlike JSONRenderer, which refuses them, NaN and infinite floats are rendered as null. Indented responses,
+    e.g. asked through the media type, are left to JSONRenderer.
+    """
+
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if self.get_indent(accepted_media_type or "", renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(data, default=JSONEncoder().default, option=self.options)
@@ -0,0 +1,32 @@
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    In-process de-duplication of concurrent work sharing the same key.
+    The first caller claiming a key must resolve it, every other caller claiming it meanwhile shares the
+    same result instead of doing the work again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._futures = {}
+
+    def claim(self, keys):
+        """
+        Return a future for every given key and the list of keys claimed by this caller.
+        """
+        futures, claimed_keys = {}, []
+        with self._lock:
+            for key in keys:
+                if key not in self._futures:
+                    self._futures[key] = Future()
+                    claimed_keys.append(key)
+                futures[key] = self._futures[key]
+        return futures, claimed_keys
+
+    def resolve(self, key, result):
+        with self._lock:
+            future = self._futures.pop(key)
+        future.set_result(result)
@@ -0,0 +1,27 @@
+from django.http import HttpResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .metrics import get_metrics_registry
+from .profiling import get_profile
+
+
+def metrics(request):
+    """
+    Expose the metrics of every worker process in the Prometheus text format.
+    """
+    return HttpResponse(generate_latest(get_metrics_registry()), content_type=CONTENT_TYPE_LATEST)
+
+
+class ProfileView(APIView):
+    """
+    Profile of a request, by the id returned on its X-Profile-Id header.
+    """
+
+    def get(self, request, id):
+        profile = get_profile(id)
+        if profile is None:
+            raise NotFound()
+        return Response(profile)
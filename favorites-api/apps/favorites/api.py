@@ -1,14 +1,59 @@
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
+from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 
+from .cache import FavoritesResponseCache, bump_favorites_version
 from .models import Customer, Product
-from .serializers import CustomerSerializer, FavoriteListSerializer, FavoriteSerializer, ProductSerializer
-from apps.core.mixins import ExternalLuizalabsAPIMixin
+from .pagination import FavoritePagination, KeysetPagination
+from .serializers import (
+    CreatedAtFilterSerializer,
+    CustomerFilterSerializer,
+    CustomerSerializer,
+    FavoriteBulkSerializer,
+    FavoriteIdSerializer,
+    FavoriteIdsSerializer,
+    FavoriteListSerializer,
+    FavoriteMembershipSerializer,
+    ProductSerializer,
+)
+from apps.core.conditional import is_not_modified, make_etag, not_modified_response
+from apps.core.exceptions import LuizalabsAPIUnavailable
+from apps.core.mixins import (
+    PARTIAL_RESULTS_HEADER,
+    PRODUCTS_VERSION_KEY,
+    ExternalLuizalabsAPIMixin,
+    bump_version,
+)
 
 
+class ListFilterMixin:
+    """
+    Filter the list action by the query params validated by filter_serializer_class.
+    """
+
+    filter_serializer_class = None
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action != "list":
+            return queryset
+
+        serializer = self.filter_serializer_class(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return queryset.filter(**serializer.get_lookups())
+
+
+@method_decorator(name="list", decorator=swagger_auto_schema(query_serializer=CreatedAtFilterSerializer))
 class ProductViewSet(
+    ListFilterMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
@@ -17,68 +62,345 @@ class ProductViewSet(
 ):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    pagination_class = KeysetPagination
+    filter_serializer_class = CreatedAtFilterSerializer
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        serializer.store_products_on_database({serializer.instance.id: serializer.product_details})
 
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        bump_version(PRODUCTS_VERSION_KEY)
+
+
+class CustomerViewSet(ListFilterMixin, viewsets.ModelViewSet):
+    """
+    Customers are answered with an ETag of their ids and update times, computed before serializing them.
+    """
 
-class CustomerViewSet(viewsets.ModelViewSet):
     queryset = Customer.objects.all()
     serializer_class = CustomerSerializer
+    pagination_class = KeysetPagination
+    filter_serializer_class = CustomerFilterSerializer
+
+    @swagger_auto_schema(query_serializer=CustomerFilterSerializer)
+    def list(self, request, *args, **kwargs):
+        """
+        The ETag of a page also covers its links, which change when customers are added past either end.
+        """
+        customers = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        etag = make_etag(
+            request.accepted_media_type,
+            [(customer.id, customer.updated_at) for customer in customers],
+            self.paginator.get_next_link(),
+            self.paginator.get_previous_link(),
+        )
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+
+        serializer = self.get_serializer(customers, many=True)
+        return Response(self.paginator.get_paginated_data(serializer.data), headers={"ETag": etag})
+
+    def retrieve(self, request, *args, **kwargs):
+        customer = self.get_object()
+        etag = make_etag(request.accepted_media_type, customer.id, customer.updated_at)
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+
+        serializer = self.get_serializer(customer)
+        return Response(serializer.data, headers={"ETag": etag})
+
+    def perform_destroy(self, instance):
+        customer_pk = instance.pk
+        super().perform_destroy(instance)
+        bump_favorites_version(customer_pk)
 
 
 class FavoriteViewSet(viewsets.ViewSet, ExternalLuizalabsAPIMixin):
     def get_object(self, customer_pk):
         return get_object_or_404(Customer, id=customer_pk)
 
-    @swagger_auto_schema(responses={200: FavoriteListSerializer(many=True)})
+    @swagger_auto_schema(
+        responses={200: FavoriteListSerializer(many=True)},
+        manual_parameters=[
+            openapi.Parameter("cursor", openapi.IN_QUERY, type=openapi.TYPE_STRING),
+            openapi.Parameter("page_size", openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+        ],
+    )
     def list(self, request, customer_pk, *args, **kwargs):
-        qs = self.get_object(customer_pk).favorites.all()
-        products = [self.search_product(product.id) for product in qs]
+        """
+        The page of favorites is read along with the products snapshots in a single query, the customer is
+        only looked up when the page is empty. Complete JSON pages are cached as rendered, so a repeated request
+        is answered from a single redis round trip.
+        Pages whose products all have a usable snapshot are built from those snapshots alone, and answered with
+        an ETag of their favorites, snapshots times and page links, which change when favorites are added past
+        either end, so the ETag always describes the details served. A matching If-None-Match is answered
+        before serializing them. Pages with products whose snapshot is missing or expired are searched on cache
+        and external_api, and have no ETag.
+        """
+        response_cache = self.get_response_cache(request, customer_pk)
+        if response_cache is not None:
+            cached_page = response_cache.get()
+            if cached_page is not None:
+                etag, content = cached_page
+                if etag is not None and is_not_modified(request, etag):
+                    return not_modified_response(etag)
+                response = HttpResponse(content, content_type=request.accepted_renderer.media_type)
+                if etag is not None:
+                    response["ETag"] = etag
+                return response
+
+        qs = Customer.favorites.through.objects.filter(customer_id=customer_pk).select_related("product")
+
+        paginator = FavoritePagination()
+        page = paginator.paginate_queryset(qs, request, view=self)
+        if not page:
+            self.get_object(customer_pk)
+        ids = [favorite.product_id for favorite in page]
+        snapshot_products = self.search_products_on_database(
+            {favorite.product_id: favorite.product.snapshot for favorite in page}
+        )
+        etag = None
+        if len(snapshot_products) == len(ids):
+            etag = make_etag(
+                request.build_absolute_uri(),
+                request.accepted_media_type,
+                ids,
+                [favorite.product.fetched_at for favorite in page],
+                paginator.get_next_link(),
+                paginator.get_previous_link(),
+            )
+            if is_not_modified(request, etag):
+                return not_modified_response(etag)
+            products = [snapshot_products[id] for id in ids]
+        else:
+            missing_ids = [id for id in ids if id not in snapshot_products]
+            luizalabs_api = self.with_deadline(settings.FAVORITES_LIST_DEADLINE)
+            snapshot_products.update(zip(missing_ids, luizalabs_api.search_products(missing_ids)))
+            products = [snapshot_products[id] for id in ids]
+        products = self.degrade_failed_products(ids, products)
 
         serializer_class = self.get_serializer_class(request)
         serializer = serializer_class(products, many=True)
-        return Response(serializer.data)
+        response = paginator.get_paginated_response(serializer.data)
+        if self.has_degraded_products(products):
+            response[PARTIAL_RESULTS_HEADER] = "true"
+            return response
+
+        if etag is not None:
+            response["ETag"] = etag
+        if response_cache is not None:
+            response.add_post_render_callback(lambda response: response_cache.set(etag, response.content))
+        return response
+
+    def get_response_cache(self, request, customer_pk):
+        """
+        The cache of the requested favorites page, or None when it isn't cacheable.
+        """
+        if settings.FAVORITES_RESPONSE_CACHE_TIMEOUT <= 0 or request.accepted_renderer.format != "json":
+            return None
+        return FavoritesResponseCache(customer_pk, request.build_absolute_uri())
 
     @swagger_auto_schema(responses={200: FavoriteListSerializer})
     def retrieve(self, request, customer_pk, pk, *args, **kwargs):
-        favorite = self.get_object(customer_pk).favorites.get(id=pk)
-        detailed_product = self.search_product(favorite.id)
+        """
+        Products with a usable snapshot are served from it, answered with an ETag of its time. The others are
+        searched on cache and external Luizalabs API, without an ETag.
+        """
+        id = self.get_valid_id(pk)
+        favorite = (
+            Customer.favorites.through.objects.filter(customer_id=customer_pk, product_id=id)
+            .select_related("product")
+            .first()
+        )
+        if favorite is None:
+            raise Http404
+
+        headers = {}
+        snapshot_products = self.search_products_on_database({favorite.product_id: favorite.product.snapshot})
+        if snapshot_products:
+            headers["ETag"] = make_etag(
+                request.build_absolute_uri(), request.accepted_media_type, favorite.product.fetched_at
+            )
+            if is_not_modified(request, headers["ETag"]):
+                return not_modified_response(headers["ETag"])
+            detailed_product = snapshot_products[favorite.product_id]
+        else:
+            detailed_product = self.search_product(id)
+            if detailed_product is None:
+                raise LuizalabsAPIUnavailable
 
         serializer_class = self.get_serializer_class(request)
         serializer = serializer_class(detailed_product, many=False)
-        return Response(serializer.data)
+        return Response(serializer.data, headers=headers)
 
-    @swagger_auto_schema(responses={201: "", 304: ""}, request_body=FavoriteSerializer)
+    @swagger_auto_schema(responses={201: "", 304: ""}, request_body=FavoriteIdSerializer)
     def create(self, request, customer_pk, *args, **kwargs):
-        serializer_class = self.get_serializer_class(request)
+        id = self.get_valid_id(request.data.get("id"))
 
-        favorite_serializer = serializer_class(data=request.data)
-        favorite_serializer.is_valid(raise_exception=True)
+        if self.is_favorite(customer_pk, id):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
 
-        id = request.data.get("id")
+        Favorite = Customer.favorites.through
+        Favorite.objects.bulk_create(
+            [Favorite(customer_id=customer_pk, product_id=id)], ignore_conflicts=True
+        )
+        bump_favorites_version(customer_pk)
+        return Response(status=status.HTTP_201_CREATED)
 
-        product = get_object_or_404(Product, id=id)
+    @swagger_auto_schema(responses={204: "", 304: ""}, request_body=FavoriteIdSerializer)
+    def destroy(self, request, customer_pk, pk, *args, **kwargs):
+        id = self.get_valid_id(pk)
 
-        customer = self.get_object(customer_pk)
-        if not customer.favorites.filter(id=id).exists():
-            customer.favorites.add(product)
-            return Response(status=status.HTTP_201_CREATED)
-        else:
-            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        deleted, _ = Customer.favorites.through.objects.filter(
+            customer_id=customer_pk, product_id=id
+        ).delete()
+        if deleted:
+            bump_favorites_version(customer_pk)
+            return Response(status=status.HTTP_204_NO_CONTENT)
 
-    @swagger_auto_schema(responses={204: "", 304: ""}, request_body=FavoriteSerializer)
-    def destroy(self, request, customer_pk, pk, *args, **kwargs):
-        serializer_class = self.get_serializer_class(request)
+        self.is_favorite(customer_pk, id)
+        return Response(status=status.HTTP_304_NOT_MODIFIED)
 
-        favorite_serializer = serializer_class(data={"id": pk})
-        favorite_serializer.is_valid(raise_exception=True)
+    def get_valid_id(self, id):
+        serializer = FavoriteIdSerializer(data={"id": id})
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data["id"]
 
-        product = get_object_or_404(Product, id=pk)
+    def is_favorite(self, customer_pk, id):
+        """
+        Check in a single query if the product is a favorite of the customer, raising the same errors
+        of a missing product or customer.
+        """
+        favorite = (
+            Product.objects.filter(id=id)
+            .annotate(
+                customer_exists=Exists(Customer.objects.filter(id=customer_pk)),
+                is_favorite=Exists(
+                    Customer.favorites.through.objects.filter(
+                        customer_id=customer_pk, product_id=OuterRef("id")
+                    )
+                ),
+            )
+            .values("customer_exists", "is_favorite")
+            .first()
+        )
+        if favorite is None:
+            raise ValidationError({"id": ["Given id does not exists"]})
+        if not favorite["customer_exists"]:
+            raise Http404
+        return favorite["is_favorite"]
 
-        customer = self.get_object(customer_pk)
-        if customer.favorites.filter(id=pk).exists():
-            customer.favorites.remove(product)
-            return Response(status=status.HTTP_204_NO_CONTENT)
-        else:
-            return Response(status=status.HTTP_304_NOT_MODIFIED)
+    @swagger_auto_schema(responses={200: FavoriteIdsSerializer})
+    @action(detail=False, methods=["get"])
+    def ids(self, request, customer_pk, *args, **kwargs):
+        """
+        List only the ids of the customer favorites, straight from database without searching products details.
+        """
+        ids = list(Customer.objects.filter(id=customer_pk).values_list("favorites", flat=True))
+        if not ids:
+            raise Http404
+        ids = [id for id in ids if id is not None]
+
+        serializer = FavoriteIdsSerializer({"count": len(ids), "ids": ids})
+        return Response(serializer.data)
+
+    @swagger_auto_schema(
+        responses={200: "{<id>: <bool>}"},
+        manual_parameters=[
+            openapi.Parameter("ids", openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True)
+        ],
+    )
+    @action(detail=False, methods=["get"])
+    def contains(self, request, customer_pk, *args, **kwargs):
+        """
+        Check which of the given comma separated product ids are favorites of the customer, in a single query
+        that also finds whether the customer exists.
+        """
+        ids = request.query_params.get("ids", "")
+        serializer = FavoriteMembershipSerializer(data={"ids": [id for id in ids.split(",") if id]})
+        serializer.is_valid(raise_exception=True)
+        ids = list(dict.fromkeys(serializer.validated_data["ids"]))
+
+        Favorite = Customer.favorites.through
+        membership = (
+            Customer.objects.filter(id=customer_pk)
+            .values_list(
+                *(Exists(Favorite.objects.filter(customer_id=OuterRef("id"), product_id=id)) for id in ids)
+            )
+            .first()
+        )
+        if membership is None:
+            raise Http404
+        return Response({str(id): is_favorite for id, is_favorite in zip(ids, membership)})
+
+    @swagger_auto_schema(
+        responses={200: "{added: [<id>], present: [<id>], unknown: [<id>]}"},
+        request_body=FavoriteBulkSerializer,
+    )
+    @action(detail=False, methods=["post"])
+    def bulk(self, request, customer_pk, *args, **kwargs):
+        """
+        Add many products to the customer favorites at once, ignoring the ones already added.
+        """
+        ids, known_ids = self.get_bulk_ids(request, customer_pk)
+        Favorite = Customer.favorites.through
+        present_ids = set(
+            Favorite.objects.filter(customer_id=customer_pk, product_id__in=known_ids).values_list(
+                "product_id", flat=True
+            )
+        )
+
+        added_ids = [id for id in ids if id in known_ids and id not in present_ids]
+        Favorite.objects.bulk_create(
+            [Favorite(customer_id=customer_pk, product_id=id) for id in added_ids], ignore_conflicts=True
+        )
+        if added_ids:
+            bump_favorites_version(customer_pk)
+        return Response(
+            {
+                "added": added_ids,
+                "present": [id for id in ids if id in present_ids],
+                "unknown": [id for id in ids if id not in known_ids],
+            }
+        )
+
+    @swagger_auto_schema(
+        responses={200: "{removed: [<id>], absent: [<id>], unknown: [<id>]}"},
+        request_body=FavoriteBulkSerializer,
+    )
+    @bulk.mapping.delete
+    def bulk_destroy(self, request, customer_pk, *args, **kwargs):
+        """
+        Remove many products from the customer favorites at once, ignoring the ones not added.
+        """
+        ids, known_ids = self.get_bulk_ids(request, customer_pk)
+        favorites = Customer.favorites.through.objects.filter(
+            customer_id=customer_pk, product_id__in=known_ids
+        )
+        present_ids = set(favorites.values_list("product_id", flat=True))
+        favorites.delete()
+        if present_ids:
+            bump_favorites_version(customer_pk)
+
+        return Response(
+            {
+                "removed": [id for id in ids if id in present_ids],
+                "absent": [id for id in ids if id in known_ids and id not in present_ids],
+                "unknown": [id for id in ids if id not in known_ids],
+            }
+        )
+
+    def get_bulk_ids(self, request, customer_pk):
+        serializer = FavoriteBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data["ids"]
+
+        if not Customer.objects.filter(id=customer_pk).exists():
+            raise Http404
+        known_ids = set(Product.objects.filter(id__in=ids).values_list("id", flat=True))
+        return ids, known_ids
 
     def get_serializer_class(self, request):
-        return FavoriteListSerializer if request.method == "GET" else FavoriteSerializer
+        return FavoriteListSerializer if request.method == "GET" else FavoriteIdSerializer
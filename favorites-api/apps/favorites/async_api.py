@@ -0,0 +1,117 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .models import Customer
+from .pagination import FavoritePagination
+from .serializers import FavoriteIdSerializer, FavoriteListSerializer
+from apps.core.exceptions import LuizalabsAPIUnavailable
+from apps.core.mixins import PARTIAL_RESULTS_HEADER, AsyncExternalLuizalabsAPIMixin
+from apps.core.renderers import ORJSONRenderer
+
+luizalabs_api = AsyncExternalLuizalabsAPIMixin()
+
+
+async def authenticate(request):
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        user_auth = await sync_to_async(authentication_class().authenticate)(request)
+        if user_auth is not None:
+            return user_auth[0]
+    return None
+
+
+def async_api_view(view):
+    """
+    Give an async Django view the same authentication and error responses of the DRF views, as DRF views
+    can't be async. Only GET requests are allowed.
+    """
+
+    @wraps(view)
+    async def wrapped_view(request, *args, **kwargs):
+        try:
+            if request.method != "GET":
+                raise exceptions.MethodNotAllowed(request.method)
+
+            request.user = await authenticate(request)
+            if request.user is None:
+                raise exceptions.NotAuthenticated()
+
+            return await view(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            data = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+            return JsonResponse(data, status=exc.status_code, safe=False)
+        except Http404:
+            return JsonResponse({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+
+    return wrapped_view
+
+
+def render_json(data):
+    """
+    Same as JsonResponse, but encoded by the renderer of the DRF views.
+    """
+    return HttpResponse(ORJSONRenderer().render(data), content_type="application/json")
+
+
+@sync_to_async
+def get_favorites_page(request, customer_pk):
+    """
+    Return the paginator, the product ids and the {id: snapshot} products snapshots of the requested page.
+    """
+    qs = Customer.favorites.through.objects.filter(customer_id=customer_pk).select_related("product")
+
+    paginator = FavoritePagination()
+    page = paginator.paginate_queryset(qs, Request(request))
+    if not page:
+        get_object_or_404(Customer, id=customer_pk)
+    ids = [favorite.product_id for favorite in page]
+    return paginator, ids, {favorite.product_id: favorite.product.snapshot for favorite in page}
+
+
+@sync_to_async
+def get_favorite_id(customer_pk, pk):
+    serializer = FavoriteIdSerializer(data={"id": pk})
+    serializer.is_valid(raise_exception=True)
+    id = serializer.validated_data["id"]
+
+    if not Customer.favorites.through.objects.filter(customer_id=customer_pk, product_id=id).exists():
+        raise Http404
+    return id
+
+
+@async_api_view
+async def favorite_list(request, customer_pk):
+    """
+    Async implementation of FavoriteViewSet.list, to be served under an ASGI server.
+    """
+    paginator, ids, snapshots = await get_favorites_page(request, customer_pk)
+    products = luizalabs_api.degrade_failed_products(
+        ids,
+        await luizalabs_api.with_deadline(settings.FAVORITES_LIST_DEADLINE).search_products(ids, snapshots),
+    )
+
+    serializer = FavoriteListSerializer(products, many=True)
+    response = render_json(paginator.get_paginated_data(serializer.data))
+    if luizalabs_api.has_degraded_products(products):
+        response[PARTIAL_RESULTS_HEADER] = "true"
+    return response
+
+
+@async_api_view
+async def favorite_retrieve(request, customer_pk, pk):
+    """
+    Async implementation of FavoriteViewSet.retrieve, to be served under an ASGI server.
+    """
+    id = await get_favorite_id(customer_pk, pk)
+    detailed_product = await luizalabs_api.search_product(id)
+    if detailed_product is None:
+        raise LuizalabsAPIUnavailable
+
+    serializer = FavoriteListSerializer(detailed_product)
+    return render_json(serializer.data)
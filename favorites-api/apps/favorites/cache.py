@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.core.mixins import PRODUCTS_VERSION_KEY, bump_version, get_products_local_cache
+
+
+def get_favorites_version_key(customer_pk):
+    return f"favorites:{customer_pk}:version"
+
+
+def bump_favorites_version(customer_pk):
+    """
+    Invalidate every cached favorites page of the customer.
+    """
+    return bump_version(get_favorites_version_key(customer_pk))
+
+
+class FavoritesResponseCache:
+    """
+    Rendered favorites pages of a customer, keyed by their url. Each page is stored along with the favorites
+    version of the customer and the products version it was built from, bumping either invalidates it.
+    """
+
+    def __init__(self, customer_pk, url):
+        self.version_key = get_favorites_version_key(customer_pk)
+        self.key = f"favorites:{customer_pk}:response:{url}"
+        self.versions = None
+
+    def get(self):
+        """
+        Return the (etag, content) of the cached page, or None when missing or outdated. The versions and the page
+        are read in a single round trip. The local products cache is moved to the products version read, so a
+        page built next isn't stored under it with details of an older version.
+        """
+        values = cache.get_many([self.version_key, PRODUCTS_VERSION_KEY, self.key])
+        self.versions = (values.get(self.version_key, 0), values.get(PRODUCTS_VERSION_KEY, 0))
+        get_products_local_cache().set_version(self.versions[1])
+        versions, etag, content = values.get(self.key, (None, None, None))
+        return (etag, content) if versions == self.versions else None
+
+    def set(self, etag, content):
+        """
+        Store the page content and its etag under the versions read by the last get.
+        """
+        cache.set(self.key, (self.versions, etag, content), settings.FAVORITES_RESPONSE_CACHE_TIMEOUT)
@@ -0,0 +1,43 @@
+# Generated by Django 3.1.14 on 2026-10-18 12:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("favorites", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="brand",
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="fetched_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="image",
+            field=models.URLField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="price",
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="review_score",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="title",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
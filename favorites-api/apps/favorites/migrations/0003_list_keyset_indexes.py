@@ -0,0 +1,21 @@
+# Generated by Django 3.1.14 on 2026-10-18 13:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("favorites", "0002_product_snapshot"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="customer",
+            index=models.Index(fields=["created_at", "id"], name="customer_created_at_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["created_at", "id"], name="product_created_at_id_idx"),
+        ),
+    ]
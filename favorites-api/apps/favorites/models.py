@@ -1,11 +1,64 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 from apps.core.models import TimestampModel, UUIDModel
 
 
 class Product(TimestampModel):
+    """
+    A product known by the API. Along with its id it keeps a snapshot of the details last fetched from Luizalabs
+    API, used when they aren't on cache.
+    """
+
     serializer = "apps.favorites.serializers.ProductSerializer"
+    snapshot_fields = ("title", "price", "image", "brand", "review_score", "fetched_at")
+
     id = models.UUIDField(primary_key=True)
+    title = models.CharField(max_length=255, blank=True)
+    price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    image = models.URLField(max_length=255, blank=True)
+    brand = models.CharField(max_length=100, blank=True)
+    review_score = models.FloatField(null=True, blank=True)
+    fetched_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["created_at", "id"], name="product_created_at_id_idx")]
+
+    @classmethod
+    def from_snapshot(cls, data, fetched_at=None):
+        """
+        Build a product from the details returned by Luizalabs API.
+        """
+        return cls(
+            id=data["id"],
+            title=data.get("title") or "",
+            price=data.get("price"),
+            image=data.get("image") or "",
+            brand=data.get("brand") or "",
+            review_score=data.get("reviewScore"),
+            fetched_at=fetched_at or timezone.now(),
+        )
+
+    @property
+    def snapshot(self):
+        """
+        The (refresh_at, data) details last fetched from Luizalabs API, the same way they are stored on cache,
+        or None when they were never fetched.
+        """
+        if self.fetched_at is None:
+            return None
+
+        refresh_at = self.fetched_at.timestamp() + settings.FAVORITES_EXPIRE_TIMEOUT
+        data = {
+            "id": str(self.id),
+            "title": self.title,
+            "price": float(self.price) if self.price is not None else None,
+            "image": self.image,
+            "brand": self.brand,
+            "reviewScore": self.review_score,
+        }
+        return refresh_at, data
 
 
 class Customer(UUIDModel, TimestampModel):
@@ -14,3 +67,6 @@ class Customer(UUIDModel, TimestampModel):
     email = models.EmailField(unique=True, db_index=True)
     name = models.CharField(max_length=128)
     favorites = models.ManyToManyField(Product, related_name="customer_favorites")
+
+    class Meta:
+        indexes = [models.Index(fields=["created_at", "id"], name="customer_created_at_id_idx")]
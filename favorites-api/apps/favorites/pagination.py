@@ -0,0 +1,112 @@
+import json
+from base64 import b64decode, b64encode
+from collections import namedtuple
+from uuid import UUID
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+# Key of the row a page starts after, or ends before when reverse
+Keyset = namedtuple("Keyset", ["created_at", "id", "reverse"])
+
+
+class FavoritePagination(CursorPagination):
+    """
+    Paginate the customer favorites through table by insertion order, so only the products of the current
+    page have to be searched.
+    """
+
+    ordering = "id"
+    page_size_query_param = "page_size"
+
+    def __init__(self):
+        self.page_size = settings.FAVORITES_PAGE_SIZE
+        self.max_page_size = settings.FAVORITES_MAX_PAGE_SIZE
+
+    def get_paginated_data(self, data):
+        return {"next": self.get_next_link(), "previous": self.get_previous_link(), "results": data}
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Paginate by the (created_at, id) key, seeking past the last row seen on the (created_at, id) index, so any
+    page costs a single query reading page_size + 1 rows however deep it is. Rows sharing created_at are told
+    apart by their id instead of an offset like CursorPagination does.
+    """
+
+    ordering = ("created_at", "id")
+    page_size_query_param = "page_size"
+
+    def __init__(self):
+        self.page_size = settings.LIST_PAGE_SIZE
+        self.max_page_size = settings.LIST_MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+
+        if reverse:
+            queryset = queryset.order_by("-created_at", "-id")
+        else:
+            queryset = queryset.order_by("created_at", "id")
+
+        if self.cursor is not None:
+            created_at, id = self.cursor.created_at, self.cursor.id
+            if reverse:
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at) | Q(id__lt=id), created_at__lte=created_at
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(created_at__gt=created_at) | Q(id__gt=id), created_at__gte=created_at
+                )
+
+        results = list(queryset[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(Keyset(self.page[-1].created_at, self.page[-1].id, reverse=False))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(Keyset(self.page[0].created_at, self.page[0].id, reverse=True))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            data = json.loads(b64decode(encoded.encode("ascii")).decode("ascii"))
+            created_at = parse_datetime(data["c"])
+            if created_at is None:
+                raise ValueError(data["c"])
+            return Keyset(created_at, UUID(data["i"]), bool(data.get("r")))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, cursor):
+        data = {"c": cursor.created_at.isoformat(), "i": str(cursor.id)}
+        if cursor.reverse:
+            data["r"] = 1
+        encoded = b64encode(json.dumps(data).encode("ascii")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_paginated_data(self, data):
+        return {"next": self.get_next_link(), "previous": self.get_previous_link(), "results": data}
@@ -1,4 +1,4 @@
-from django.core.exceptions import ObjectDoesNotExist
+from django.conf import settings
 from rest_framework import serializers
 
 from .models import Customer, Product
@@ -28,6 +28,13 @@ class ProductSerializer(serializers.ModelSerializer, ExternalLuizalabsAPIMixin):
             return id
         raise serializers.ValidationError(f"The id {id} wasn't found at Luizalabs products API")
 
+    def search_product(self, id):
+        """
+        Keep the details found while validating the id, they are the first snapshot of the created product.
+        """
+        self.product_details = super().search_product(id)
+        return self.product_details
+
     class Meta:
         model = Product
         fields = (
@@ -37,22 +44,82 @@ class ProductSerializer(serializers.ModelSerializer, ExternalLuizalabsAPIMixin):
         )
 
 
-class FavoriteSerializer(serializers.Serializer):
+class CreatedAtFilterSerializer(serializers.Serializer):
+    """
+    Query params filtering a list by creation time, created_before excluded. Each one maps to its lookup.
+    """
+
+    lookups = {"created_after": "created_at__gte", "created_before": "created_at__lt"}
+
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+
+    def get_lookups(self):
+        return {self.lookups[name]: value for name, value in self.validated_data.items()}
+
+
+class CustomerFilterSerializer(CreatedAtFilterSerializer):
+    lookups = {**CreatedAtFilterSerializer.lookups, "email": "email"}
+
+    email = serializers.EmailField(required=False)
+
+
+class FavoriteIdSerializer(serializers.Serializer):
     id = serializers.UUIDField()
 
-    def validate_id(self, id):
-        try:
-            Product.objects.get(id=id)
-        except ObjectDoesNotExist:
-            raise serializers.ValidationError("Given id does not exists")
-        else:
-            return id
+
+def str_or_none(value):
+    return None if value is None else str(value)
 
 
 class FavoriteListSerializer(serializers.Serializer):
+    """
+    Product details of a favorite. When they couldn't be fetched only the id is returned, flagged as degraded.
+    """
+
     id = serializers.UUIDField()
     title = serializers.CharField(max_length=255)
     price = serializers.DecimalField(max_digits=10, decimal_places=2)
     image = serializers.URLField()
     brand = serializers.CharField(max_length=100)
     reviewScore = serializers.FloatField(allow_null=True)
+    degraded = serializers.BooleanField(required=False)
+
+    def to_representation(self, instance):
+        """
+        Build the same output of the declared fields straight from the product dict, running every field through
+        the generic Serializer.to_representation dominates the CPU time of a warm favorites list.
+        """
+        if instance.get("degraded"):
+            return {"id": str(instance["id"]), "degraded": True}
+
+        price = instance["price"]
+        review_score = instance.get("reviewScore")
+        return {
+            "id": str_or_none(instance["id"]),
+            "title": str_or_none(instance["title"]),
+            "price": None if price is None else self.fields["price"].to_representation(price),
+            "image": str_or_none(instance["image"]),
+            "brand": str_or_none(instance["brand"]),
+            "reviewScore": None if review_score is None else float(review_score),
+        }
+
+
+class FavoriteIdsSerializer(serializers.Serializer):
+    count = serializers.IntegerField()
+    ids = serializers.ListField(child=serializers.UUIDField())
+
+
+class FavoriteMembershipSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, max_length=100)
+
+
+class FavoriteBulkSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False)
+
+    def validate_ids(self, ids):
+        if len(ids) > settings.FAVORITES_BULK_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"Ensure this field has no more than {settings.FAVORITES_BULK_MAX_SIZE} elements."
+            )
+        return list(dict.fromkeys(ids))
@@ -1,7 +1,7 @@
 from django.conf.urls import include, re_path
 from rest_framework_nested import routers
 
-from . import api
+from . import api, async_api
 
 app_name = "favorites"
 
@@ -17,4 +17,14 @@ customer_router.register(r"favorites", api.FavoriteViewSet, basename="customer-f
 urlpatterns = [
     re_path(r"^", include(router.urls)),
     re_path(r"^", include(customer_router.urls)),
+    re_path(
+        r"^async/customers/(?P<customer_pk>[^/.]+)/favorites/$",
+        async_api.favorite_list,
+        name="async-customer-favorites-list",
+    ),
+    re_path(
+        r"^async/customers/(?P<customer_pk>[^/.]+)/favorites/(?P<pk>[^/.]+)/$",
+        async_api.favorite_retrieve,
+        name="async-customer-favorites-detail",
+    ),
 ]
@@ -0,0 +1,237 @@
+"""
+Load test the favorites, customers and products endpoints against a local stub of the Luizalabs products API,
+reporting throughput and p50/p95/p99 latencies as JSON so runs of different releases can be compared.
+
+The favorites list is measured for every combination of favorites per customer and products cache hit ratio:
+each request lists a customer of its own, whose given ratio of products is stored on cache beforehand while
+the rest is fetched from the stub. Run it from the favorites-api folder, a test database is created and
+destroyed by the benchmark, and its cache keys are kept apart on REDIS_URL under their own key prefix:
+
+    python -m benchmarks.load --favorites 1 20 100 --hit-ratios 0 0.5 1 --latency 0.05 --jitter 0.05 \\
+        --error-rate 0.01 --output load.json
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "favorites_api.settings")
+django.setup()
+
+from benchmarks.upstream import LuizalabsAPIStub, build_product  # noqa: E402
+from django.conf import settings  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.db import connections  # noqa: E402
+from django.test.utils import override_settings, setup_databases, teardown_databases  # noqa: E402
+from rest_framework.reverse import reverse  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+from rest_framework_simplejwt.tokens import AccessToken  # noqa: E402
+
+from apps.core.mixins import PARTIAL_RESULTS_HEADER  # noqa: E402
+from apps.core.mixins import (  # noqa: E402
+    ExternalLuizalabsAPIMixin,
+    get_products_local_cache,
+    project_product,
+)
+from apps.favorites.models import Customer  # noqa: E402
+from tests.factories import CustomerFactory, ProductFactory  # noqa: E402
+
+
+def percentile(latencies, percent):
+    """
+    Nearest-rank percentile of the sorted latencies.
+    """
+    if not latencies:
+        return None
+    rank = max(math.ceil(percent / 100 * len(latencies)), 1)
+    return latencies[rank - 1]
+
+
+def summarize(latencies, elapsed, statuses, partial):
+    latencies = sorted(latencies)
+    to_ms = lambda seconds: None if seconds is None else round(seconds * 1000, 2)  # noqa: E731
+    return {
+        "requests": len(latencies),
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "p50_ms": to_ms(percentile(latencies, 50)),
+        "p95_ms": to_ms(percentile(latencies, 95)),
+        "p99_ms": to_ms(percentile(latencies, 99)),
+        "max_ms": to_ms(latencies[-1] if latencies else None),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "partial": partial,
+    }
+
+
+class LoadRunner:
+    """
+    Request urls from concurrency threads, each with its own authenticated client.
+    """
+
+    def __init__(self, authorization, concurrency):
+        self.authorization = authorization
+        self.concurrency = concurrency
+        self._local = threading.local()
+
+    def get_client(self):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=self.authorization)
+        return client
+
+    def request(self, url):
+        started_at = time.perf_counter()
+        response = self.get_client().get(url)
+        elapsed = time.perf_counter() - started_at
+        return elapsed, response.status_code, PARTIAL_RESULTS_HEADER in response
+
+    def run(self, urls):
+        started_at = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            outcomes = list(executor.map(self.request, urls))
+        elapsed = time.perf_counter() - started_at
+
+        return summarize(
+            [latency for latency, _, _ in outcomes],
+            elapsed,
+            Counter(status for _, status, _ in outcomes),
+            sum(partial for _, _, partial in outcomes),
+        )
+
+
+def create_customers(count, favorites):
+    customers = CustomerFactory.create_batch(count)
+    for customer in customers:
+        customer.favorites.add(*ProductFactory.create_batch(favorites))
+    return customers
+
+
+def warm_products_cache(customers, hit_ratio):
+    """
+    Store on cache the hit_ratio first favorites of every customer, as the stub would have answered them.
+    """
+    products = {}
+    for customer in customers:
+        favorites = Customer.favorites.through.objects.filter(customer=customer).order_by("id")
+        ids = list(favorites.values_list("product_id", flat=True))
+        for id in ids[: round(len(ids) * hit_ratio)]:
+            products[str(id)] = project_product(build_product(str(id)))
+    ExternalLuizalabsAPIMixin().store_products_on_cache(products)
+
+
+def get_benchmark_caches():
+    """
+    The configured caches with their own key prefix, so resetting them between scenarios only drops the keys
+    written by the benchmark instead of flushing the whole REDIS_URL database.
+    """
+    return {"default": {**settings.CACHES["default"], "KEY_PREFIX": "benchmark"}}
+
+
+def reset_caches():
+    cache.delete_pattern("*")
+    get_products_local_cache().clear()
+
+
+def run_favorites(runner, upstream, args):
+    results = []
+    for favorites in args.favorites:
+        for hit_ratio in args.hit_ratios:
+            reset_caches()
+            customers = create_customers(args.requests, favorites)
+            warm_products_cache(customers, hit_ratio)
+
+            page_size = min(favorites, settings.FAVORITES_MAX_PAGE_SIZE)
+            urls = [
+                reverse("favorites:customer-favorites-list", [customer.id]) + f"?page_size={page_size}"
+                for customer in customers
+            ]
+            calls = upstream.calls
+            result = runner.run(urls)
+            results.append(
+                {
+                    "endpoint": "favorites-list",
+                    "favorites": favorites,
+                    "hit_ratio": hit_ratio,
+                    "upstream_calls": upstream.calls - calls,
+                    **result,
+                }
+            )
+    return results
+
+
+def run_customers_and_products(runner, args):
+    reset_caches()
+    customers = CustomerFactory.create_batch(args.customers)
+    ProductFactory.create_batch(args.products)
+
+    scenarios = {
+        "customers-list": [reverse("favorites:customers-list")] * args.requests,
+        "customers-detail": [
+            reverse("favorites:customers-detail", [customers[index % len(customers)].id])
+            for index in range(args.requests)
+        ],
+        "products-list": [reverse("favorites:products-list")] * args.requests,
+    }
+    return [{"endpoint": endpoint, **runner.run(urls)} for endpoint, urls in scenarios.items()]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--requests", type=int, default=50, help="Requests of every scenario")
+    parser.add_argument("--concurrency", type=int, default=4, help="Threads requesting at the same time")
+    parser.add_argument(
+        "--favorites", type=int, nargs="+", default=[1, 20, 100], help="Favorites per customer to measure"
+    )
+    parser.add_argument(
+        "--hit-ratios",
+        type=float,
+        nargs="+",
+        default=[0, 0.5, 0.9, 1],
+        help="Ratios of the favorited products found on cache to measure",
+    )
+    parser.add_argument(
+        "--customers", type=int, default=100, help="Customers listed by the customers scenarios"
+    )
+    parser.add_argument("--products", type=int, default=100, help="Products listed by the products scenario")
+    parser.add_argument("--latency", type=float, default=0.05, help="Latency in seconds of the products API")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Random extra latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0, help="Ratio of products API requests failing")
+    parser.add_argument("--output", help="File to write the JSON report to besides the standard output")
+    args = parser.parse_args()
+
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        from django.contrib.auth.models import User
+
+        user = User.objects.create_user(username="benchmark", password="benchmark")
+        runner = LoadRunner(f"Bearer {AccessToken.for_user(user)}", args.concurrency)
+
+        with LuizalabsAPIStub(
+            latency=args.latency, jitter=args.jitter, error_rate=args.error_rate
+        ) as upstream, override_settings(LUIZALABS_API_URL=upstream.url, CACHES=get_benchmark_caches()):
+            results = run_favorites(runner, upstream, args) + run_customers_and_products(runner, args)
+    finally:
+        connections.close_all()
+        teardown_databases(old_config, verbosity=0)
+
+    report = json.dumps(
+        {"parameters": vars(args), "python": platform.python_version(), "results": results}, indent=2
+    )
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(report + "\n")
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Micro-benchmarks of the code every favorites request goes through, reported as JSON: the serialization and
+rendering of a favorites page, the encoding of the products stored on redis, and the overhead the metrics and
+unsampled profiling middlewares add to each request.
+
+Run it from the favorites-api folder, no database nor redis is needed:
+
+    python -m benchmarks.micro --rounds 5000
+"""
+import argparse
+import json
+import os
+import platform
+import time
+from uuid import uuid4
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "favorites_api.settings")
+django.setup()
+
+from benchmarks.upstream import build_product  # noqa: E402
+from django.http import HttpResponse  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+from django.urls import resolve  # noqa: E402
+from django_redis.compressors.identity import IdentityCompressor  # noqa: E402
+from django_redis.compressors.zlib import ZlibCompressor  # noqa: E402
+from django_redis.serializers.pickle import PickleSerializer  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from apps.core.middleware import MetricsMiddleware, ProfilingMiddleware  # noqa: E402
+from apps.core.mixins import pack_product, project_product  # noqa: E402
+from apps.core.profiling import profiled  # noqa: E402
+from apps.core.renderers import ORJSONRenderer  # noqa: E402
+from apps.favorites.serializers import FavoriteListSerializer  # noqa: E402
+from tests.favorites.test_serializers import GenericFavoriteListSerializer  # noqa: E402
+
+
+def measure(function, rounds):
+    """
+    Seconds taken by each call of function, averaged over rounds calls.
+    """
+    started_at = time.perf_counter()
+    for _ in range(rounds):
+        function()
+    return (time.perf_counter() - started_at) / rounds
+
+
+def to_us(seconds):
+    return round(seconds * 1e6, 2)
+
+
+def benchmark_serialization(rounds):
+    """
+    Serialize and render a page of favorites the generic way, then the fast way, in items per second.
+    """
+    products = [{**build_product(str(uuid4())), "price": 10 + index / 7} for index in range(500)]
+    rounds = max(rounds // 1000, 1)
+
+    def render(serializer_class, renderer_class):
+        return lambda: renderer_class().render(serializer_class(products, many=True).data)
+
+    generic = len(products) / measure(render(GenericFavoriteListSerializer, JSONRenderer), rounds)
+    fast = len(products) / measure(render(FavoriteListSerializer, ORJSONRenderer), rounds)
+    return {
+        "generic_items_per_second": round(generic),
+        "fast_items_per_second": round(fast),
+        "speedup": round(fast / generic, 2),
+    }
+
+
+def benchmark_products_encoding(rounds):
+    """
+    Bytes per product stored on redis and the time to encode and decode them, between the whole upstream product
+    pickled as is and the packed product compressed.
+    """
+    upstream_product = {
+        **build_product(str(uuid4())),
+        "description": "Cadeira para auto do grupo 1, de 9 a 18kg.",
+    }
+    serializer = PickleSerializer({})
+
+    def encoding(value, compressor):
+        encoded = compressor.compress(serializer.dumps(value))
+        return {
+            "bytes": len(encoded),
+            "encode_us": to_us(measure(lambda: compressor.compress(serializer.dumps(value)), rounds)),
+            "decode_us": to_us(measure(lambda: serializer.loads(compressor.decompress(encoded)), rounds)),
+        }
+
+    return {
+        "whole": encoding((time.time(), upstream_product), IdentityCompressor({})),
+        "packed": encoding(
+            (time.time(), pack_product(project_product(upstream_product))), ZlibCompressor({})
+        ),
+    }
+
+
+def benchmark_metrics_middleware(rounds):
+    """
+    Overhead the metrics middleware adds to each request of a trivial view.
+    """
+    request = RequestFactory().get("/v1/customers/")
+    request.resolver_match = resolve("/v1/customers/")
+    response = HttpResponse()
+    middleware = MetricsMiddleware(lambda request: response)
+
+    bare = measure(lambda: response, rounds)
+    instrumented = measure(lambda: middleware(request), rounds)
+    return {"overhead_us": to_us(instrumented - bare)}
+
+
+def benchmark_unsampled_profiling(rounds):
+    """
+    Overhead the profiling middleware and decorator add to each request that isn't sampled.
+    """
+    request = RequestFactory().get("/v1/customers/")
+    response = HttpResponse()
+
+    def search():
+        return response
+
+    profiled_search = profiled("cache")(search)
+    middleware = ProfilingMiddleware(lambda request: profiled_search())
+
+    with override_settings(PROFILING_TOKEN="", PROFILING_SAMPLE_RATE=0):
+        bare = measure(search, rounds)
+        unsampled = measure(lambda: middleware(request), rounds)
+    return {"overhead_us": to_us(unsampled - bare)}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--rounds", type=int, default=5000, help="Calls averaged by every measure")
+    args = parser.parse_args()
+
+    results = {
+        "serialization": benchmark_serialization(args.rounds),
+        "products_encoding": benchmark_products_encoding(args.rounds),
+        "metrics_middleware": benchmark_metrics_middleware(args.rounds),
+        "unsampled_profiling": benchmark_unsampled_profiling(args.rounds),
+    }
+    print(
+        json.dumps(
+            {"parameters": vars(args), "python": platform.python_version(), "results": results}, indent=2
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Compare how many favorites lists a single sync worker and a single async worker serve per second when
+the Luizalabs products API is slow and the cache is cold.
+
+Run it from the favorites-api folder, a test database is created and destroyed by the benchmark:
+
+    python -m benchmarks.sync_vs_async --requests 20 --favorites 20 --latency 0.1
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "favorites_api.settings")
+django.setup()
+
+from benchmarks.upstream import LuizalabsAPIStub  # noqa: E402
+from django.test import AsyncClient  # noqa: E402
+from django.test.utils import override_settings, setup_databases, teardown_databases  # noqa: E402
+from rest_framework.reverse import reverse  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+from rest_framework_simplejwt.tokens import AccessToken  # noqa: E402
+
+from apps.core.clients import close_async_luizalabs_api_client  # noqa: E402
+from apps.core.mixins import get_products_local_cache  # noqa: E402
+from tests.factories import CustomerFactory, ProductFactory  # noqa: E402
+
+
+def create_customers(count, favorites):
+    customers = CustomerFactory.create_batch(count)
+    for customer in customers:
+        customer.favorites.add(*ProductFactory.create_batch(favorites))
+    return customers
+
+
+def run_sync(user, customers):
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    for customer in customers:
+        response = client.get(reverse("favorites:customer-favorites-list", [customer.id]))
+        assert response.status_code == 200, response.status_code
+
+
+async def run_async(user, customers):
+    client = AsyncClient()
+    authorization = f"Bearer {AccessToken.for_user(user)}"
+
+    responses = await asyncio.gather(
+        *(
+            client.get(
+                reverse("favorites:async-customer-favorites-list", [customer.id]), authorization=authorization
+            )
+            for customer in customers
+        )
+    )
+    for response in responses:
+        assert response.status_code == 200, response.status_code
+
+    await close_async_luizalabs_api_client()
+
+
+def measure(run, *args):
+    get_products_local_cache().clear()
+    started_at = time.perf_counter()
+    run(*args)
+    elapsed = time.perf_counter() - started_at
+    return {"seconds": round(elapsed, 3), "requests_per_second": round(len(args[-1]) / elapsed, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--requests", type=int, default=20, help="Favorites lists requested by each worker")
+    parser.add_argument("--favorites", type=int, default=20, help="Favorites of each customer")
+    parser.add_argument("--latency", type=float, default=0.1, help="Latency in seconds of the products API")
+    args = parser.parse_args()
+
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        from django.contrib.auth.models import User
+
+        user = User.objects.create_user(username="benchmark", password="benchmark")
+        sync_customers = create_customers(args.requests, args.favorites)
+        async_customers = create_customers(args.requests, args.favorites)
+
+        with LuizalabsAPIStub(latency=args.latency) as upstream, override_settings(
+            LUIZALABS_API_URL=upstream.url
+        ):
+            results = {
+                "sync": measure(run_sync, user, sync_customers),
+                "async": measure(lambda *run_args: asyncio.run(run_async(*run_args)), user, async_customers),
+            }
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+    print(json.dumps({"parameters": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PRODUCT_PATH = re.compile(r"^/api/product/(?P<id>[^/]+)/$")
+
+
+def build_product(id):
+    return {
+        "reviewScore": 4.352941,
+        "price": 1699.0,
+        "image": f"http://challenge-api.luizalabs.com/images/{id}.jpg",
+        "brand": "bébé confort",
+        "id": id,
+        "title": "Cadeira para Auto Iseos Bébé Confort Earth Brown",
+    }
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class LuizalabsAPIStub:
+    """
+    Local stand-in for the Luizalabs products API, answering every product id after latency plus up to
+    jitter seconds and failing with a 503 on error_rate of the requests.
+    """
+
+    def __init__(self, latency=0.05, jitter=0, error_rate=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._server = StubServer(("127.0.0.1", 0), self.build_handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def build_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with stub._lock:
+                    stub.calls += 1
+                time.sleep(stub.latency + random.uniform(0, stub.jitter))
+
+                match = PRODUCT_PATH.match(self.path)
+                if match is None:
+                    self.respond(404, {"error_message": "Not found", "code": "not_found"})
+                elif random.random() < stub.error_rate:
+                    self.respond(503, {"error_message": "Service unavailable", "code": "unavailable"})
+                else:
+                    self.respond(200, build_product(match.group("id")))
+
+            def respond(self, status_code, data):
+                body = json.dumps(data).encode()
+                self.send_response(status_code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
@@ -44,6 +44,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "apps.core.middleware.MetricsMiddleware",
+    "apps.core.middleware.ProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -87,7 +89,10 @@ CACHES = {
     "default": {
         "BACKEND": "django_redis.cache.RedisCache",
         "LOCATION": env("REDIS_URL"),
-        "OPTIONS": {"CLIENT_CLASS": "django_redis.client.DefaultClient"},
+        "OPTIONS": {
+            "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            "COMPRESSOR": env("REDIS_COMPRESSOR", "django_redis.compressors.zlib.ZlibCompressor"),
+        },
         "KEY_PREFIX": "django_orm",
     }
 }
@@ -109,7 +114,11 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
-    "DEFAULT_AUTHENTICATION_CLASSES": ("rest_framework_simplejwt.authentication.JWTAuthentication",),
+    "DEFAULT_AUTHENTICATION_CLASSES": ("apps.core.authentication.CachedJWTAuthentication",),
+    "DEFAULT_RENDERER_CLASSES": (
+        "apps.core.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
 }
 
 SIMPLE_JWT = {
@@ -130,7 +139,45 @@ STATIC_URL = "/static/"
 
 django_heroku.settings(locals())
 
+# django_heroku adds the sync only WhiteNoise middleware, which would serialize async views under ASGI
+MIDDLEWARE = [
+    "apps.core.middleware.WhiteNoiseMiddleware"
+    if middleware == "whitenoise.middleware.WhiteNoiseMiddleware"
+    else middleware
+    for middleware in MIDDLEWARE
+]
+
 # Project configuration
 
 FAVORITES_EXPIRE_TIMEOUT = env.int("FAVORITES_EXPIRE_TIMEOUT")
+FAVORITES_STALE_TIMEOUT = env.int("FAVORITES_STALE_TIMEOUT", 3600)
+FAVORITES_EXPIRE_JITTER = env.float("FAVORITES_EXPIRE_JITTER", 0.1)
+FAVORITES_NOT_FOUND_TIMEOUT = env.int("FAVORITES_NOT_FOUND_TIMEOUT", 3600)
+FAVORITES_ERROR_TIMEOUT = env.int("FAVORITES_ERROR_TIMEOUT", 30)
+FAVORITES_LOCAL_CACHE_SIZE = env.int("FAVORITES_LOCAL_CACHE_SIZE", 5000)
+FAVORITES_LOCAL_CACHE_TIMEOUT = env.int("FAVORITES_LOCAL_CACHE_TIMEOUT", 60)
+FAVORITES_PAGE_SIZE = env.int("FAVORITES_PAGE_SIZE", 20)
+FAVORITES_MAX_PAGE_SIZE = env.int("FAVORITES_MAX_PAGE_SIZE", 100)
+LIST_PAGE_SIZE = env.int("LIST_PAGE_SIZE", 100)
+LIST_MAX_PAGE_SIZE = env.int("LIST_MAX_PAGE_SIZE", 1000)
+FAVORITES_BULK_MAX_SIZE = env.int("FAVORITES_BULK_MAX_SIZE", 1000)
+FAVORITES_LIST_DEADLINE = env.float("FAVORITES_LIST_DEADLINE", 2.0)
+FAVORITES_RESPONSE_CACHE_TIMEOUT = env.int("FAVORITES_RESPONSE_CACHE_TIMEOUT", 300)
 LUIZALABS_API_URL = env("LUIZALABS_API_URL")
+LUIZALABS_API_MAX_WORKERS = env.int("LUIZALABS_API_MAX_WORKERS", 10)
+LUIZALABS_API_ASYNC_MAX_IN_FLIGHT = env.int("LUIZALABS_API_ASYNC_MAX_IN_FLIGHT", 100)
+LUIZALABS_API_POOL_SIZE = env.int("LUIZALABS_API_POOL_SIZE", LUIZALABS_API_MAX_WORKERS)
+LUIZALABS_API_CONNECT_TIMEOUT = env.float("LUIZALABS_API_CONNECT_TIMEOUT", 1.0)
+LUIZALABS_API_READ_TIMEOUT = env.float("LUIZALABS_API_READ_TIMEOUT", 3.0)
+LUIZALABS_API_MAX_RETRIES = env.int("LUIZALABS_API_MAX_RETRIES", 2)
+LUIZALABS_API_RETRY_BACKOFF = env.float("LUIZALABS_API_RETRY_BACKOFF", 0.1)
+LUIZALABS_API_LOCK_TIMEOUT = env.float("LUIZALABS_API_LOCK_TIMEOUT", 10.0)
+LUIZALABS_API_BREAKER_THRESHOLD = env.int("LUIZALABS_API_BREAKER_THRESHOLD", 20)
+LUIZALABS_API_BREAKER_WINDOW = env.int("LUIZALABS_API_BREAKER_WINDOW", 30)
+LUIZALABS_API_BREAKER_RESET_TIMEOUT = env.int("LUIZALABS_API_BREAKER_RESET_TIMEOUT", 30)
+LUIZALABS_API_LOCK_WAIT = env.float("LUIZALABS_API_LOCK_WAIT", 3.0)
+JWT_USER_CACHE_TIMEOUT = env.int("JWT_USER_CACHE_TIMEOUT", 30)
+PROFILING_TOKEN = env.str("PROFILING_TOKEN", "")
+PROFILING_SAMPLE_RATE = env.float("PROFILING_SAMPLE_RATE", 0.0)
+PROFILING_TIMEOUT = env.int("PROFILING_TIMEOUT", 3600)
+PROFILING_TOP = env.int("PROFILING_TOP", 50)
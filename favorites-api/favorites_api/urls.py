@@ -4,6 +4,8 @@ from drf_yasg.views import get_schema_view
 from rest_framework import permissions
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
+from apps.core.views import ProfileView, metrics
+
 schema_view = get_schema_view(
     openapi.Info(
         title="Favorites API",
@@ -19,9 +21,11 @@ urlpatterns = [
     re_path(r"^v1/", include("apps.favorites.urls", namespace="favorites")),
     re_path(r"^v1/auth/", TokenObtainPairView.as_view(), name="token_obtain_pair_view"),
     re_path(r"^v1/auth/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
+    re_path(r"^v1/profiles/(?P<id>[0-9a-f]{32})/$", ProfileView.as_view(), name="profile"),
     re_path(
         r"^swagger(?P<format>\.json|\.yaml)$", schema_view.without_ui(cache_timeout=0), name="schema-json"
     ),
     re_path(r"^swagger/$", schema_view.with_ui("swagger", cache_timeout=0), name="schema-swagger-ui"),
     re_path(r"^redoc/$", schema_view.with_ui("redoc", cache_timeout=0), name="schema-redoc"),
+    re_path(r"^metrics$", metrics, name="metrics"),
 ]
@@ -1,7 +1,27 @@
+from unittest import mock
+
 import pytest
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from redis.client import Pipeline, Redis
 from rest_framework.test import APIClient
 
+from apps.core.clients import get_luizalabs_api_breaker
+from apps.core.mixins import get_products_local_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_products_local_cache():
+    get_products_local_cache().clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_luizalabs_api_breaker():
+    get_luizalabs_api_breaker.cache_clear()
+    yield
+    breaker = get_luizalabs_api_breaker()
+    cache.delete_many([breaker.get_key(suffix) for suffix in ("tripped", "open", "probe", "failures")])
+
 
 @pytest.fixture
 def id():
@@ -32,3 +52,26 @@ def client_api(user):
     client = APIClient()
     client.force_authenticate(user=user)
     return client
+
+
+@pytest.fixture
+def redis_round_trips():
+    """
+    Record every round trip made to redis, a pipeline is counted as a single round trip.
+    """
+    round_trips = []
+    execute_command = Redis.execute_command
+    execute_pipeline = Pipeline.execute
+
+    def record_command(client, *args, **kwargs):
+        round_trips.append(args[0])
+        return execute_command(client, *args, **kwargs)
+
+    def record_pipeline(pipeline, *args, **kwargs):
+        round_trips.append("PIPELINE")
+        return execute_pipeline(pipeline, *args, **kwargs)
+
+    with mock.patch.object(Redis, "execute_command", record_command), mock.patch.object(
+        Pipeline, "execute", record_pipeline
+    ):
+        yield round_trips
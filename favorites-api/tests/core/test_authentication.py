@@ -0,0 +1,90 @@
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.core.authentication import get_user_cache_key
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def jwt_client_api(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+    return client
+
+
+def get_user_queries(client):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(reverse("favorites:customers-list"))
+    assert response.status_code == status.HTTP_200_OK
+    return [query for query in context.captured_queries if "auth_user" in query["sql"]]
+
+
+def test_authenticated_user_is_cached(jwt_client_api, user):
+    assert len(get_user_queries(jwt_client_api)) == 1
+    assert get_user_queries(jwt_client_api) == []
+
+    cached_user = cache.get(get_user_cache_key(user.id))
+    assert cached_user["username"] == user.username
+    assert "password" not in cached_user
+
+
+@override_settings(JWT_USER_CACHE_TIMEOUT=0)
+def test_authenticated_user_cache_disabled(jwt_client_api):
+    assert len(get_user_queries(jwt_client_api)) == 1
+    assert len(get_user_queries(jwt_client_api)) == 1
+
+
+def test_cached_user_loads_password_on_access(jwt_client_api, user):
+    get_user_queries(jwt_client_api)
+
+    response = jwt_client_api.get(reverse("favorites:customers-list"))
+    assert response.wsgi_request.user == user
+    assert response.wsgi_request.user.check_password("admin")
+
+
+def test_update_password_forgets_cached_user(jwt_client_api, user):
+    get_user_queries(jwt_client_api)
+
+    call_command("update_password", user.username, "super-secret-123-password")
+
+    assert cache.get(get_user_cache_key(user.id)) is None
+    assert len(get_user_queries(jwt_client_api)) == 1
+
+
+def test_deactivated_user_is_not_authenticated(jwt_client_api, user):
+    get_user_queries(jwt_client_api)
+
+    user.is_active = False
+    user.save()
+
+    response = jwt_client_api.get(reverse("favorites:customers-list"))
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_cached_inactive_user_is_not_authenticated(jwt_client_api, user):
+    get_user_queries(jwt_client_api)
+
+    key = get_user_cache_key(user.id)
+    cache.set(key, {**cache.get(key), "is_active": False})
+
+    response = jwt_client_api.get(reverse("favorites:customers-list"))
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert response.data["code"] == "user_inactive"
+
+
+def test_deleted_user_is_not_authenticated(jwt_client_api, user):
+    get_user_queries(jwt_client_api)
+
+    user.delete()
+
+    response = jwt_client_api.get(reverse("favorites:customers-list"))
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
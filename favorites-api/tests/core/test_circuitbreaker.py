@@ -0,0 +1,76 @@
+import time
+from unittest import mock
+
+import pytest
+from django.core.cache import cache
+
+from apps.core.circuitbreaker import CircuitBreaker
+
+
+@pytest.fixture
+def breaker():
+    breaker = CircuitBreaker("test", threshold=3, window=10, reset_timeout=10, refresh_interval=0)
+    yield breaker
+    cache.delete_many([breaker.get_key(suffix) for suffix in ("tripped", "open", "probe", "failures")])
+
+
+def test_circuit_breaker_opens_after_threshold(breaker):
+    state = breaker.acquire()
+    assert state == CircuitBreaker.CLOSED
+
+    breaker.release(state, failures=2)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.release(breaker.acquire(), successes=5, failures=1)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.acquire() is None
+
+
+def test_circuit_breaker_failures_wider_than_window(breaker):
+    breaker.window = 1
+    for _ in range(3):
+        breaker.release(breaker.acquire(), failures=1)
+        time.sleep(0.6)
+
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_circuit_breaker_state_is_shared(breaker):
+    other_breaker = CircuitBreaker("test", threshold=3, window=10, reset_timeout=10, refresh_interval=0)
+
+    other_breaker.release(other_breaker.acquire(), failures=3)
+
+    assert breaker.acquire() is None
+
+
+def test_circuit_breaker_state_is_reused_within_refresh_interval(breaker):
+    breaker.refresh_interval = 60
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    with mock.patch("apps.core.circuitbreaker.cache") as cache_mock:
+        assert breaker.acquire() == CircuitBreaker.CLOSED
+        cache_mock.get_many.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "successes, failures, expected_state",
+    ((1, 0, CircuitBreaker.CLOSED), (0, 1, CircuitBreaker.OPEN)),
+)
+def test_circuit_breaker_half_open_probe(successes, failures, expected_state, breaker):
+    breaker.open()
+    cache.delete(breaker.get_key("open"))
+
+    state = breaker.acquire()
+    assert state == CircuitBreaker.HALF_OPEN
+    assert breaker.acquire() is None
+
+    breaker.release(state, successes=successes, failures=failures)
+    assert breaker.state == expected_state
+
+
+def test_circuit_breaker_disabled(breaker):
+    breaker.threshold = 0
+
+    breaker.release(breaker.acquire(), failures=10)
+
+    assert breaker.acquire() == CircuitBreaker.CLOSED
@@ -0,0 +1,176 @@
+import asyncio
+from unittest import mock
+
+import pytest
+import responses
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from django.test import override_settings
+from rest_framework import status
+
+from apps.core.clients import (
+    RETRY_STATUS_CODES,
+    AsyncLuizalabsAPIClient,
+    LuizalabsAPIClient,
+    close_async_luizalabs_api_client,
+    get_async_luizalabs_api_client,
+    get_luizalabs_api_client,
+)
+
+
+@pytest.fixture
+def luizalabs_api_client():
+    return LuizalabsAPIClient(
+        base_url="http://local-challenge-api.luizalabs.com/",
+        pool_size=5,
+        connect_timeout=0.5,
+        read_timeout=2,
+        max_retries=3,
+        retry_backoff=0.2,
+    )
+
+
+def test_luizalabs_api_client_pool(luizalabs_api_client):
+    adapter = luizalabs_api_client.session.get_adapter("http://local-challenge-api.luizalabs.com")
+
+    assert adapter._pool_maxsize == 5
+    assert adapter.max_retries.total == 3
+    assert adapter.max_retries.backoff_factor == 0.2
+    assert adapter.max_retries.status_forcelist == RETRY_STATUS_CODES
+    assert luizalabs_api_client.session.get_adapter("https://challenge-api.luizalabs.com") is adapter
+
+
+@responses.activate
+def test_luizalabs_api_client_get_product(luizalabs_api_client, id, luizalabs_product):
+    expected_url = f"http://local-challenge-api.luizalabs.com/api/product/{id}/"
+    responses.add(responses.GET, expected_url, status=status.HTTP_200_OK, json=luizalabs_product)
+
+    with mock.patch.object(
+        luizalabs_api_client.session, "get", wraps=luizalabs_api_client.session.get
+    ) as session_get_mock:
+        response = luizalabs_api_client.get_product(id)
+
+    assert response.json() == luizalabs_product
+    session_get_mock.assert_called_once_with(expected_url, timeout=(0.5, 2))
+
+
+@responses.activate
+def test_luizalabs_api_client_get_product_timeout(luizalabs_api_client, id, luizalabs_product):
+    expected_url = f"http://local-challenge-api.luizalabs.com/api/product/{id}/"
+    responses.add(responses.GET, expected_url, status=status.HTTP_200_OK, json=luizalabs_product)
+
+    with mock.patch.object(
+        luizalabs_api_client.session, "get", wraps=luizalabs_api_client.session.get
+    ) as session_get_mock:
+        luizalabs_api_client.get_product(id, timeout=1)
+
+    session_get_mock.assert_called_once_with(expected_url, timeout=(0.5, 1))
+
+
+def test_get_luizalabs_api_client_is_shared():
+    assert get_luizalabs_api_client() is get_luizalabs_api_client()
+
+
+def test_get_luizalabs_api_client_follows_settings():
+    with override_settings(
+        LUIZALABS_API_URL="http://other-challenge-api.luizalabs.com", LUIZALABS_API_POOL_SIZE=3
+    ):
+        client = get_luizalabs_api_client()
+        assert client.base_url == "http://other-challenge-api.luizalabs.com"
+
+    assert get_luizalabs_api_client() is not client
+
+
+def request_async_luizalabs_api_client(handler, id, max_retries=2):
+    """
+    Request given product id with an AsyncLuizalabsAPIClient against a local server answering with handler.
+    """
+
+    async def request_product():
+        app = web.Application()
+        app.router.add_get("/api/product/{id}/", handler)
+        async with TestServer(app) as server:
+            client = AsyncLuizalabsAPIClient(
+                base_url=str(server.make_url("/")),
+                pool_size=5,
+                connect_timeout=0.5,
+                read_timeout=2,
+                max_retries=max_retries,
+                retry_backoff=0,
+            )
+            try:
+                response = await client.get_product(id)
+                return response.status, await response.json()
+            finally:
+                await client.session.close()
+
+    return asyncio.run(request_product())
+
+
+def test_async_luizalabs_api_client_get_product(id, luizalabs_product):
+    requests = []
+
+    async def handler(request):
+        requests.append(request)
+        return web.json_response(luizalabs_product)
+
+    assert request_async_luizalabs_api_client(handler, id) == (status.HTTP_200_OK, luizalabs_product)
+    assert requests[0].path == f"/api/product/{id}/"
+
+
+def test_async_luizalabs_api_client_retries(id, luizalabs_product):
+    responses = [
+        web.json_response({}, status=status.HTTP_503_SERVICE_UNAVAILABLE),
+        web.json_response(luizalabs_product),
+    ]
+
+    async def handler(request):
+        return responses.pop(0)
+
+    assert request_async_luizalabs_api_client(handler, id) == (status.HTTP_200_OK, luizalabs_product)
+    assert responses == []
+
+
+def test_async_luizalabs_api_client_gives_up_retrying(id):
+    requests = []
+
+    async def handler(request):
+        requests.append(request)
+        return web.json_response({}, status=status.HTTP_502_BAD_GATEWAY)
+
+    assert request_async_luizalabs_api_client(handler, id, max_retries=2) == (status.HTTP_502_BAD_GATEWAY, {})
+    assert len(requests) == 3
+
+
+def test_async_luizalabs_api_client_pool():
+    async def build_client():
+        client = AsyncLuizalabsAPIClient(
+            base_url="http://local-challenge-api.luizalabs.com/",
+            pool_size=5,
+            connect_timeout=0.5,
+            read_timeout=2,
+            max_retries=2,
+            retry_backoff=0,
+        )
+        pool_size = client.session.connector.limit
+        await client.session.close()
+        return client, pool_size
+
+    client, pool_size = asyncio.run(build_client())
+
+    assert pool_size == 5
+    assert client.session.timeout.sock_connect == 0.5
+    assert client.session.timeout.sock_read == 2
+
+
+def test_get_async_luizalabs_api_client_is_shared_by_loop():
+    async def get_clients():
+        clients = get_async_luizalabs_api_client(), get_async_luizalabs_api_client()
+        await close_async_luizalabs_api_client()
+        return clients
+
+    first_client, second_client = asyncio.run(get_clients())
+    other_loop_client, _ = asyncio.run(get_clients())
+
+    assert first_client is second_client
+    assert other_loop_client is not first_client
@@ -1,6 +1,15 @@
+import time
+from io import StringIO
+from unittest import mock
+
 import pytest
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.management import call_command
+from django.test import override_settings
+
+from apps.core.mixins import unpack_product
+from tests.factories import CustomerFactory, ProductFactory
 
 pytestmark = pytest.mark.django_db
 
@@ -21,3 +30,65 @@ def test_update_password(user):
 
     user.refresh_from_db()
     assert user.check_password(new_password)
+
+
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.request_product_on_external_api")
+@override_settings(FAVORITES_STALE_TIMEOUT=50)
+def test_warm_products_cache(request_product_mock, luizalabs_product):
+    fresh, missing, stale, broken = ProductFactory.create_batch(4)
+    for customer in CustomerFactory.create_batch(2):
+        customer.favorites.add(fresh, missing, stale, broken)
+    cache.set(str(fresh.id), luizalabs_product, 150)
+    cache.set(str(stale.id), luizalabs_product, 55)
+
+    def request_product(id):
+        if id == str(broken.id):
+            raise ConnectionError
+        return luizalabs_product
+
+    request_product_mock.side_effect = request_product
+
+    out = StringIO()
+    call_command("warm_products_cache", "--refresh-within=10", "--rate=0", stdout=out)
+
+    assert sorted(call[0][0] for call in request_product_mock.call_args_list) == sorted(
+        [str(missing.id), str(stale.id), str(broken.id)]
+    )
+    assert unpack_product(cache.get(str(missing.id))[1]) == luizalabs_product
+    assert cache.ttl(str(stale.id)) > 60
+    assert cache.get(str(broken.id)) is None
+    assert "Scanned 4 products" in out.getvalue()
+    assert "1 hits (25.0%), 2 missing, 1 stale, 2 fetched, 1 failed" in out.getvalue()
+
+
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.request_product_on_external_api")
+@override_settings(FAVORITES_STALE_TIMEOUT=50)
+def test_warm_products_cache_refresh_time(request_product_mock, luizalabs_product):
+    fresh, served_stale, jittered = ProductFactory.create_batch(3)
+    CustomerFactory().favorites.add(fresh, served_stale, jittered)
+    cache.set(str(fresh.id), (time.time() + 100, luizalabs_product), 150)
+    cache.set(str(served_stale.id), (time.time() - 10, luizalabs_product), 40)
+    cache.set(str(jittered.id), (time.time() + 5, luizalabs_product), 150)
+    request_product_mock.return_value = luizalabs_product
+
+    out = StringIO()
+    call_command("warm_products_cache", "--refresh-within=10", "--rate=0", stdout=out)
+
+    assert sorted(call[0][0] for call in request_product_mock.call_args_list) == sorted(
+        [str(served_stale.id), str(jittered.id)]
+    )
+    assert "1 hits (33.3%), 0 missing, 2 stale, 2 fetched, 0 failed" in out.getvalue()
+
+
+@mock.patch("apps.core.management.commands.warm_products_cache.time.sleep")
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.request_product_on_external_api")
+def test_warm_products_cache_rate(request_product_mock, sleep_mock, luizalabs_product, settings):
+    settings.LUIZALABS_API_MAX_WORKERS = 1
+    customer = CustomerFactory()
+    customer.favorites.add(*ProductFactory.create_batch(3))
+    request_product_mock.return_value = luizalabs_product
+
+    call_command("warm_products_cache", "--rate=1", stdout=StringIO())
+
+    assert request_product_mock.call_count == 3
+    assert sleep_mock.call_count == 2
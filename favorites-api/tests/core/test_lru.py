@@ -0,0 +1,58 @@
+from unittest import mock
+
+from apps.core.lru import LRUCache
+
+
+def test_lru_cache_get_and_set():
+    lru_cache = LRUCache(maxsize=2, timeout=10)
+    lru_cache.set("key", "value")
+
+    assert lru_cache.get("key") == "value"
+    assert lru_cache.get("missing") is None
+    assert lru_cache.get_many(["key", "missing"]) == {"key": "value"}
+
+
+def test_lru_cache_evicts_least_recently_used():
+    lru_cache = LRUCache(maxsize=2, timeout=10)
+    lru_cache.set_many({"first": 1, "second": 2})
+    lru_cache.get("first")
+
+    lru_cache.set("third", 3)
+
+    assert len(lru_cache) == 2
+    assert lru_cache.get_many(["first", "second", "third"]) == {"first": 1, "third": 3}
+
+
+@mock.patch("apps.core.lru.time.monotonic")
+def test_lru_cache_expires(monotonic_mock):
+    monotonic_mock.return_value = 100
+    lru_cache = LRUCache(maxsize=2, timeout=10)
+    lru_cache.set("key", "value")
+
+    monotonic_mock.return_value = 110
+    assert lru_cache.get("key") is None
+    assert len(lru_cache) == 0
+
+
+def test_lru_cache_version():
+    lru_cache = LRUCache(maxsize=2, timeout=10)
+    lru_cache.set_version(1)
+    generation = lru_cache.generation
+    lru_cache.set("key", "value", generation)
+
+    lru_cache.set_version(1)
+    assert lru_cache.get("key") == "value"
+
+    lru_cache.set_version(2)
+    assert lru_cache.get("key") is None
+    lru_cache.set("key", "value", generation)
+    assert lru_cache.get("key") is None
+    lru_cache.set("key", "value", lru_cache.generation)
+    assert lru_cache.get("key") == "value"
+
+
+def test_lru_cache_disabled():
+    lru_cache = LRUCache(maxsize=0, timeout=10)
+    lru_cache.set("key", "value")
+
+    assert lru_cache.get("key") is None
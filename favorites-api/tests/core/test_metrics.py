@@ -0,0 +1,141 @@
+from unittest import mock
+
+import pytest
+import responses
+from django.test import override_settings
+from prometheus_client import REGISTRY
+from prometheus_client.multiprocess import MultiProcessCollector
+from rest_framework import status
+from rest_framework.reverse import reverse
+
+from apps.core.circuitbreaker import CircuitBreaker
+from apps.core.clients import get_luizalabs_api_client
+from apps.core.lru import LRUCache
+from apps.core.metrics import breaker_state_collector, get_metrics_registry
+from apps.core.mixins import ExternalLuizalabsAPIMixin
+from tests.factories import CustomerFactory, ProductFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def sample(metric, **labels):
+    return REGISTRY.get_sample_value(metric, labels) or 0
+
+
+def test_metrics_endpoint(client):
+    response = client.get(reverse("metrics"))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response["Content-Type"].startswith("text/plain")
+    assert b"favorites_http_request_duration_seconds" in response.content
+    assert b"favorites_luizalabs_api_request_duration_seconds" in response.content
+
+
+def test_metrics_registry_aggregates_processes(monkeypatch, tmp_path):
+    assert get_metrics_registry() is REGISTRY
+
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    registry = get_metrics_registry()
+    assert registry is not REGISTRY
+    assert any(isinstance(collector, MultiProcessCollector) for collector in registry._collector_to_names)
+    assert breaker_state_collector in registry._collector_to_names
+
+
+@responses.activate
+@override_settings(LUIZALABS_API_MAX_RETRIES=0, FAVORITES_RESPONSE_CACHE_TIMEOUT=0)
+def test_favorites_list_metrics(client_api, luizalabs_product):
+    product = ProductFactory()
+    customer = CustomerFactory()
+    customer.favorites.add(product)
+    responses.add(
+        responses.GET,
+        f"{get_luizalabs_api_client().base_url}/api/product/{product.id}/",
+        json={**luizalabs_product, "id": product.id},
+    )
+    view = "favorites:customer-favorites-list"
+    requests_count = sample(
+        "favorites_http_request_duration_seconds_count", view=view, method="GET", status="200"
+    )
+    queries_sum = sample("favorites_db_queries_per_request_sum", view=view)
+    upstream_count = sample("favorites_luizalabs_api_request_duration_seconds_count", status="200")
+    redis_misses = sample("favorites_products_cache_lookups_total", tier="redis", result="miss")
+
+    response = client_api.get(reverse(view, [customer.id]))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert (
+        sample("favorites_http_request_duration_seconds_count", view=view, method="GET", status="200")
+        == requests_count + 1
+    )
+    assert sample("favorites_db_queries_per_request_sum", view=view) > queries_sum
+    assert (
+        sample("favorites_luizalabs_api_request_duration_seconds_count", status="200") == upstream_count + 1
+    )
+    assert sample("favorites_products_cache_lookups_total", tier="redis", result="miss") == redis_misses + 1
+
+
+@responses.activate
+@override_settings(LUIZALABS_API_MAX_RETRIES=0)
+def test_upstream_error_metrics(id):
+    responses.add(responses.GET, f"{get_luizalabs_api_client().base_url}/api/product/{id}/", status=503)
+    count = sample("favorites_luizalabs_api_request_duration_seconds_count", status="503")
+
+    get_luizalabs_api_client().get_product(id)
+
+    assert sample("favorites_luizalabs_api_request_duration_seconds_count", status="503") == count + 1
+
+
+def test_lru_cache_metrics():
+    hits = sample("favorites_products_cache_lookups_total", tier="test", result="hit")
+    misses = sample("favorites_products_cache_lookups_total", tier="test", result="miss")
+    evictions = sample("favorites_products_cache_evictions_total", tier="test")
+
+    lru_cache = LRUCache(maxsize=1, timeout=10, tier="test")
+    lru_cache.set_many({"first": 1, "second": 2})
+    lru_cache.get_many(["first", "second"])
+
+    assert sample("favorites_products_cache_lookups_total", tier="test", result="hit") == hits + 1
+    assert sample("favorites_products_cache_lookups_total", tier="test", result="miss") == misses + 1
+    assert sample("favorites_products_cache_evictions_total", tier="test") == evictions + 1
+
+
+@mock.patch("apps.core.mixins.cache")
+def test_products_cache_metrics(cache_mock, luizalabs_product):
+    cache_mock.get_many.return_value = {"redis": luizalabs_product}
+    lookups = {
+        (tier, result): sample("favorites_products_cache_lookups_total", tier=tier, result=result)
+        for tier in ("local", "redis")
+        for result in ("hit", "miss")
+    }
+
+    ExternalLuizalabsAPIMixin().search_products_on_cache(["redis", "missing"])
+    ExternalLuizalabsAPIMixin().search_products_on_cache(["redis"])
+
+    assert {
+        key: sample("favorites_products_cache_lookups_total", tier=key[0], result=key[1]) - value
+        for key, value in lookups.items()
+    } == {("local", "hit"): 1, ("local", "miss"): 2, ("redis", "hit"): 1, ("redis", "miss"): 1}
+
+
+def test_circuit_breaker_metrics():
+    breaker = CircuitBreaker("metrics-test", threshold=1, window=30, reset_timeout=30)
+    opened = sample("favorites_circuit_breaker_opened_total", name="metrics-test")
+    rejected = sample("favorites_circuit_breaker_rejected_total", name="metrics-test")
+
+    breaker.release(breaker.acquire(), failures=1)
+    assert breaker.acquire() is None
+
+    assert sample("favorites_circuit_breaker_opened_total", name="metrics-test") == opened + 1
+    assert sample("favorites_circuit_breaker_rejected_total", name="metrics-test") == rejected + 1
+
+
+@override_settings(LUIZALABS_API_BREAKER_THRESHOLD=1)
+def test_circuit_breaker_state_metric_is_read_on_scrape():
+    # Another worker sharing the breaker state on redis
+    breaker = CircuitBreaker("luizalabs-api", threshold=1, window=30, reset_timeout=30)
+
+    breaker.release(breaker.acquire(), failures=1)
+    assert sample("favorites_circuit_breaker_state", name="luizalabs-api") == 2
+
+    breaker.close()
+    assert sample("favorites_circuit_breaker_state", name="luizalabs-api") == 0
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import resolve
+from prometheus_client import REGISTRY
+
+from apps.core.middleware import MetricsMiddleware, WhiteNoiseMiddleware
+
+
+def test_whitenoise_middleware_sync_mode():
+    middleware = WhiteNoiseMiddleware(lambda request: HttpResponse("sync"))
+
+    response = middleware(RequestFactory().get("/v1/customers/"))
+    assert response.content == b"sync"
+
+
+def test_whitenoise_middleware_async_mode():
+    async def get_response(request):
+        return HttpResponse("async")
+
+    middleware = WhiteNoiseMiddleware(get_response)
+
+    assert asyncio.iscoroutinefunction(middleware)
+    response = asyncio.run(middleware(RequestFactory().get("/v1/customers/")))
+    assert response.content == b"async"
+
+
+def get_request(path):
+    request = RequestFactory().get(path)
+    request.resolver_match = resolve(path)
+    return request
+
+
+def sample(metric, **labels):
+    return REGISTRY.get_sample_value(metric, labels) or 0
+
+
+@pytest.mark.django_db
+def test_metrics_middleware_sync_mode():
+    def get_response(request):
+        get_user_model().objects.count()
+        return HttpResponse("sync")
+
+    view = "favorites:customers-list"
+    requests_count = sample(
+        "favorites_http_request_duration_seconds_count", view=view, method="GET", status="200"
+    )
+    queries = sample("favorites_db_queries_per_request_sum", view=view)
+
+    response = MetricsMiddleware(get_response)(get_request("/v1/customers/"))
+
+    assert response.content == b"sync"
+    assert (
+        sample("favorites_http_request_duration_seconds_count", view=view, method="GET", status="200")
+        == requests_count + 1
+    )
+    assert sample("favorites_db_queries_per_request_sum", view=view) == queries + 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_metrics_middleware_async_mode():
+    async def get_response(request):
+        await sync_to_async(get_user_model().objects.count)()
+        return HttpResponse("async", status=201)
+
+    view = "favorites:customers-list"
+    queries = sample("favorites_db_queries_per_request_sum", view=view)
+
+    middleware = MetricsMiddleware(get_response)
+    assert asyncio.iscoroutinefunction(middleware)
+    response = asyncio.run(middleware(get_request("/v1/customers/")))
+
+    assert response.content == b"async"
+    assert sample("favorites_http_request_duration_seconds_count", view=view, method="GET", status="201") >= 1
+    assert sample("favorites_db_queries_per_request_sum", view=view) == queries + 1
+
+
+def test_metrics_middleware_unresolved_request():
+    count = sample(
+        "favorites_http_request_duration_seconds_count", view="unresolved", method="GET", status="404"
+    )
+
+    MetricsMiddleware(lambda request: HttpResponse(status=404))(RequestFactory().get("/missing/"))
+
+    assert (
+        sample("favorites_http_request_duration_seconds_count", view="unresolved", method="GET", status="404")
+        == count + 1
+    )
@@ -1,11 +1,39 @@
+import asyncio
+import json
+import pickle
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from unittest import mock
+from uuid import uuid4
 
 import pytest
 import responses
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
 from django.test import override_settings
+from django.utils import timezone
+from django_redis.compressors.identity import IdentityCompressor
+from django_redis.compressors.zlib import ZlibCompressor
+from django_redis.serializers.pickle import PickleSerializer
 from rest_framework import status
 
-from apps.core.mixins import ExternalLuizalabsAPIMixin
+from apps.core.clients import get_luizalabs_api_breaker
+from apps.core.exceptions import LuizalabsAPIUnavailable
+from apps.core.mixins import (
+    PRODUCTS_VERSION_KEY,
+    AsyncExternalLuizalabsAPIMixin,
+    ExternalLuizalabsAPIMixin,
+    get_products_local_cache,
+    get_products_request_executor,
+    pack_product,
+    project_product,
+    unpack_product,
+)
+from tests.factories import ProductFactory
+
+pytestmark = pytest.mark.django_db
 
 
 @pytest.fixture
@@ -13,24 +41,6 @@ def external_luizalabs_api_mixin():
     return ExternalLuizalabsAPIMixin()
 
 
-@mock.patch("apps.core.mixins.cache")
-@override_settings(FAVORITES_EXPIRE_TIMEOUT=10)
-def test_external_luizalabs_store_empty_product(cache_mock, external_luizalabs_api_mixin, id):
-    timeout = 10
-
-    external_luizalabs_api_mixin.store_product_on_cache(id, {})
-    cache_mock.add.assert_called_once_with(id, {}, timeout)
-
-
-@mock.patch("apps.core.mixins.cache")
-@override_settings(FAVORITES_EXPIRE_TIMEOUT=10)
-def test_external_luizalabs_store_product(cache_mock, external_luizalabs_api_mixin, id, luizalabs_product):
-    timeout = 10
-
-    external_luizalabs_api_mixin.store_product_on_cache(id, luizalabs_product)
-    cache_mock.add.assert_called_once_with(id, luizalabs_product, timeout)
-
-
 @mock.patch("apps.core.mixins.cache")
 def test_external_luizalabs_search_product_on_cache(
     cache_mock, external_luizalabs_api_mixin, id, luizalabs_product
@@ -42,10 +52,11 @@ def test_external_luizalabs_search_product_on_cache(
 
 
 @responses.activate
-@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.store_product_on_cache")
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.acquire_product_locks", side_effect=lambda ids: ids)
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.store_products_on_cache")
 @override_settings(LUIZALABS_API_URL="http://local-challenge-api.luizalabs.com")
 def test_external_luizalabs_search_product_on_external_api(
-    store_product_mock, external_luizalabs_api_mixin, id, luizalabs_product
+    store_products_mock, acquire_locks_mock, external_luizalabs_api_mixin, id, luizalabs_product
 ):
     url = "http://local-challenge-api.luizalabs.com"
 
@@ -59,14 +70,16 @@ def test_external_luizalabs_search_product_on_external_api(
 
     response = external_luizalabs_api_mixin.search_product_on_external_api(id)
     assert response == luizalabs_product
-    store_product_mock.assert_called_once_with(id, luizalabs_product)
+    acquire_locks_mock.assert_called_once_with([id])
+    store_products_mock.assert_any_call({id: luizalabs_product})
 
 
 @responses.activate
-@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.store_product_on_cache")
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.acquire_product_locks", side_effect=lambda ids: ids)
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.store_products_on_cache")
 @override_settings(LUIZALABS_API_URL="http://local-challenge-api.luizalabs.com")
 def test_external_luizalabs_search_invalid_product_on_external_api(
-    store_product_mock, external_luizalabs_api_mixin, id
+    store_products_mock, acquire_locks_mock, external_luizalabs_api_mixin, id
 ):
     url = "http://local-challenge-api.luizalabs.com"
 
@@ -82,7 +95,85 @@ def test_external_luizalabs_search_invalid_product_on_external_api(
 
     response = external_luizalabs_api_mixin.search_product_on_external_api(id)
     assert response == {}
-    store_product_mock.assert_called_once_with(id, {})
+    store_products_mock.assert_any_call({id: {}})
+
+
+@responses.activate
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.store_products_on_cache")
+@override_settings(LUIZALABS_API_URL="http://local-challenge-api.luizalabs.com")
+def test_external_luizalabs_search_product_on_unavailable_external_api(
+    store_products_mock, external_luizalabs_api_mixin, id
+):
+    expected_url = f"http://local-challenge-api.luizalabs.com/api/product/{id}/"
+    responses.add(responses.GET, expected_url, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    assert external_luizalabs_api_mixin.search_product_on_external_api(id) is None
+    store_products_mock.assert_not_called()
+
+
+@mock.patch("apps.core.mixins.cache")
+@override_settings(
+    FAVORITES_EXPIRE_TIMEOUT=10,
+    FAVORITES_NOT_FOUND_TIMEOUT=2,
+    FAVORITES_STALE_TIMEOUT=5,
+    FAVORITES_EXPIRE_JITTER=0,
+)
+def test_external_luizalabs_store_not_found_products(
+    cache_mock, external_luizalabs_api_mixin, id, luizalabs_product
+):
+    external_luizalabs_api_mixin.store_products_on_cache({id: luizalabs_product, "missing": {}})
+
+    assert cache_mock.set_many.call_args_list == [
+        mock.call({id: (mock.ANY, pack_product(luizalabs_product))}, 15),
+        mock.call({"missing": (mock.ANY, {})}, 7),
+    ]
+
+
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.request_product_on_external_api")
+@override_settings(FAVORITES_ERROR_TIMEOUT=5, FAVORITES_EXPIRE_JITTER=0)
+def test_external_luizalabs_refresh_products_keeps_last_known_good(
+    request_product_mock, external_luizalabs_api_mixin, luizalabs_product
+):
+    id = str(uuid4())
+    cache.set(id, (time.time() - 1, luizalabs_product))
+    request_product_mock.side_effect = ConnectionError
+
+    now = time.time()
+    external_luizalabs_api_mixin.refresh_products({id: luizalabs_product})
+
+    refresh_at, data = cache.get(id)
+    assert unpack_product(data) == luizalabs_product
+    assert now + 5 <= refresh_at <= time.time() + 5
+    assert cache.get(external_luizalabs_api_mixin.get_product_lock_key(id)) is None
+
+
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.store_products_on_database")
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.request_product_on_external_api")
+def test_external_luizalabs_refresh_products_failing_midway(
+    request_product_mock, store_on_database_mock, external_luizalabs_api_mixin, luizalabs_product
+):
+    id = str(uuid4())
+    request_product_mock.return_value = {**luizalabs_product, "title": "Cadeira Preta"}
+    store_on_database_mock.side_effect = DatabaseError
+    version = cache.get(PRODUCTS_VERSION_KEY, 0)
+
+    external_luizalabs_api_mixin.refresh_products({id: luizalabs_product})
+
+    assert cache.get(external_luizalabs_api_mixin.get_product_lock_key(id)) is None
+    assert cache.get(PRODUCTS_VERSION_KEY) == version + 1
+
+
+@mock.patch("apps.core.mixins.close_old_connections")
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.refresh_products")
+def test_external_luizalabs_refresh_claimed_products_closes_old_connections(
+    refresh_products_mock, close_old_connections_mock, external_luizalabs_api_mixin
+):
+    refresh_products_mock.side_effect = lambda products: close_old_connections_mock.assert_called_once()
+
+    external_luizalabs_api_mixin.refresh_claimed_products({})
+
+    refresh_products_mock.assert_called_once_with({})
+    assert close_old_connections_mock.call_count == 2
 
 
 @mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.search_product_on_cache")
@@ -159,3 +250,571 @@ def test_external_luizalabs_check_product_existence(
 
     assert external_luizalabs_api_mixin.check_product_existence(id) == expected_response
     search_product_mock.assert_called_once_with(id)
+
+
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.search_product", return_value=None)
+def test_external_luizalabs_check_product_existence_unavailable(
+    search_product_mock, external_luizalabs_api_mixin, id
+):
+    with pytest.raises(LuizalabsAPIUnavailable):
+        external_luizalabs_api_mixin.check_product_existence(id)
+
+
+@mock.patch("apps.core.mixins.cache")
+@override_settings(FAVORITES_EXPIRE_TIMEOUT=10, FAVORITES_STALE_TIMEOUT=5, FAVORITES_EXPIRE_JITTER=0.5)
+def test_external_luizalabs_store_products(cache_mock, external_luizalabs_api_mixin, id, luizalabs_product):
+    timeout = 15
+
+    now = time.time()
+    external_luizalabs_api_mixin.store_products_on_cache({id: luizalabs_product})
+    cache_mock.set_many.assert_called_once_with({id: (mock.ANY, pack_product(luizalabs_product))}, timeout)
+
+    refresh_at, _ = cache_mock.set_many.call_args[0][0][id]
+    assert now + 5 <= refresh_at <= time.time() + 10
+
+
+@override_settings(FAVORITES_EXPIRE_JITTER=0.5)
+def test_external_luizalabs_store_products_jitter(external_luizalabs_api_mixin, luizalabs_product):
+    ids = [str(uuid4()) for _ in range(10)]
+
+    external_luizalabs_api_mixin.store_products_on_cache({id: luizalabs_product for id in ids})
+
+    assert len({refresh_at for refresh_at, _ in cache.get_many(ids).values()}) == len(ids)
+
+
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.refresh_products_on_background")
+def test_external_luizalabs_search_stale_products_on_cache(
+    refresh_mock, external_luizalabs_api_mixin, luizalabs_product
+):
+    fresh_id, stale_id = str(uuid4()), str(uuid4())
+    cache.set(fresh_id, (time.time() + 60, luizalabs_product))
+    cache.set(stale_id, (time.time() - 1, luizalabs_product))
+
+    products = external_luizalabs_api_mixin.search_products_on_cache([fresh_id, stale_id])
+
+    assert products == {fresh_id: luizalabs_product, stale_id: luizalabs_product}
+    refresh_mock.assert_called_once_with({stale_id: luizalabs_product})
+    assert get_products_local_cache().get_many([fresh_id, stale_id]) == {fresh_id: luizalabs_product}
+
+
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.refresh_products_on_background")
+def test_external_luizalabs_search_stale_product_on_cache(
+    refresh_mock, external_luizalabs_api_mixin, id, luizalabs_product
+):
+    cache.set(id, (time.time() - 1, luizalabs_product))
+
+    assert external_luizalabs_api_mixin.search_product_on_cache(id) == luizalabs_product
+    refresh_mock.assert_called_once_with({id: luizalabs_product})
+    assert get_products_local_cache().get(id) is None
+
+
+@mock.patch("apps.core.mixins.get_products_refresh_executor")
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.request_product_on_external_api")
+def test_external_luizalabs_refresh_products_on_background(
+    request_product_mock, get_executor_mock, external_luizalabs_api_mixin, luizalabs_product
+):
+    id = str(uuid4())
+    cache.set(id, (time.time() - 1, {}))
+    request_product_mock.return_value = luizalabs_product
+    get_executor_mock.return_value = executor = ThreadPoolExecutor(max_workers=1)
+
+    assert external_luizalabs_api_mixin.search_product_on_cache(id) == {}
+    executor.shutdown(wait=True)
+
+    request_product_mock.assert_called_once_with(id)
+    refresh_at, data = cache.get(id)
+    assert refresh_at > time.time()
+    assert unpack_product(data) == luizalabs_product
+
+
+@mock.patch("apps.core.mixins.get_products_refresh_executor")
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.refresh_products")
+def test_external_luizalabs_refresh_products_on_background_skips_pending(
+    refresh_products_mock, get_executor_mock, external_luizalabs_api_mixin, luizalabs_product
+):
+    id, other_id = str(uuid4()), str(uuid4())
+    executor = get_executor_mock.return_value
+
+    external_luizalabs_api_mixin.refresh_products_on_background({id: luizalabs_product})
+    external_luizalabs_api_mixin.refresh_products_on_background({id: luizalabs_product})
+    external_luizalabs_api_mixin.refresh_products_on_background({id: luizalabs_product, other_id: {}})
+
+    assert [call[0][1] for call in executor.submit.call_args_list] == [
+        {id: luizalabs_product},
+        {other_id: {}},
+    ]
+    for call in executor.submit.call_args_list:
+        call[0][0](call[0][1])
+
+    external_luizalabs_api_mixin.refresh_products_on_background({id: luizalabs_product})
+    assert executor.submit.call_count == 3
+    assert refresh_products_mock.call_count == 2
+
+
+@mock.patch("apps.core.mixins.cache")
+def test_external_luizalabs_store_no_products(cache_mock, external_luizalabs_api_mixin):
+    external_luizalabs_api_mixin.store_products_on_cache({})
+    cache_mock.set_many.assert_not_called()
+
+
+@mock.patch("apps.core.mixins.cache")
+def test_external_luizalabs_search_product_on_local_cache(
+    cache_mock, external_luizalabs_api_mixin, id, luizalabs_product
+):
+    cache_mock.get.return_value = luizalabs_product
+
+    assert external_luizalabs_api_mixin.search_product_on_cache(id) == luizalabs_product
+    assert external_luizalabs_api_mixin.search_product_on_cache(id) == luizalabs_product
+    cache_mock.get.assert_called_once_with(id)
+
+
+@mock.patch("apps.core.mixins.cache")
+@override_settings(FAVORITES_EXPIRE_TIMEOUT=10)
+def test_external_luizalabs_store_products_on_local_cache(
+    cache_mock, external_luizalabs_api_mixin, id, luizalabs_product
+):
+    external_luizalabs_api_mixin.store_products_on_cache({id: luizalabs_product})
+
+    assert external_luizalabs_api_mixin.search_products_on_cache([id]) == {id: luizalabs_product}
+    cache_mock.get_many.assert_not_called()
+
+
+@override_settings(FAVORITES_EXPIRE_TIMEOUT=10, FAVORITES_LOCAL_CACHE_TIMEOUT=60)
+def test_products_local_cache_timeout_is_capped():
+    assert get_products_local_cache().timeout == 10
+
+
+@mock.patch("apps.core.mixins.cache")
+def test_external_luizalabs_search_products_on_cache(
+    cache_mock, external_luizalabs_api_mixin, id, luizalabs_product
+):
+    cache_mock.get_many.return_value = {id: luizalabs_product}
+
+    assert external_luizalabs_api_mixin.search_products_on_cache([id]) == {id: luizalabs_product}
+    cache_mock.get_many.assert_called_once_with([id])
+
+
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.request_product_on_external_api")
+def test_external_luizalabs_request_product_or_none_on_failure(
+    request_product_mock, external_luizalabs_api_mixin, id
+):
+    request_product_mock.side_effect = ConnectionError
+
+    assert external_luizalabs_api_mixin.request_product_or_none(id) is None
+    request_product_mock.assert_called_once_with(id)
+
+
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.request_product_on_external_api")
+@override_settings(LUIZALABS_API_MAX_WORKERS=4)
+def test_external_luizalabs_request_products_keeps_order(request_product_mock, external_luizalabs_api_mixin):
+    ids = [str(index) for index in range(20)]
+    request_product_mock.side_effect = lambda id: {"id": id}
+
+    assert external_luizalabs_api_mixin.request_products_on_external_api(ids) == [{"id": id} for id in ids]
+    assert request_product_mock.call_count == len(ids)
+
+
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.request_product_on_external_api")
+@override_settings(LUIZALABS_API_MAX_WORKERS=3)
+def test_external_luizalabs_request_products_max_workers(request_product_mock, external_luizalabs_api_mixin):
+    lock = threading.Lock()
+    in_flight = []
+    max_in_flight = []
+
+    def request_product(id):
+        with lock:
+            in_flight.append(id)
+            max_in_flight.append(len(in_flight))
+        time.sleep(0.01)
+        with lock:
+            in_flight.remove(id)
+        return {"id": id}
+
+    request_product_mock.side_effect = request_product
+
+    external_luizalabs_api_mixin.request_products_on_external_api([str(index) for index in range(12)])
+    assert max(max_in_flight) <= 3
+
+
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.acquire_product_locks", side_effect=lambda ids: ids)
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.release_product_locks")
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.store_products_on_database")
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.store_products_on_cache")
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.search_products_on_cache")
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.request_product_on_external_api")
+def test_external_luizalabs_search_products(
+    request_product_mock,
+    search_cache_mock,
+    store_products_mock,
+    store_database_mock,
+    release_locks_mock,
+    acquire_locks_mock,
+    external_luizalabs_api_mixin,
+):
+    def request_product(id):
+        if id == "broken":
+            raise ConnectionError
+        return {"id": id} if id != "missing" else {}
+
+    search_cache_mock.return_value = {"cached": {"id": "cached"}}
+    request_product_mock.side_effect = request_product
+
+    products = external_luizalabs_api_mixin.search_products(["fetched", "cached", "broken", "missing"])
+
+    assert products == [{"id": "fetched"}, {"id": "cached"}, None, {}]
+    search_cache_mock.assert_called_once_with(["fetched", "cached", "broken", "missing"])
+    acquire_locks_mock.assert_called_once_with(["fetched", "broken", "missing"])
+    store_products_mock.assert_any_call({"fetched": {"id": "fetched"}, "missing": {}})
+    store_database_mock.assert_any_call({"fetched": {"id": "fetched"}, "missing": {}})
+    release_locks_mock.assert_called_once_with(["broken"])
+
+
+@pytest.mark.parametrize("concurrent_searches", (2, 20))
+@responses.activate
+@override_settings(LUIZALABS_API_URL="http://local-challenge-api.luizalabs.com")
+def test_external_luizalabs_search_product_single_flight(concurrent_searches, luizalabs_product):
+    id = str(uuid4())
+
+    def slow_upstream(request):
+        time.sleep(0.1)
+        return status.HTTP_200_OK, {}, json.dumps({**luizalabs_product, "id": id})
+
+    responses.add_callback(
+        responses.GET, f"http://local-challenge-api.luizalabs.com/api/product/{id}/", callback=slow_upstream
+    )
+
+    with ThreadPoolExecutor(max_workers=concurrent_searches) as executor:
+        products = list(
+            executor.map(
+                lambda _: ExternalLuizalabsAPIMixin().search_product(id),
+                range(concurrent_searches),
+            )
+        )
+
+    assert products == [{**luizalabs_product, "id": id}] * concurrent_searches
+    assert len(responses.calls) == 1
+
+
+@responses.activate
+@override_settings(LUIZALABS_API_URL="http://local-challenge-api.luizalabs.com", LUIZALABS_API_LOCK_WAIT=2)
+def test_external_luizalabs_search_product_locked_by_other_worker(
+    external_luizalabs_api_mixin, luizalabs_product
+):
+    id = str(uuid4())
+    responses.add(responses.GET, f"http://local-challenge-api.luizalabs.com/api/product/{id}/", json={})
+
+    assert external_luizalabs_api_mixin.acquire_product_locks([id]) == [id]
+    threading.Timer(0.1, lambda: cache.set(id, luizalabs_product)).start()
+
+    assert external_luizalabs_api_mixin.search_product(id) == luizalabs_product
+    assert len(responses.calls) == 0
+
+
+@responses.activate
+@override_settings(LUIZALABS_API_URL="http://local-challenge-api.luizalabs.com", LUIZALABS_API_LOCK_WAIT=0.1)
+def test_external_luizalabs_search_product_lock_wait_timeout(external_luizalabs_api_mixin, luizalabs_product):
+    id = str(uuid4())
+    responses.add(
+        responses.GET, f"http://local-challenge-api.luizalabs.com/api/product/{id}/", json=luizalabs_product
+    )
+
+    assert external_luizalabs_api_mixin.acquire_product_locks([id]) == [id]
+
+    assert external_luizalabs_api_mixin.search_product(id) == luizalabs_product
+    assert len(responses.calls) == 1
+
+
+@mock.patch(
+    "apps.core.mixins.AsyncExternalLuizalabsAPIMixin.acquire_product_locks", side_effect=lambda ids: ids
+)
+@mock.patch("apps.core.mixins.AsyncExternalLuizalabsAPIMixin.store_products_on_database")
+@mock.patch("apps.core.mixins.AsyncExternalLuizalabsAPIMixin.store_products_on_cache")
+@mock.patch("apps.core.mixins.AsyncExternalLuizalabsAPIMixin.search_products_on_cache")
+@mock.patch("apps.core.mixins.AsyncExternalLuizalabsAPIMixin.request_product_on_external_api")
+def test_async_external_luizalabs_search_products(
+    request_product_mock, search_cache_mock, store_products_mock, store_database_mock, acquire_locks_mock
+):
+    async def request_product(id):
+        if id == "broken":
+            raise ConnectionError
+        return {"id": id}
+
+    search_cache_mock.return_value = {"cached": {"id": "cached"}}
+    request_product_mock.side_effect = request_product
+
+    products = asyncio.run(AsyncExternalLuizalabsAPIMixin().search_products(["fetched", "cached", "broken"]))
+
+    assert products == [{"id": "fetched"}, {"id": "cached"}, None]
+    acquire_locks_mock.assert_called_once_with(["fetched", "broken"])
+    store_products_mock.assert_any_call({"fetched": {"id": "fetched"}})
+    store_database_mock.assert_any_call({"fetched": {"id": "fetched"}})
+
+
+@mock.patch("apps.core.mixins.AsyncExternalLuizalabsAPIMixin.request_product_on_external_api")
+@override_settings(LUIZALABS_API_ASYNC_MAX_IN_FLIGHT=50)
+def test_async_external_luizalabs_request_products_overlap(request_product_mock):
+    async def request_product(id):
+        await asyncio.sleep(0.1)
+        return {"id": id}
+
+    request_product_mock.side_effect = request_product
+    ids = [str(index) for index in range(50)]
+
+    started_at = time.monotonic()
+    products = asyncio.run(AsyncExternalLuizalabsAPIMixin().request_products_on_external_api(ids))
+
+    assert products == [{"id": id} for id in ids]
+    assert time.monotonic() - started_at < 1
+
+
+@pytest.mark.parametrize("concurrent_searches", (2, 20))
+@mock.patch("apps.core.mixins.AsyncExternalLuizalabsAPIMixin.request_product_on_external_api")
+def test_async_external_luizalabs_search_product_single_flight(
+    request_product_mock, concurrent_searches, luizalabs_product
+):
+    id = str(uuid4())
+
+    async def request_product(id):
+        await asyncio.sleep(0.1)
+        return luizalabs_product
+
+    request_product_mock.side_effect = request_product
+
+    async def search_products():
+        mixin = AsyncExternalLuizalabsAPIMixin()
+        return await asyncio.gather(*(mixin.search_product(id) for _ in range(concurrent_searches)))
+
+    assert asyncio.run(search_products()) == [luizalabs_product] * concurrent_searches
+    request_product_mock.assert_awaited_once_with(id)
+
+
+def test_external_luizalabs_degrade_failed_products(external_luizalabs_api_mixin):
+    products = [{"id": "fetched"}, None, {}]
+
+    assert external_luizalabs_api_mixin.degrade_failed_products(
+        ["fetched", "broken", "missing"], products
+    ) == [
+        {"id": "fetched"},
+        {"id": "broken", "degraded": True},
+    ]
+
+
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.request_product_on_external_api")
+@override_settings(LUIZALABS_API_BREAKER_THRESHOLD=2)
+def test_external_luizalabs_request_products_breaker_open(request_product_mock, external_luizalabs_api_mixin):
+    request_product_mock.side_effect = ConnectionError
+
+    assert external_luizalabs_api_mixin.request_products_on_external_api(["first", "second"]) == [None, None]
+    assert request_product_mock.call_count == 2
+
+    assert external_luizalabs_api_mixin.request_products_on_external_api(["first", "second"]) == [None, None]
+    assert request_product_mock.call_count == 2
+    assert get_luizalabs_api_breaker().state == "open"
+
+
+@mock.patch("apps.core.mixins.AsyncExternalLuizalabsAPIMixin.request_product_on_external_api")
+@override_settings(LUIZALABS_API_BREAKER_THRESHOLD=1)
+def test_async_external_luizalabs_request_products_breaker_open(request_product_mock):
+    request_product_mock.side_effect = ConnectionError
+    luizalabs_api = AsyncExternalLuizalabsAPIMixin()
+
+    assert asyncio.run(luizalabs_api.request_products_on_external_api(["first"])) == [None]
+    assert asyncio.run(luizalabs_api.request_products_on_external_api(["first"])) == [None]
+    assert request_product_mock.call_count == 1
+
+
+def test_external_luizalabs_with_deadline(external_luizalabs_api_mixin):
+    luizalabs_api = external_luizalabs_api_mixin.with_deadline(10)
+
+    assert luizalabs_api is not external_luizalabs_api_mixin
+    assert 9 < luizalabs_api.get_remaining_time() <= 10
+    assert external_luizalabs_api_mixin.get_remaining_time() is None
+    assert external_luizalabs_api_mixin.with_deadline(0).get_remaining_time() is None
+
+
+@mock.patch("apps.core.mixins.get_luizalabs_api_client")
+def test_external_luizalabs_request_product_timeout(get_client_mock, external_luizalabs_api_mixin, id):
+    get_client_mock.return_value.get_product.return_value.status_code = status.HTTP_200_OK
+
+    external_luizalabs_api_mixin.with_deadline(10).request_product_on_external_api(id)
+
+    _, kwargs = get_client_mock.return_value.get_product.call_args
+    assert 9 < kwargs["timeout"] <= 10
+
+
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.request_product_on_external_api")
+def test_external_luizalabs_request_products_deadline(request_product_mock, external_luizalabs_api_mixin):
+    released = threading.Event()
+
+    def request_product(id):
+        if id == "slow":
+            released.wait(5)
+        return {"id": id}
+
+    request_product_mock.side_effect = request_product
+
+    started_at = time.monotonic()
+    try:
+        products = external_luizalabs_api_mixin.with_deadline(0.2).request_products_on_external_api(
+            ["fast", "slow"]
+        )
+    finally:
+        released.set()
+
+    assert products == [{"id": "fast"}, None]
+    assert time.monotonic() - started_at < 1
+
+
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.request_product_on_external_api")
+def test_external_luizalabs_request_product_deadline(request_product_mock, external_luizalabs_api_mixin):
+    released = threading.Event()
+    request_product_mock.side_effect = lambda id: released.wait(5) and {"id": id}
+
+    started_at = time.monotonic()
+    try:
+        products = external_luizalabs_api_mixin.with_deadline(0.2).request_products_on_external_api(["slow"])
+    finally:
+        released.set()
+
+    assert products == [None]
+    assert time.monotonic() - started_at < 1
+
+
+def test_external_luizalabs_request_products_executor():
+    executor = get_products_request_executor()
+
+    assert get_products_request_executor() is executor
+    with override_settings(LUIZALABS_API_MAX_WORKERS=2):
+        assert get_products_request_executor() is not executor
+        assert get_products_request_executor()._max_workers == 2
+
+
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.request_product_on_external_api")
+@override_settings(LUIZALABS_API_BREAKER_THRESHOLD=1)
+def test_external_luizalabs_request_products_past_deadline(
+    request_product_mock, external_luizalabs_api_mixin
+):
+    luizalabs_api = external_luizalabs_api_mixin.with_deadline(10)
+    luizalabs_api.deadline = time.monotonic()
+
+    assert luizalabs_api.request_products_on_external_api(["first", "second"]) == [None, None]
+    request_product_mock.assert_not_called()
+    assert get_luizalabs_api_breaker().state == "closed"
+
+
+@mock.patch("apps.core.mixins.AsyncExternalLuizalabsAPIMixin.request_product_on_external_api")
+def test_async_external_luizalabs_request_products_deadline(request_product_mock):
+    async def request_product(id):
+        if id == "slow":
+            await asyncio.sleep(5)
+        return {"id": id}
+
+    request_product_mock.side_effect = request_product
+    luizalabs_api = AsyncExternalLuizalabsAPIMixin().with_deadline(0.2)
+
+    started_at = time.monotonic()
+    products = asyncio.run(luizalabs_api.request_products_on_external_api(["fast", "slow"]))
+
+    assert products == [{"id": "fast"}, None]
+    assert time.monotonic() - started_at < 1
+
+
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.refresh_products_on_background")
+def test_external_luizalabs_search_products_on_database(
+    refresh_mock, external_luizalabs_api_mixin, luizalabs_product
+):
+    fresh_id, stale_id, expired_id, unknown_id = (str(uuid4()) for _ in range(4))
+    now = time.time()
+    snapshots = {
+        fresh_id: (now + 60, luizalabs_product),
+        stale_id: (now - 1, luizalabs_product),
+        expired_id: (now - settings.FAVORITES_STALE_TIMEOUT - 1, luizalabs_product),
+        unknown_id: None,
+    }
+
+    products = external_luizalabs_api_mixin.search_products_on_database(snapshots)
+
+    assert products == {fresh_id: luizalabs_product, stale_id: luizalabs_product}
+    refresh_mock.assert_called_once_with({stale_id: luizalabs_product})
+    assert get_products_local_cache().get_many([fresh_id, stale_id]) == {}
+
+
+def test_external_luizalabs_store_products_on_database(external_luizalabs_api_mixin, luizalabs_product):
+    product, removed_product = ProductFactory(), ProductFactory(fetched_at=timezone.now())
+
+    external_luizalabs_api_mixin.store_products_on_database(
+        {product.id: luizalabs_product, removed_product.id: {}, str(uuid4()): luizalabs_product}
+    )
+
+    product.refresh_from_db()
+    refresh_at, data = product.snapshot
+    assert refresh_at > time.time()
+    assert data == {**luizalabs_product, "id": str(product.id)}
+    removed_product.refresh_from_db()
+    assert removed_product.snapshot is None
+
+
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.request_product_on_external_api")
+def test_external_luizalabs_fetch_products_bumps_version_when_changed(
+    request_product_mock, external_luizalabs_api_mixin, luizalabs_product
+):
+    product, changed_product, new_product = ProductFactory.create_batch(3)
+    external_luizalabs_api_mixin.store_products_on_database(
+        {str(product.id): luizalabs_product, str(changed_product.id): luizalabs_product}
+    )
+    request_product_mock.side_effect = lambda id: {
+        **luizalabs_product,
+        "price": 20 if id == str(changed_product.id) else luizalabs_product["price"],
+    }
+    version = cache.get(PRODUCTS_VERSION_KEY, 0)
+
+    external_luizalabs_api_mixin.fetch_products([str(product.id), str(new_product.id)])
+    assert cache.get(PRODUCTS_VERSION_KEY, 0) == version
+
+    external_luizalabs_api_mixin.fetch_products([str(changed_product.id)])
+    assert cache.get(PRODUCTS_VERSION_KEY, 0) == version + 1
+
+
+@responses.activate
+@override_settings(LUIZALABS_API_URL="http://local-challenge-api.luizalabs.com")
+def test_external_luizalabs_request_product_projects_fields(
+    external_luizalabs_api_mixin, id, luizalabs_product
+):
+    responses.add(
+        responses.GET,
+        f"http://local-challenge-api.luizalabs.com/api/product/{id}/",
+        status=status.HTTP_200_OK,
+        json={**luizalabs_product, "description": "Unused " * 100},
+    )
+
+    assert external_luizalabs_api_mixin.request_product_on_external_api(id) == luizalabs_product
+
+
+def test_external_luizalabs_search_legacy_products_on_cache(external_luizalabs_api_mixin, luizalabs_product):
+    """
+    Products stored whole, pickled without compression, by older versions are still read.
+    """
+    with_refresh_id, without_refresh_id = str(uuid4()), str(uuid4())
+    client = cache.client.get_client(write=True)
+    client.set(cache.make_key(with_refresh_id), pickle.dumps((time.time() + 60, luizalabs_product)))
+    client.set(cache.make_key(without_refresh_id), pickle.dumps(luizalabs_product))
+
+    assert external_luizalabs_api_mixin.search_products_on_cache([with_refresh_id, without_refresh_id]) == {
+        with_refresh_id: luizalabs_product,
+        without_refresh_id: luizalabs_product,
+    }
+
+
+def test_products_cache_encoding_size(luizalabs_product):
+    """
+    The packed product compressed takes fewer bytes on redis than the whole upstream product pickled as is.
+    """
+    upstream_product = {**luizalabs_product, "description": "Cadeira para auto do grupo 1, de 9 a 18kg."}
+    serializer = PickleSerializer({})
+
+    whole_value = IdentityCompressor({}).compress(serializer.dumps((time.time(), upstream_product)))
+    packed_value = ZlibCompressor({}).compress(
+        serializer.dumps((time.time(), pack_product(project_product(upstream_product))))
+    )
+
+    assert len(packed_value) < len(whole_value)
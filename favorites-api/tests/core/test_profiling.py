@@ -0,0 +1,128 @@
+import asyncio
+from unittest import mock
+
+import pytest
+import responses
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, override_settings
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.core.clients import get_luizalabs_api_client
+from apps.core.middleware import ProfilingMiddleware
+from apps.core.profiling import PROFILE_ID_HEADER, current_profile, profiled
+from tests.factories import CustomerFactory, ProductFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def favorites_url(luizalabs_product):
+    customer = CustomerFactory()
+    products = ProductFactory.create_batch(3)
+    customer.favorites.add(*products)
+    for product in products:
+        responses.add(
+            responses.GET,
+            f"{get_luizalabs_api_client().base_url}/api/product/{product.id}/",
+            json={**luizalabs_product, "id": product.id},
+        )
+    return reverse("favorites:customer-favorites-list", [customer.id])
+
+
+@responses.activate
+@override_settings(PROFILING_TOKEN="sekret", FAVORITES_RESPONSE_CACHE_TIMEOUT=0)
+def test_profile_request_with_token(client_api, favorites_url):
+    response = client_api.get(favorites_url, HTTP_X_PROFILE_TOKEN="sekret")
+    assert response.status_code == status.HTTP_200_OK
+
+    response = client_api.get(reverse("profile", [response[PROFILE_ID_HEADER]]))
+    assert response.status_code == status.HTTP_200_OK
+
+    profile = response.data
+    assert profile["path"] == favorites_url
+    assert profile["status"] == status.HTTP_200_OK
+    kinds = {event["kind"] for event in profile["events"]}
+    assert kinds == {"db", "cache", "upstream"}
+    assert len([event for event in profile["events"] if event["kind"] == "upstream"]) == 3
+    assert all("sql" in event for event in profile["events"] if event["kind"] == "db")
+    assert "request_products_on_external_api" in profile["call_stack"]
+
+
+@responses.activate
+@override_settings(PROFILING_TOKEN="sekret", FAVORITES_RESPONSE_CACHE_TIMEOUT=0)
+def test_unprofiled_requests(client_api, favorites_url):
+    assert PROFILE_ID_HEADER not in client_api.get(favorites_url)
+    assert PROFILE_ID_HEADER not in client_api.get(favorites_url, HTTP_X_PROFILE_TOKEN="wrong")
+
+    with override_settings(PROFILING_TOKEN=""):
+        assert PROFILE_ID_HEADER not in client_api.get(favorites_url, HTTP_X_PROFILE_TOKEN="")
+
+
+@override_settings(PROFILING_SAMPLE_RATE=1.0)
+def test_profile_sampled_request(client_api):
+    response = client_api.get(reverse("favorites:customers-list"))
+
+    profile = client_api.get(reverse("profile", [response[PROFILE_ID_HEADER]])).data
+    assert profile["path"] == reverse("favorites:customers-list")
+
+
+@override_settings(PROFILING_TOKEN="sekret")
+@mock.patch("apps.favorites.async_api.luizalabs_api.request_product_on_external_api")
+def test_profile_async_view(request_product_mock, luizalabs_product, user, client_api):
+    customer = CustomerFactory()
+    customer.favorites.add(ProductFactory())
+    request_product_mock.return_value = luizalabs_product
+
+    client = Client(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+    response = client.get(
+        reverse("favorites:async-customer-favorites-list", [customer.id]), HTTP_X_PROFILE_TOKEN="sekret"
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+    profile = client_api.get(reverse("profile", [response[PROFILE_ID_HEADER]])).data
+    assert {"db", "cache"} <= {event["kind"] for event in profile["events"]}
+
+
+@override_settings(PROFILING_SAMPLE_RATE=1.0)
+def test_profiling_middleware_async_mode(client_api):
+    @profiled("upstream")
+    async def request_product():
+        return {}
+
+    async def get_response(request):
+        await request_product()
+        return HttpResponse("async")
+
+    middleware = ProfilingMiddleware(get_response)
+    assert asyncio.iscoroutinefunction(middleware)
+    response = asyncio.run(middleware(RequestFactory().get("/v1/async/")))
+    assert response.content == b"async"
+
+    profile = client_api.get(reverse("profile", [response[PROFILE_ID_HEADER]])).data
+    assert [event["name"] for event in profile["events"]] == ["request_product"]
+    assert profile["call_stack"] is None
+
+
+def test_profile_not_found(client_api):
+    response = client_api.get(reverse("profile", ["0" * 32]))
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_profile_requires_authentication(client):
+    response = client.get(reverse("profile", ["0" * 32]))
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_unprofiled_request():
+    response = HttpResponse()
+    profiled_search = profiled("cache")(lambda: response)
+
+    assert (
+        ProfilingMiddleware(lambda request: profiled_search())(RequestFactory().get("/v1/customers/"))
+        is response
+    )
+    assert current_profile.get() is None
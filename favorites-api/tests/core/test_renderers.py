@@ -0,0 +1,51 @@
+import datetime
+import json
+from decimal import Decimal
+from uuid import uuid4
+
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict
+
+from apps.core.renderers import ORJSONRenderer
+
+
+def test_orjson_renderer_matches_json_renderer():
+    data = ReturnDict(
+        {
+            "id": uuid4(),
+            "title": "Cadeira para Auto Iseos Bébé Confort",
+            "price": "1699.00",
+            "reviewScore": 4.352941,
+            "degraded": False,
+            "created_at": datetime.datetime(2020, 12, 7, 10, 30, 15, 123456, tzinfo=timezone.utc),
+            "results": [{"nested": None, "at": datetime.time(10, 30)}],
+        },
+        serializer=None,
+    )
+
+    assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+
+
+def test_orjson_renderer_coerces_types():
+    id = uuid4()
+    data = {id: Decimal("10.50"), "at": datetime.date(2020, 12, 7)}
+
+    assert json.loads(ORJSONRenderer().render(data)) == {str(id): 10.5, "at": "2020-12-07"}
+
+
+def test_orjson_renderer_datetime():
+    data = {"created_at": datetime.datetime(2020, 12, 7, 10, 30, 15, 123456, tzinfo=timezone.utc)}
+
+    assert json.loads(ORJSONRenderer().render(data)) == {"created_at": "2020-12-07T10:30:15.123456Z"}
+
+
+def test_orjson_renderer_empty_data():
+    assert ORJSONRenderer().render(None) == b""
+
+
+def test_orjson_renderer_indent():
+    rendered = ORJSONRenderer().render({"id": 1}, "application/json; indent=4")
+
+    assert rendered == JSONRenderer().render({"id": 1}, "application/json; indent=4")
+    assert b"\n    " in rendered
@@ -0,0 +1,23 @@
+from apps.core.singleflight import SingleFlight
+
+
+def test_single_flight_claim():
+    single_flight = SingleFlight()
+
+    futures, claimed_keys = single_flight.claim(["first", "second"])
+    assert claimed_keys == ["first", "second"]
+
+    other_futures, other_claimed_keys = single_flight.claim(["second", "third"])
+    assert other_claimed_keys == ["third"]
+    assert other_futures["second"] is futures["second"]
+
+
+def test_single_flight_resolve():
+    single_flight = SingleFlight()
+
+    futures, _ = single_flight.claim(["key"])
+    single_flight.resolve("key", "result")
+
+    assert futures["key"].result() == "result"
+    _, claimed_keys = single_flight.claim(["key"])
+    assert claimed_keys == ["key"]
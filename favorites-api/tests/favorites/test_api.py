@@ -1,12 +1,24 @@
+import threading
+import time
+from datetime import timedelta
 from unittest import mock
 from uuid import uuid4
 
 import pytest
 from dateutil.parser import isoparse
+from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.reverse import reverse
 
+from apps.core.mixins import ExternalLuizalabsAPIMixin, get_products_local_cache
+from apps.favorites.models import Customer, Product
+from apps.favorites.serializers import FavoriteListSerializer
 from tests.factories import CustomerFactory, ProductFactory
 
 pytestmark = pytest.mark.django_db
@@ -18,8 +30,8 @@ def test_customer_list(client_api):
     response = client_api.get(url)
 
     assert response.status_code == status.HTTP_200_OK
-    assert len(response.data) == 1
-    customer_result = response.data[0]
+    assert len(response.data["results"]) == 1
+    customer_result = response.data["results"][0]
     assert str(customer.id) == customer_result["id"]
     assert customer.name == customer_result["name"]
     assert customer.name == customer_result["name"]
@@ -27,6 +39,112 @@ def test_customer_list(client_api):
     assert isoparse(str(customer.updated_at)) == isoparse(customer_result["updated_at"])
 
 
+def test_customer_list_etag(client_api):
+    customer = CustomerFactory()
+    url = reverse("favorites:customers-list")
+
+    etag = client_api.get(url)["ETag"]
+    response = client_api.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response["ETag"] == etag
+
+    client_api.patch(reverse("favorites:customers-detail", [customer.id]), {"name": "Lucas"})
+    response = client_api.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response["ETag"] != etag
+
+
+def walk_pages(client_api, url, link="next"):
+    pages = []
+    while url:
+        response = client_api.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        pages.append([item["id"] for item in response.data["results"]])
+        url = response.data[link]
+    return pages
+
+
+def test_customer_list_keyset_pagination(client_api):
+    customers = CustomerFactory.create_batch(7)
+    Customer.objects.filter(id__in=[customer.id for customer in customers[:4]]).update(
+        created_at=timezone.now()
+    )
+    expected_ids = [
+        str(id) for id in Customer.objects.order_by("created_at", "id").values_list("id", flat=True)
+    ]
+
+    pages = walk_pages(client_api, reverse("favorites:customers-list") + "?page_size=3")
+    assert pages == [expected_ids[:3], expected_ids[3:6], expected_ids[6:]]
+
+    last_page = client_api.get(reverse("favorites:customers-list") + "?page_size=3")
+    while last_page.data["next"]:
+        last_page = client_api.get(last_page.data["next"])
+    assert walk_pages(client_api, last_page.data["previous"], link="previous") == pages[-2::-1]
+
+
+def test_customer_list_page_cost(client_api):
+    CustomerFactory.create_batch(6)
+    url = reverse("favorites:customers-list") + "?page_size=2"
+
+    queries = []
+    while url:
+        with CaptureQueriesContext(connection) as context:
+            response = client_api.get(url)
+        queries.append(len(context.captured_queries))
+        url = response.data["next"]
+    assert queries == [1, 1, 1]
+
+
+def test_customer_list_invalid_cursor(client_api):
+    response = client_api.get(reverse("favorites:customers-list") + "?cursor=invalid")
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_customer_list_etag_covers_links(client_api):
+    CustomerFactory.create_batch(2)
+    url = reverse("favorites:customers-list") + "?page_size=2"
+
+    etag = client_api.get(url)["ETag"]
+    CustomerFactory()
+
+    response = client_api.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["next"] is not None
+
+
+def test_customer_list_filters(client_api):
+    customer, old_customer, _ = CustomerFactory.create_batch(3)
+    Customer.objects.filter(id=old_customer.id).update(created_at=timezone.now() - timedelta(days=10))
+    url = reverse("favorites:customers-list")
+
+    response = client_api.get(url, {"email": customer.email})
+    assert [item["id"] for item in response.data["results"]] == [str(customer.id)]
+
+    created_before = timezone.now() - timedelta(days=1)
+    response = client_api.get(url, {"created_before": created_before.isoformat()})
+    assert [item["id"] for item in response.data["results"]] == [str(old_customer.id)]
+
+    response = client_api.get(url, {"created_after": created_before.isoformat()})
+    assert len(response.data["results"]) == 2
+
+    response = client_api.get(url, {"email": "invalid"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_customer_retrieve_etag(client_api):
+    customer = CustomerFactory()
+    url = reverse("favorites:customers-detail", [customer.id])
+
+    response = client_api.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["id"] == str(customer.id)
+
+    response = client_api.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert not response.content
+
+
 @pytest.mark.freeze_time("2020-12-07")
 def test_customer_create(client_api):
     customer_payload = {"name": "Lucas de Oliveira", "email": "lucas.oliveira@magazineluiza.com.br"}
@@ -76,18 +194,31 @@ def test_product_list(client_api):
     response = client_api.get(url)
 
     assert response.status_code == status.HTTP_200_OK
-    assert len(response.data) == 1
-    product_result = response.data[0]
+    assert len(response.data["results"]) == 1
+    product_result = response.data["results"][0]
     assert str(product.id) == product_result["id"]
     assert isoparse(str(product.created_at)) == isoparse(product_result["created_at"])
     assert isoparse(str(product.updated_at)) == isoparse(product_result["updated_at"])
 
 
+def test_product_list_filters(client_api):
+    products = ProductFactory.create_batch(3)
+    Product.objects.filter(id=products[0].id).update(created_at=timezone.now() - timedelta(days=10))
+    url = reverse("favorites:products-list")
+
+    created_after = (timezone.now() - timedelta(days=1)).isoformat()
+    pages = walk_pages(client_api, f"{url}?page_size=1&created_after={created_after.replace('+', '%2B')}")
+    assert sorted(id for page in pages for id in page) == sorted(str(product.id) for product in products[1:])
+
+    response = client_api.get(url, {"created_after": "yesterday"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
 @pytest.mark.freeze_time("2020-12-07")
-@mock.patch("apps.favorites.serializers.ProductSerializer.check_product_existence")
-def test_product_create(check_product_mock, client_api):
-    product_payload = {"id": "08e79fe7-3957-4a7c-b423-fd6ccebd9baf"}
-    check_product_mock.return_value = product_payload["id"]
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.search_product")
+def test_product_create(search_product_mock, luizalabs_product, id, client_api):
+    product_payload = {"id": id}
+    search_product_mock.return_value = luizalabs_product
 
     url = reverse("favorites:products-list")
     response = client_api.post(url, product_payload)
@@ -97,8 +228,20 @@ def test_product_create(check_product_mock, client_api):
     assert product_payload["id"] in product_result["id"]
     assert product_result["created_at"] == "2020-12-07T00:00:00Z"
     assert product_result["updated_at"] == "2020-12-07T00:00:00Z"
-    check_product_mock.assert_called_once()
-    assert str(check_product_mock.call_args[0][0]) == product_payload["id"]
+    search_product_mock.assert_called_once()
+    assert str(search_product_mock.call_args[0][0]) == product_payload["id"]
+
+    product = Product.objects.get(id=id)
+    assert product.fetched_at == timezone.now()
+    assert product.snapshot[1] == luizalabs_product
+
+
+@mock.patch("apps.favorites.serializers.ProductSerializer.search_product", return_value=None)
+def test_product_create_unavailable_luizalabs_api(search_product_mock, client_api):
+    url = reverse("favorites:products-list")
+    response = client_api.post(url, {"id": str(uuid4())})
+
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
 
 
 def test_product_delete(client_api):
@@ -113,22 +256,23 @@ def test_product_delete(client_api):
     assert response.status_code == status.HTTP_204_NO_CONTENT
 
 
-@mock.patch("apps.favorites.api.FavoriteViewSet.search_product")
-def test_favorite_list(search_product_mock, luizalabs_product, client_api):
+@mock.patch("apps.favorites.api.FavoriteViewSet.request_product_on_external_api")
+def test_favorite_list(request_product_mock, luizalabs_product, client_api):
     customer = CustomerFactory()
     product = ProductFactory()
     customer.favorites.add(product)
 
-    search_product_mock.return_value = luizalabs_product
+    request_product_mock.return_value = luizalabs_product
 
     url = reverse("favorites:customer-favorites-list", [customer.id])
     response = client_api.get(url)
 
     assert response.status_code == status.HTTP_200_OK
-    search_product_mock.assert_called_once()
-    assert str(search_product_mock.call_args[0][0]) == product.id
+    assert "X-Partial-Results" not in response
+    request_product_mock.assert_called_once()
+    assert str(request_product_mock.call_args[0][0]) == product.id
 
-    favorite_response = response.data[0]
+    favorite_response = response.data["results"][0]
     assert luizalabs_product["id"] == favorite_response["id"]
     assert float(luizalabs_product["price"]) == float(favorite_response["price"])
     assert luizalabs_product["image"] == favorite_response["image"]
@@ -137,21 +281,511 @@ def test_favorite_list(search_product_mock, luizalabs_product, client_api):
     assert luizalabs_product["reviewScore"] == favorite_response["reviewScore"]
 
 
-def test_favorite_create(client_api):
+@mock.patch("apps.favorites.api.FavoriteViewSet.request_product_on_external_api")
+def test_favorite_list_degrades_failed_products(request_product_mock, luizalabs_product, client_api):
+    customer = CustomerFactory()
+    broken_product, product = ProductFactory(), ProductFactory()
+    customer.favorites.add(broken_product, product)
+
+    def request_product(id):
+        if str(id) == str(broken_product.id):
+            raise ConnectionError
+        return {**luizalabs_product, "id": str(id)}
+
+    request_product_mock.side_effect = request_product
+
+    url = reverse("favorites:customer-favorites-list", [customer.id])
+    response = client_api.get(url)
+
+    assert response.status_code == status.HTTP_200_OK
+    favorites = {favorite["id"]: favorite for favorite in response.data["results"]}
+    assert favorites[str(broken_product.id)] == {"id": str(broken_product.id), "degraded": True}
+    assert favorites[str(product.id)]["title"] == luizalabs_product["title"]
+    assert "degraded" not in favorites[str(product.id)]
+    assert response["X-Partial-Results"] == "true"
+
+
+@mock.patch("apps.favorites.api.FavoriteViewSet.request_product_on_external_api")
+@override_settings(FAVORITES_LIST_DEADLINE=0.2)
+def test_favorite_list_deadline(request_product_mock, luizalabs_product, client_api):
+    customer = CustomerFactory()
+    slow_product, product = ProductFactory(), ProductFactory()
+    customer.favorites.add(slow_product, product)
+    released = threading.Event()
+
+    def request_product(id):
+        if str(id) == str(slow_product.id):
+            released.wait(5)
+        return {**luizalabs_product, "id": str(id)}
+
+    request_product_mock.side_effect = request_product
+
+    url = reverse("favorites:customer-favorites-list", [customer.id])
+    started_at = time.monotonic()
+    try:
+        response = client_api.get(url)
+    finally:
+        released.set()
+
+    assert time.monotonic() - started_at < 1
+    assert response.status_code == status.HTTP_200_OK
+    favorites = {favorite["id"]: favorite for favorite in response.data["results"]}
+    assert favorites[str(slow_product.id)] == {"id": str(slow_product.id), "degraded": True}
+    assert favorites[str(product.id)]["title"] == luizalabs_product["title"]
+    assert response["X-Partial-Results"] == "true"
+
+
+@pytest.mark.parametrize("favorites_count", (1, 10, 50))
+@mock.patch("apps.favorites.api.FavoriteViewSet.request_product_on_external_api")
+@override_settings(FAVORITES_PAGE_SIZE=50, FAVORITES_RESPONSE_CACHE_TIMEOUT=0)
+def test_favorite_list_redis_round_trips(
+    request_product_mock, favorites_count, luizalabs_product, client_api, redis_round_trips
+):
+    customer = CustomerFactory()
+    customer.favorites.add(*ProductFactory.create_batch(favorites_count))
+    request_product_mock.side_effect = lambda id: {**luizalabs_product, "id": str(id)}
+
+    url = reverse("favorites:customer-favorites-list", [customer.id])
+
+    redis_round_trips.clear()
+    cold_response = client_api.get(url)
+    assert len(cold_response.data["results"]) == favorites_count
+    # Products lookup, circuit breaker state, locks and storing the fetched products.
+    assert len(redis_round_trips) <= 4
+
+    get_products_local_cache().clear()
+    redis_round_trips.clear()
+    snapshot_response = client_api.get(url)
+    assert snapshot_response.data == cold_response.data
+    assert len(redis_round_trips) == 0
+
+    Product.objects.update(fetched_at=None)
+    get_products_local_cache().clear()
+    redis_round_trips.clear()
+    warm_response = client_api.get(url)
+    assert warm_response.data == cold_response.data
+    assert len(redis_round_trips) == 1
+
+    redis_round_trips.clear()
+    local_response = client_api.get(url)
+    assert local_response.data == cold_response.data
+    assert len(redis_round_trips) == 0
+    assert request_product_mock.call_count == favorites_count
+
+
+@mock.patch("apps.favorites.api.FavoriteViewSet.request_product_on_external_api")
+def test_favorite_list_response_cache(
+    request_product_mock, luizalabs_product, client_api, redis_round_trips, django_assert_num_queries
+):
+    customer = CustomerFactory()
+    customer.favorites.add(*ProductFactory.create_batch(3))
+    request_product_mock.side_effect = lambda id: {**luizalabs_product, "id": str(id)}
+
+    url = reverse("favorites:customer-favorites-list", [customer.id])
+    cold_response = client_api.get(url)
+
+    redis_round_trips.clear()
+    with django_assert_num_queries(0):
+        cached_response = client_api.get(url)
+
+    assert cached_response.status_code == status.HTTP_200_OK
+    assert cached_response["Content-Type"] == "application/json"
+    assert cached_response.json() == cold_response.json()
+    assert redis_round_trips == ["MGET"]
+    assert request_product_mock.call_count == 3
+
+
+@mock.patch("apps.favorites.api.FavoriteViewSet.request_product_on_external_api")
+def test_favorite_list_response_cache_invalidation(request_product_mock, luizalabs_product, client_api):
+    customer = CustomerFactory()
+    product, other_product = ProductFactory(), ProductFactory()
+    customer.favorites.add(product)
+    request_product_mock.side_effect = lambda id: {**luizalabs_product, "id": str(id)}
+
+    url = reverse("favorites:customer-favorites-list", [customer.id])
+    favorite_url = reverse("favorites:customer-favorites-detail", [customer.id, product.id])
+
+    def listed_ids():
+        return [favorite["id"] for favorite in client_api.get(url).json()["results"]]
+
+    assert listed_ids() == [str(product.id)]
+    client_api.post(url, {"id": str(other_product.id)}, format="json")
+    assert listed_ids() == [str(product.id), str(other_product.id)]
+    client_api.delete(favorite_url)
+    assert listed_ids() == [str(other_product.id)]
+
+
+@mock.patch("apps.favorites.api.FavoriteViewSet.request_product_on_external_api")
+def test_favorite_list_response_cache_customer_delete(request_product_mock, luizalabs_product, client_api):
+    customer = CustomerFactory()
+    customer.favorites.add(ProductFactory())
+    request_product_mock.side_effect = lambda id: {**luizalabs_product, "id": str(id)}
+
+    url = reverse("favorites:customer-favorites-list", [customer.id])
+    assert client_api.get(url).status_code == status.HTTP_200_OK
+
+    client_api.delete(reverse("favorites:customers-detail", [customer.id]))
+    assert client_api.get(url).status_code == status.HTTP_404_NOT_FOUND
+
+
+@mock.patch("apps.favorites.api.FavoriteViewSet.request_product_on_external_api")
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.request_product_on_external_api")
+def test_favorite_list_response_cache_product_refresh(
+    refresh_product_mock, request_product_mock, luizalabs_product, client_api
+):
+    customer = CustomerFactory()
+    product = ProductFactory()
+    customer.favorites.add(product)
+    request_product_mock.return_value = luizalabs_product
+    refresh_product_mock.return_value = {**luizalabs_product, "title": "Cadeira Preta"}
+
+    url = reverse("favorites:customer-favorites-list", [customer.id])
+    assert client_api.get(url).json()["results"][0]["title"] == luizalabs_product["title"]
+
+    luizalabs_api = ExternalLuizalabsAPIMixin()
+    luizalabs_api.release_product_locks([str(product.id)])
+    luizalabs_api.refresh_products({str(product.id): luizalabs_product})
+
+    get_products_local_cache().clear()
+    assert client_api.get(url).json()["results"][0]["title"] == "Cadeira Preta"
+
+
+@mock.patch("apps.favorites.api.FavoriteViewSet.request_product_on_external_api")
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.request_product_on_external_api")
+def test_favorite_list_response_cache_outdated_local_cache(
+    refresh_product_mock, request_product_mock, luizalabs_product, client_api
+):
+    customer = CustomerFactory()
+    product = ProductFactory()
+    customer.favorites.add(product)
+    request_product_mock.return_value = {**luizalabs_product, "id": str(product.id), "price": 10}
+
+    url = reverse("favorites:customer-favorites-list", [customer.id])
+    client_api.get(url)
+
+    # Refreshed by another worker, leaving the local cache of this one behind
+    local_product = get_products_local_cache().get(str(product.id))
+    refresh_product_mock.return_value = {**local_product, "price": 20}
+    luizalabs_api = ExternalLuizalabsAPIMixin()
+    luizalabs_api.release_product_locks([str(product.id)])
+    luizalabs_api.refresh_products({str(product.id): local_product})
+    get_products_local_cache().set(str(product.id), local_product)
+    # Served from cache rather than from its snapshot
+    Product.objects.update(fetched_at=None)
+
+    assert client_api.get(url).json()["results"][0]["price"] == "20.00"
+    get_products_local_cache().clear()
+    assert client_api.get(url).json()["results"][0]["price"] == "20.00"
+
+
+@mock.patch("apps.favorites.api.FavoriteViewSet.request_product_on_external_api")
+def test_favorite_list_response_cache_skips_partial_results(
+    request_product_mock, luizalabs_product, client_api
+):
+    customer = CustomerFactory()
+    customer.favorites.add(ProductFactory())
+    request_product_mock.side_effect = ConnectionError
+
+    url = reverse("favorites:customer-favorites-list", [customer.id])
+    assert client_api.get(url).json()["results"][0]["degraded"]
+
+    request_product_mock.side_effect = lambda id: {**luizalabs_product, "id": str(id)}
+    assert "degraded" not in client_api.get(url).json()["results"][0]
+
+
+@pytest.mark.parametrize("response_cache_timeout", (0, 300))
+@mock.patch("apps.favorites.api.FavoriteViewSet.request_product_on_external_api")
+def test_favorite_list_etag(request_product_mock, response_cache_timeout, luizalabs_product, client_api):
+    customer = CustomerFactory()
+    customer.favorites.add(ProductFactory())
+    request_product_mock.side_effect = lambda id: {**luizalabs_product, "id": str(id)}
+    url = reverse("favorites:customer-favorites-list", [customer.id])
+
+    with override_settings(FAVORITES_RESPONSE_CACHE_TIMEOUT=response_cache_timeout):
+        assert "ETag" not in client_api.get(url)
+        get_products_local_cache().clear()
+        cache.clear()
+        etag = client_api.get(url)["ETag"]
+        response = client_api.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response["ETag"] == etag
+        assert request_product_mock.call_count == 1
+
+        client_api.post(url, {"id": str(ProductFactory().id)}, format="json")
+        response = client_api.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()["results"]) == 2
+        assert "ETag" not in response
+
+
+@mock.patch("apps.favorites.api.FavoriteViewSet.request_product_on_external_api")
+def test_favorite_list_etag_covers_favorites_past_the_page(
+    request_product_mock, luizalabs_product, client_api
+):
+    customer = CustomerFactory()
+    customer.favorites.add(*ProductFactory.create_batch(2, fetched_at=timezone.now()))
+    request_product_mock.side_effect = lambda id: {**luizalabs_product, "id": str(id)}
+    url = reverse("favorites:customer-favorites-list", [customer.id]) + "?page_size=2"
+
+    response = client_api.get(url)
+    etag = response["ETag"]
+    assert response.json()["next"] is None
+
+    client_api.post(
+        reverse("favorites:customer-favorites-list", [customer.id]),
+        {"id": str(ProductFactory(fetched_at=timezone.now()).id)},
+        format="json",
+    )
+    response = client_api.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["next"] is not None
+    assert response["ETag"] != etag
+
+
+@mock.patch("apps.favorites.api.FavoriteViewSet.request_product_on_external_api")
+@mock.patch("apps.core.mixins.ExternalLuizalabsAPIMixin.request_product_on_external_api")
+@override_settings(FAVORITES_RESPONSE_CACHE_TIMEOUT=0)
+def test_favorite_list_etag_describes_the_details_served(
+    refresh_product_mock, request_product_mock, luizalabs_product, client_api
+):
+    customer = CustomerFactory()
+    product = ProductFactory()
+    customer.favorites.add(product)
+    request_product_mock.return_value = {**luizalabs_product, "id": str(product.id), "price": 10}
+
+    url = reverse("favorites:customer-favorites-list", [customer.id])
+    client_api.get(url)
+    etag = client_api.get(url)["ETag"]
+
+    # Refreshed by another worker, leaving the local cache of this one behind
+    local_product = get_products_local_cache().get(str(product.id))
+    refresh_product_mock.return_value = {**local_product, "price": 20}
+    luizalabs_api = ExternalLuizalabsAPIMixin()
+    luizalabs_api.release_product_locks([str(product.id)])
+    luizalabs_api.refresh_products({str(product.id): local_product})
+    get_products_local_cache().set(str(product.id), local_product)
+
+    response = client_api.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["results"][0]["price"] == "20.00"
+    assert (
+        client_api.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code == status.HTTP_304_NOT_MODIFIED
+    )
+
+
+@mock.patch("apps.favorites.api.FavoriteViewSet.request_product_on_external_api")
+def test_favorite_list_etag_skips_partial_results(request_product_mock, client_api):
+    customer = CustomerFactory()
+    customer.favorites.add(ProductFactory())
+    request_product_mock.side_effect = ConnectionError
+
+    response = client_api.get(reverse("favorites:customer-favorites-list", [customer.id]))
+
+    assert response["X-Partial-Results"] == "true"
+    assert "ETag" not in response
+
+
+@mock.patch("apps.favorites.api.FavoriteViewSet.request_product_on_external_api")
+def test_favorite_list_stores_products_snapshots(request_product_mock, luizalabs_product, client_api):
+    customer = CustomerFactory()
+    product = ProductFactory()
+    customer.favorites.add(product)
+    request_product_mock.side_effect = lambda id: {**luizalabs_product, "id": str(id)}
+
+    client_api.get(reverse("favorites:customer-favorites-list", [customer.id]))
+
+    product.refresh_from_db()
+    assert product.title == luizalabs_product["title"]
+    assert float(product.price) == luizalabs_product["price"]
+    assert product.image == luizalabs_product["image"]
+    assert product.brand == luizalabs_product["brand"]
+    assert product.review_score == luizalabs_product["reviewScore"]
+    assert product.fetched_at is not None
+
+
+@pytest.mark.parametrize("favorites_count", (1, 10))
+@mock.patch("apps.favorites.api.FavoriteViewSet.request_product_on_external_api")
+def test_favorite_list_reads_products_snapshots(
+    request_product_mock, favorites_count, luizalabs_product, client_api, django_assert_num_queries
+):
+    customer = CustomerFactory()
+    products = ProductFactory.create_batch(
+        favorites_count,
+        title="Cadeira",
+        price=1699,
+        brand="bébé confort",
+        review_score=4.5,
+        fetched_at=timezone.now(),
+    )
+    customer.favorites.add(*products)
+
+    url = reverse("favorites:customer-favorites-list", [customer.id])
+    with django_assert_num_queries(1):
+        response = client_api.get(url)
+
+    assert response.status_code == status.HTTP_200_OK
+    request_product_mock.assert_not_called()
+    assert {favorite["id"] for favorite in response.data["results"]} == {
+        str(product.id) for product in products
+    }
+    assert response.data["results"][0]["title"] == "Cadeira"
+    assert float(response.data["results"][0]["price"]) == 1699
+    assert response.data["results"][0]["reviewScore"] == 4.5
+
+
+@mock.patch("apps.favorites.api.FavoriteViewSet.request_product_on_external_api")
+def test_favorite_list_ignores_expired_products_snapshots(
+    request_product_mock, luizalabs_product, client_api
+):
+    customer = CustomerFactory()
+    expired_at = timezone.now() - timedelta(
+        seconds=settings.FAVORITES_EXPIRE_TIMEOUT + settings.FAVORITES_STALE_TIMEOUT + 1
+    )
+    product = ProductFactory(title="Outdated", fetched_at=expired_at)
+    customer.favorites.add(product)
+    request_product_mock.side_effect = lambda id: {**luizalabs_product, "id": str(id)}
+
+    response = client_api.get(reverse("favorites:customer-favorites-list", [customer.id]))
+
+    request_product_mock.assert_called_once()
+    assert response.data["results"][0]["title"] == luizalabs_product["title"]
+
+
+@mock.patch("apps.favorites.api.FavoriteViewSet.request_product_on_external_api")
+@override_settings(FAVORITES_PAGE_SIZE=2)
+def test_favorite_list_pagination(request_product_mock, luizalabs_product, client_api):
+    customer = CustomerFactory()
+    products = ProductFactory.create_batch(5)
+    for product in products:
+        customer.favorites.add(product)
+
+    request_product_mock.side_effect = lambda id: {**luizalabs_product, "id": str(id)}
+
+    pages = []
+    url = reverse("favorites:customer-favorites-list", [customer.id])
+    while url:
+        response = client_api.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        pages.append([favorite["id"] for favorite in response.data["results"]])
+        url = response.data["next"]
+
+    assert pages == [
+        [str(products[0].id), str(products[1].id)],
+        [str(products[2].id), str(products[3].id)],
+        [str(products[4].id)],
+    ]
+    assert request_product_mock.call_count == len(products)
+
+
+@mock.patch("apps.favorites.api.FavoriteViewSet.request_product_on_external_api")
+@override_settings(FAVORITES_PAGE_SIZE=2, FAVORITES_MAX_PAGE_SIZE=3)
+def test_favorite_list_page_size(request_product_mock, luizalabs_product, client_api):
+    customer = CustomerFactory()
+    customer.favorites.add(*ProductFactory.create_batch(5))
+
+    request_product_mock.side_effect = lambda id: {**luizalabs_product, "id": str(id)}
+
+    url = reverse("favorites:customer-favorites-list", [customer.id])
+    response = client_api.get(url, {"page_size": 10})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.data["results"]) == 3
+    assert request_product_mock.call_count == 3
+    assert response.data["next"] is not None
+    assert response.data["previous"] is None
+
+
+def test_favorite_list_not_found_customer(client_api):
+    url = reverse("favorites:customer-favorites-list", [uuid4()])
+    response = client_api.get(url)
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@mock.patch("apps.favorites.api.FavoriteViewSet.request_product_on_external_api")
+def test_favorite_ids(request_product_mock, client_api, django_assert_num_queries):
+    customer = CustomerFactory()
+    products = ProductFactory.create_batch(3)
+    customer.favorites.add(*products)
+
+    url = reverse("favorites:customer-favorites-ids", [customer.id])
+    with django_assert_num_queries(1):
+        response = client_api.get(url)
+
+    assert response.status_code == status.HTTP_200_OK
+    request_product_mock.assert_not_called()
+    assert response.data["count"] == 3
+    assert sorted(response.data["ids"]) == sorted(str(product.id) for product in products)
+
+
+def test_favorite_ids_empty(client_api):
+    customer = CustomerFactory()
+
+    url = reverse("favorites:customer-favorites-ids", [customer.id])
+    response = client_api.get(url)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data == {"count": 0, "ids": []}
+
+
+def test_favorite_ids_not_found_customer(client_api):
+    url = reverse("favorites:customer-favorites-ids", [uuid4()])
+    response = client_api.get(url)
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@mock.patch("apps.favorites.api.FavoriteViewSet.request_product_on_external_api")
+def test_favorite_contains(request_product_mock, client_api, django_assert_num_queries):
+    customer = CustomerFactory()
+    favorite, product = ProductFactory(), ProductFactory()
+    customer.favorites.add(favorite)
+
+    url = reverse("favorites:customer-favorites-contains", [customer.id])
+    with django_assert_num_queries(1):
+        response = client_api.get(url, {"ids": f"{favorite.id},{product.id}"})
+
+    assert response.status_code == status.HTTP_200_OK
+    request_product_mock.assert_not_called()
+    assert response.data == {str(favorite.id): True, str(product.id): False}
+
+
+def test_favorite_contains_not_found_customer(client_api, django_assert_num_queries):
+    product = ProductFactory()
+
+    url = reverse("favorites:customer-favorites-contains", [uuid4()])
+    with django_assert_num_queries(1):
+        response = client_api.get(url, {"ids": str(product.id)})
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.parametrize("ids", ["", "invalid", f"{uuid4()},invalid"])
+def test_favorite_contains_invalid_ids(ids, client_api):
+    customer = CustomerFactory()
+
+    url = reverse("favorites:customer-favorites-contains", [customer.id])
+    response = client_api.get(url, {"ids": ids})
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_favorite_create(client_api, django_assert_num_queries):
     customer = CustomerFactory()
     product = ProductFactory()
 
     payload = {"id": str(product.id)}
 
     url = reverse("favorites:customer-favorites-list", [customer.id])
-    response = client_api.post(url, payload)
+    with django_assert_num_queries(2):
+        response = client_api.post(url, payload)
     assert response.status_code == status.HTTP_201_CREATED
 
     customer.refresh_from_db()
     assert str(customer.favorites.first().id) == product.id
 
 
-def test_favorite_create_already_created_favorite(client_api):
+def test_favorite_create_already_created_favorite(client_api, django_assert_num_queries):
     customer = CustomerFactory()
     product = ProductFactory()
     customer.favorites.add(product)
@@ -159,7 +793,8 @@ def test_favorite_create_already_created_favorite(client_api):
     payload = {"id": str(product.id)}
 
     url = reverse("favorites:customer-favorites-list", [customer.id])
-    response = client_api.post(url, payload)
+    with django_assert_num_queries(1):
+        response = client_api.post(url, payload)
     assert response.status_code == status.HTTP_304_NOT_MODIFIED
 
 
@@ -177,25 +812,37 @@ def test_favorite_create_invalid_product(client_api):
     assert response.json() == expected_response
 
 
-def test_favorite_destroy(client_api):
+def test_favorite_create_not_found_customer(client_api):
+    product = ProductFactory()
+    payload = {"id": str(product.id)}
+
+    url = reverse("favorites:customer-favorites-list", [uuid4()])
+    response = client_api.post(url, payload)
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_favorite_destroy(client_api, django_assert_num_queries):
     customer = CustomerFactory()
     product = ProductFactory()
     customer.favorites.add(product)
 
     url = reverse("favorites:customer-favorites-detail", [customer.id, product.id])
-    response = client_api.delete(url)
+    with django_assert_num_queries(1):
+        response = client_api.delete(url)
     assert response.status_code == status.HTTP_204_NO_CONTENT
 
     customer.refresh_from_db()
     assert customer.favorites.count() == 0
 
 
-def test_favorite_destroy_already_destroyed_favorite(client_api):
+def test_favorite_destroy_already_destroyed_favorite(client_api, django_assert_num_queries):
     customer = CustomerFactory()
     product = ProductFactory()
 
     url = reverse("favorites:customer-favorites-detail", [customer.id, product.id])
-    response = client_api.delete(url)
+    with django_assert_num_queries(2):
+        response = client_api.delete(url)
     assert response.status_code == status.HTTP_304_NOT_MODIFIED
 
 
@@ -210,15 +857,87 @@ def test_favorite_destroy_invalid_product(client_api):
     assert response.json() == expected_response
 
 
+def test_favorite_destroy_not_found_customer(client_api):
+    product = ProductFactory()
+
+    url = reverse("favorites:customer-favorites-detail", [uuid4(), product.id])
+    response = client_api.delete(url)
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_favorite_bulk_create(client_api, django_assert_num_queries):
+    customer = CustomerFactory()
+    present, *products = ProductFactory.create_batch(101)
+    customer.favorites.add(present)
+    unknown = uuid4()
+    ids = [str(present.id), *(str(product.id) for product in products), str(unknown)]
+
+    url = reverse("favorites:customer-favorites-bulk", [customer.id])
+    with django_assert_num_queries(4):
+        response = client_api.post(url, {"ids": ids}, format="json")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"added": ids[1:-1], "present": ids[:1], "unknown": ids[-1:]}
+    assert customer.favorites.count() == 101
+
+
+def test_favorite_bulk_destroy(client_api, django_assert_num_queries):
+    customer = CustomerFactory()
+    absent, *products = ProductFactory.create_batch(101)
+    customer.favorites.add(*products)
+    unknown = uuid4()
+    ids = [str(absent.id), *(str(product.id) for product in products), str(unknown)]
+
+    url = reverse("favorites:customer-favorites-bulk", [customer.id])
+    with django_assert_num_queries(4):
+        response = client_api.delete(url, {"ids": ids}, format="json")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"removed": ids[1:-1], "absent": ids[:1], "unknown": ids[-1:]}
+    assert customer.favorites.count() == 0
+
+
+def test_favorite_bulk_duplicated_ids(client_api):
+    customer = CustomerFactory()
+    product = ProductFactory()
+
+    url = reverse("favorites:customer-favorites-bulk", [customer.id])
+    response = client_api.post(url, {"ids": [str(product.id)] * 2}, format="json")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["added"] == [str(product.id)]
+    assert customer.favorites.count() == 1
+
+
+@override_settings(FAVORITES_BULK_MAX_SIZE=1)
+@pytest.mark.parametrize("ids", [[], ["invalid"], [str(uuid4()), str(uuid4())]])
+def test_favorite_bulk_invalid_ids(ids, client_api):
+    customer = CustomerFactory()
+
+    url = reverse("favorites:customer-favorites-bulk", [customer.id])
+    response = client_api.post(url, {"ids": ids}, format="json")
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_favorite_bulk_not_found_customer(client_api):
+    url = reverse("favorites:customer-favorites-bulk", [uuid4()])
+    response = client_api.post(url, {"ids": [str(uuid4())]}, format="json")
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
 @mock.patch("apps.favorites.api.FavoriteViewSet.search_product")
-def test_favorite_retrieve(search_product_mock, luizalabs_product, client_api):
+def test_favorite_retrieve(search_product_mock, luizalabs_product, client_api, django_assert_num_queries):
     customer = CustomerFactory()
     product = ProductFactory()
     customer.favorites.add(product)
     search_product_mock.return_value = luizalabs_product
 
     url = reverse("favorites:customer-favorites-detail", [customer.id, product.id])
-    response = client_api.get(url)
+    with django_assert_num_queries(1):
+        response = client_api.get(url)
     assert response.status_code == status.HTTP_200_OK
 
     assert response.status_code == status.HTTP_200_OK
@@ -232,3 +951,109 @@ def test_favorite_retrieve(search_product_mock, luizalabs_product, client_api):
     assert luizalabs_product["brand"] == favorite_response["brand"]
     assert luizalabs_product["title"] == favorite_response["title"]
     assert luizalabs_product["reviewScore"] == favorite_response["reviewScore"]
+
+
+@mock.patch("apps.favorites.api.FavoriteViewSet.search_product")
+def test_favorite_retrieve_etag(
+    search_product_mock, luizalabs_product, client_api, django_assert_num_queries
+):
+    customer = CustomerFactory()
+    product = ProductFactory(fetched_at=timezone.now())
+    customer.favorites.add(product)
+    search_product_mock.return_value = luizalabs_product
+
+    url = reverse("favorites:customer-favorites-detail", [customer.id, product.id])
+    etag = client_api.get(url)["ETag"]
+    with django_assert_num_queries(1):
+        response = client_api.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    search_product_mock.assert_not_called()
+
+    product.fetched_at = timezone.now()
+    product.save()
+    response = client_api.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response["ETag"] != etag
+
+
+@mock.patch("apps.favorites.api.FavoriteViewSet.search_product")
+def test_favorite_retrieve_snapshot(
+    search_product_mock, luizalabs_product, client_api, django_assert_num_queries
+):
+    customer = CustomerFactory()
+    product = Product.from_snapshot(luizalabs_product)
+    product.save()
+    customer.favorites.add(product)
+
+    url = reverse("favorites:customer-favorites-detail", [customer.id, product.id])
+    with django_assert_num_queries(1):
+        response = client_api.get(url)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data == FavoriteListSerializer(luizalabs_product).data
+    search_product_mock.assert_not_called()
+
+
+@override_settings(FAVORITES_EXPIRE_TIMEOUT=10, FAVORITES_STALE_TIMEOUT=5)
+@mock.patch("apps.favorites.api.FavoriteViewSet.search_product")
+def test_favorite_retrieve_expired_snapshot(search_product_mock, luizalabs_product, client_api):
+    customer = CustomerFactory()
+    product = Product.from_snapshot(luizalabs_product, fetched_at=timezone.now() - timedelta(seconds=20))
+    product.save()
+    customer.favorites.add(product)
+    search_product_mock.return_value = {**luizalabs_product, "title": "Updated"}
+
+    response = client_api.get(reverse("favorites:customer-favorites-detail", [customer.id, product.id]))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["title"] == "Updated"
+    assert "ETag" not in response
+    search_product_mock.assert_called_once()
+
+
+@mock.patch("apps.favorites.api.FavoriteViewSet.search_product")
+def test_favorite_retrieve_without_snapshot_etag(search_product_mock, luizalabs_product, client_api):
+    customer = CustomerFactory()
+    product = ProductFactory()
+    customer.favorites.add(product)
+    search_product_mock.return_value = luizalabs_product
+
+    response = client_api.get(reverse("favorites:customer-favorites-detail", [customer.id, product.id]))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert "ETag" not in response
+
+
+@pytest.mark.parametrize("customer_exists", [True, False])
+@mock.patch("apps.favorites.api.FavoriteViewSet.search_product")
+def test_favorite_retrieve_not_favorited(search_product_mock, customer_exists, client_api):
+    customer_id = CustomerFactory().id if customer_exists else uuid4()
+    product = ProductFactory()
+
+    url = reverse("favorites:customer-favorites-detail", [customer_id, product.id])
+    response = client_api.get(url)
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    search_product_mock.assert_not_called()
+
+
+def test_favorite_retrieve_invalid_id(client_api):
+    customer = CustomerFactory()
+
+    url = reverse("favorites:customer-favorites-detail", [customer.id, "invalid"])
+    response = client_api.get(url)
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@mock.patch("apps.favorites.api.FavoriteViewSet.search_product", return_value=None)
+def test_favorite_retrieve_unavailable_product(search_product_mock, client_api):
+    customer = CustomerFactory()
+    product = ProductFactory()
+    customer.favorites.add(product)
+
+    url = reverse("favorites:customer-favorites-detail", [customer.id, product.id])
+    response = client_api.get(url)
+
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
@@ -0,0 +1,165 @@
+import asyncio
+import time
+from unittest import mock
+from uuid import uuid4
+
+import pytest
+from django.test import Client, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from tests.factories import CustomerFactory, ProductFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def async_client_api(user):
+    return Client(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+
+
+@mock.patch("apps.favorites.async_api.luizalabs_api.request_product_on_external_api")
+def test_async_favorite_list(request_product_mock, luizalabs_product, async_client_api):
+    customer = CustomerFactory()
+    product = ProductFactory()
+    customer.favorites.add(product)
+
+    request_product_mock.return_value = luizalabs_product
+
+    url = reverse("favorites:async-customer-favorites-list", [customer.id])
+    response = async_client_api.get(url)
+
+    assert response.status_code == status.HTTP_200_OK
+    request_product_mock.assert_awaited_once()
+    assert str(request_product_mock.call_args[0][0]) == product.id
+
+    favorite_response = response.json()["results"][0]
+    assert luizalabs_product["id"] == favorite_response["id"]
+    assert float(luizalabs_product["price"]) == float(favorite_response["price"])
+    assert luizalabs_product["image"] == favorite_response["image"]
+    assert luizalabs_product["brand"] == favorite_response["brand"]
+    assert luizalabs_product["title"] == favorite_response["title"]
+    assert luizalabs_product["reviewScore"] == favorite_response["reviewScore"]
+
+
+@mock.patch("apps.favorites.async_api.luizalabs_api.request_product_on_external_api")
+def test_async_favorite_list_matches_sync_list(
+    request_product_mock, luizalabs_product, client_api, async_client_api
+):
+    customer = CustomerFactory()
+    customer.favorites.add(*ProductFactory.create_batch(5))
+
+    request_product_mock.side_effect = lambda id: {**luizalabs_product, "id": str(id)}
+
+    async_response = async_client_api.get(reverse("favorites:async-customer-favorites-list", [customer.id]))
+    sync_response = client_api.get(reverse("favorites:customer-favorites-list", [customer.id]))
+
+    assert async_response.status_code == status.HTTP_200_OK
+    assert async_response.json()["results"] == sync_response.json()["results"]
+
+
+@mock.patch("apps.favorites.async_api.luizalabs_api.request_product_on_external_api")
+def test_async_favorite_list_reads_products_snapshots(request_product_mock, async_client_api):
+    customer = CustomerFactory()
+    product = ProductFactory(title="Cadeira", price=1699, brand="bébé confort", fetched_at=timezone.now())
+    customer.favorites.add(product)
+
+    response = async_client_api.get(reverse("favorites:async-customer-favorites-list", [customer.id]))
+
+    assert response.status_code == status.HTTP_200_OK
+    request_product_mock.assert_not_awaited()
+    assert response.json()["results"][0]["title"] == "Cadeira"
+
+
+@mock.patch("apps.favorites.async_api.luizalabs_api.request_product_on_external_api")
+@override_settings(FAVORITES_LIST_DEADLINE=0.2)
+def test_async_favorite_list_deadline(request_product_mock, luizalabs_product, async_client_api):
+    customer = CustomerFactory()
+    slow_product, product = ProductFactory(), ProductFactory()
+    customer.favorites.add(slow_product, product)
+
+    async def request_product(id):
+        if str(id) == str(slow_product.id):
+            await asyncio.sleep(5)
+        return {**luizalabs_product, "id": str(id)}
+
+    request_product_mock.side_effect = request_product
+
+    url = reverse("favorites:async-customer-favorites-list", [customer.id])
+    started_at = time.monotonic()
+    response = async_client_api.get(url)
+
+    assert time.monotonic() - started_at < 1
+    assert response.status_code == status.HTTP_200_OK
+    favorites = {favorite["id"]: favorite for favorite in response.json()["results"]}
+    assert favorites[str(slow_product.id)] == {"id": str(slow_product.id), "degraded": True}
+    assert favorites[str(product.id)]["title"] == luizalabs_product["title"]
+    assert response["X-Partial-Results"] == "true"
+
+
+@mock.patch("apps.favorites.async_api.luizalabs_api.request_product_on_external_api")
+@override_settings(FAVORITES_PAGE_SIZE=2)
+def test_async_favorite_list_pagination(request_product_mock, luizalabs_product, async_client_api):
+    customer = CustomerFactory()
+    products = ProductFactory.create_batch(3)
+    for product in products:
+        customer.favorites.add(product)
+
+    request_product_mock.side_effect = lambda id: {**luizalabs_product, "id": str(id)}
+
+    url = reverse("favorites:async-customer-favorites-list", [customer.id])
+    first_page = async_client_api.get(url).json()
+    second_page = async_client_api.get(first_page["next"]).json()
+
+    assert [favorite["id"] for favorite in first_page["results"]] == [
+        str(products[0].id),
+        str(products[1].id),
+    ]
+    assert [favorite["id"] for favorite in second_page["results"]] == [str(products[2].id)]
+    assert second_page["next"] is None
+    assert request_product_mock.await_count == len(products)
+
+
+@mock.patch("apps.favorites.async_api.luizalabs_api.request_product_on_external_api")
+def test_async_favorite_retrieve(request_product_mock, luizalabs_product, async_client_api):
+    customer = CustomerFactory()
+    product = ProductFactory()
+    customer.favorites.add(product)
+    request_product_mock.return_value = luizalabs_product
+
+    url = reverse("favorites:async-customer-favorites-detail", [customer.id, product.id])
+    response = async_client_api.get(url)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["id"] == luizalabs_product["id"]
+    assert response.json()["title"] == luizalabs_product["title"]
+
+
+def test_async_favorite_retrieve_not_favorited(async_client_api):
+    customer = CustomerFactory()
+
+    url = reverse("favorites:async-customer-favorites-detail", [customer.id, uuid4()])
+    response = async_client_api.get(url)
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert response.json() == {"detail": "Not found."}
+
+
+def test_async_favorite_list_unauthenticated():
+    customer = CustomerFactory()
+
+    url = reverse("favorites:async-customer-favorites-list", [customer.id])
+    response = Client().get(url)
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_async_favorite_list_method_not_allowed(async_client_api):
+    customer = CustomerFactory()
+
+    url = reverse("favorites:async-customer-favorites-list", [customer.id])
+    response = async_client_api.post(url, {"id": str(uuid4())})
+
+    assert response.status_code == status.HTTP_405_METHOD_NOT_ALLOWED
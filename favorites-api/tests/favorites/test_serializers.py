@@ -1,14 +1,15 @@
+import json
+from decimal import Decimal
 from unittest import mock
+from uuid import uuid4
 
 import pytest
+from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
 
-from apps.favorites.serializers import (
-    CustomerSerializer,
-    FavoriteListSerializer,
-    FavoriteSerializer,
-    ProductSerializer,
-)
+from apps.core.renderers import ORJSONRenderer
+from apps.favorites.serializers import CustomerSerializer, FavoriteListSerializer, ProductSerializer
 from tests.factories import CustomerFactory, ProductFactory
 
 pytestmark = pytest.mark.django_db
@@ -60,22 +61,6 @@ def test_product_serializer_validate_existent_product(check_product_existence_mo
     assert str(check_product_existence_mock.call_args[0][0]) == id
 
 
-def test_favorites_serializer_with_inexistent_product(id):
-    request_data = {"id": id}
-    serializer = FavoriteSerializer(data=request_data)
-    with pytest.raises(ValidationError) as exc:
-        serializer.is_valid(raise_exception=True)
-    assert "Given id does not exists" in str(exc)
-
-
-def test_favorites_serializer_with_existent_product():
-    product = ProductFactory()
-    request_data = {"id": product.id}
-    serializer = FavoriteSerializer(data=request_data)
-    assert serializer.is_valid(raise_exception=True)
-    assert "id" in serializer.data
-
-
 def test_favorites_list_serializer(luizalabs_product):
     serializer = FavoriteListSerializer(luizalabs_product)
     data = serializer.data
@@ -86,3 +71,38 @@ def test_favorites_list_serializer(luizalabs_product):
     assert "image" in data
     assert "brand" in data
     assert "reviewScore" in data
+
+
+class GenericFavoriteListSerializer(FavoriteListSerializer):
+    def to_representation(self, instance):
+        if instance.get("degraded"):
+            return {"id": str(instance["id"]), "degraded": True}
+        return serializers.Serializer.to_representation(self, instance)
+
+
+@pytest.mark.parametrize(
+    "product",
+    (
+        {"price": 1699.0},
+        {"price": 10.005, "reviewScore": None},
+        {"price": "7.1", "reviewScore": 4},
+        {"price": Decimal("99999999.99")},
+        {"price": None, "title": None},
+        {"price": 1, "extra": "ignored"},
+    ),
+)
+def test_favorite_list_serializer_matches_generic_serializer(product, luizalabs_product):
+    products = [{**luizalabs_product, **product}, {"id": uuid4(), "degraded": True}]
+    missing_review_score = {key: value for key, value in luizalabs_product.items() if key != "reviewScore"}
+
+    for instance in [*products, missing_review_score]:
+        assert FavoriteListSerializer(instance).data == GenericFavoriteListSerializer(instance).data
+
+
+def test_favorite_list_serializer_renders_like_generic_serializer(luizalabs_product):
+    products = [{**luizalabs_product, "id": str(uuid4()), "price": 10 + index / 7} for index in range(500)]
+
+    fast_content = ORJSONRenderer().render(FavoriteListSerializer(products, many=True).data)
+    generic_content = JSONRenderer().render(GenericFavoriteListSerializer(products, many=True).data)
+
+    assert json.loads(fast_content) == json.loads(generic_content)
@@ -0,0 +1,21 @@
+"""
+Gunicorn settings, read from the folder gunicorn is started on. Every worker writes its metrics to
+PROMETHEUS_MULTIPROC_DIR, so the /metrics endpoint served by any of them aggregates all workers.
+"""
+import glob
+import os
+import tempfile
+
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="favorites-api-metrics-"))
+
+
+def on_starting(server):
+    # Metrics left by a previous run would be aggregated with the new ones
+    for path in glob.glob(os.path.join(os.environ["PROMETHEUS_MULTIPROC_DIR"], "*.db")):
+        os.remove(path)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)